@@ -1,8 +1,18 @@
 from flask import Flask, redirect, render_template
 from app.config import Config
-from app.modules.decision_graph import DecisionGraph, create_sample_graph
+from app.modules.compact_graph import CompactDecisionGraph
+from app.modules.graph_binary import is_binary_graph, load_binary
+from app.modules.graph_reloader import GraphReloader
+from app.modules.graph_render import GraphRenderer
 from app.modules.search_module import SearchModule
 from app.modules.servicedesk import ServiceDeskModule
+from app.modules.federated_search import FederatedSearch
+from app.modules.search_cache import SearchResultCache
+from app.modules.opensearch_pool import get_registry
+from app.modules.mediawiki_pipeline import MediaWikiIndexPipeline
+from app.modules.mediawiki_sync import MediaWikiIncrementalSync
+from app.modules.background_jobs import BackgroundWorkerPool
+from app.modules.ticket_triage import TicketSolutionSuggester
 import os
 import logging
 logging.basicConfig(
@@ -12,9 +22,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Инициализируем глобальные объекты
-decision_graph = None
+# Текущий граф решений - graph_reloader.graph (подменяется при горячей перезагрузке)
+graph_reloader = None
+graph_renderer = None
 search_module = None
 service_desk = None
+federated_search = None
+opensearch_registry = None
+mediawiki_sync = None
+ticket_suggester = None
+search_cache = None
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -48,17 +65,21 @@ def create_app(config_class=Config):
     return app
 
 def init_modules(app):
-    global decision_graph, search_module, service_desk
+    global graph_reloader, graph_renderer, search_module, service_desk, federated_search, opensearch_registry, mediawiki_sync, search_cache, ticket_suggester
     
-    # Инициализация графа решений
-    if os.path.exists(app.config['GRAPH_DATA_FILE']):
-        logger.info(f"Загружаем граф решений из файла {app.config['GRAPH_DATA_FILE']}")
-        decision_graph = DecisionGraph.load_from_file(app.config['GRAPH_DATA_FILE'])
-    else:
-        # Создаем пример графа
-        logger.info("Создаем пример графа решений")
-        decision_graph = create_sample_graph()
-        decision_graph.save_to_file(app.config['GRAPH_DATA_FILE'])
+    # Инициализация графа решений (с горячей перезагрузкой при изменении файла)
+    runtime = app.config['GRAPH_RUNTIME']
+    graph_reloader = GraphReloader(
+        app.config['GRAPH_DATA_FILE'],
+        lambda filename: load_decision_graph(filename, runtime)
+    )
+    graph_reloader.load()
+    if app.config['GRAPH_RELOAD_INTERVAL'] > 0:
+        graph_reloader.start_watching(app.config['GRAPH_RELOAD_INTERVAL'])
+    graph_renderer = GraphRenderer(
+        cache_dir=app.config['GRAPH_RENDER_CACHE_DIR'],
+        disk_max_files=app.config['GRAPH_RENDER_CACHE_MAX_FILES']
+    )
     
     # Инициализация модуля поиска (обратите внимание на правильные имена параметров)
     logger.info("Инициализация модуля поиска")
@@ -66,33 +87,141 @@ def init_modules(app):
     # Определяем, использовать ли моки
     use_mock = app.config.get('USE_MOCK_SERVICES', True)
     
+    # Общий для процесса пул соединений OpenSearch
+    opensearch_registry = get_registry(
+        host=app.config['OPENSEARCH_HOST'],
+        port=app.config['OPENSEARCH_PORT'],
+        pool_size=app.config['OPENSEARCH_POOL_SIZE'],
+        keep_alive=app.config['OPENSEARCH_KEEP_ALIVE'],
+        timeout=app.config['OPENSEARCH_TIMEOUT'],
+        health_check_interval=app.config['OPENSEARCH_HEALTH_INTERVAL']
+    )
+    
     # Проверяем доступность OpenSearch
-    if not use_mock:
-        try:
-            import requests
-            response = requests.get(f"http://{app.config['OPENSEARCH_HOST']}:{app.config['OPENSEARCH_PORT']}", timeout=3)
-            if response.status_code != 200:
-                logger.warning("OpenSearch недоступен, переключаемся на моки")
-                use_mock = True
-        except Exception as e:
-            logger.warning(f"Ошибка при проверке доступности OpenSearch: {str(e)}")
-            logger.warning("Переключаемся на моки")
-            use_mock = True
+    if not use_mock and not opensearch_registry.is_healthy(force=True):
+        logger.warning("OpenSearch недоступен, переключаемся на моки")
+        use_mock = True
     
     search_module = SearchModule(
         host=app.config['OPENSEARCH_HOST'],
         port=app.config['OPENSEARCH_PORT'],
         index_name=app.config['OPENSEARCH_INDEX'],
-        use_mock=use_mock
+        use_mock=use_mock,
+        client=opensearch_registry.client,
+        local_index_path=app.config.get('LOCAL_SEARCH_INDEX_FILE'),
+        hybrid_search=app.config.get('SEARCH_HYBRID', True)
     )
     
+    # Кэш результатов поиска; сбрасывается при записи в индекс
+    search_cache = SearchResultCache(
+        maxsize=app.config['SEARCH_CACHE_SIZE'],
+        ttl=app.config['SEARCH_CACHE_TTL'],
+        stale_ttl=app.config['SEARCH_CACHE_STALE_TTL']
+    )
+    search_module.add_change_listener(search_cache.invalidate)
+    
+    # Подсказки по документам OpenSearch (в режиме моков они строятся по офлайн-индексу)
+    if not search_module.use_mock:
+        try:
+            search_module.reload_suggestions()
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке подсказок поиска из OpenSearch: {str(e)}")
+    
+    # Фоновая инкрементальная синхронизация MediaWiki -> OpenSearch
+    sync_interval = app.config['MEDIAWIKI_SYNC_INTERVAL']
+    if sync_interval > 0 and app.config['USE_MEDIAWIKI'] and app.config.get('MEDIAWIKI_URL') and not search_module.use_mock:
+        pipeline = MediaWikiIndexPipeline(
+            mediawiki_url=app.config['MEDIAWIKI_URL'],
+            client=opensearch_registry.client,
+            index_name=app.config['OPENSEARCH_INDEX'],
+            workers=app.config['INDEXER_WORKERS'],
+            batch_size=app.config['INDEXER_BATCH_SIZE']
+        )
+        
+        def on_mediawiki_change(indexed_ids, deleted_ids):
+            search_cache.invalidate()
+            # Подсказки обновляются только по измененным страницам (None - после полной индексации)
+            for doc_id in deleted_ids or ():
+                search_module.suggest_index.remove_document(doc_id)
+            search_module.suggest_index.add_documents(mediawiki_sync.page_documents(indexed_ids))
+        
+        mediawiki_sync = MediaWikiIncrementalSync(
+            pipeline,
+            app.config['MEDIAWIKI_SYNC_STATE_FILE'],
+            on_change=on_mediawiki_change
+        )
+        mediawiki_sync.start_background(sync_interval)
+    
+    # Общий пул для параллельного поиска по источникам
+    federated_search = FederatedSearch(max_workers=app.config['SEARCH_MAX_WORKERS'])
+    
     # Инициализация модуля Service Desk
     logger.info("Инициализация модуля Service Desk")
     service_desk = ServiceDeskModule(
         api_url=app.config['SERVICEDESK_URL'],
         api_key=app.config['SERVICEDESK_API_KEY'],
-        use_mock=app.config['USE_MOCK_SERVICES']
+        use_mock=app.config['USE_MOCK_SERVICES'],
+        http_options={
+            'pool_size': app.config['SERVICEDESK_POOL_SIZE'],
+            'read_timeout': app.config['SERVICEDESK_TIMEOUT'],
+            'retries': app.config['SERVICEDESK_RETRIES'],
+            'failure_threshold': app.config['SERVICEDESK_BREAKER_THRESHOLD'],
+            'reset_timeout': app.config['SERVICEDESK_BREAKER_RESET']
+        },
+        cache_size=app.config['SERVICEDESK_CACHE_SIZE'],
+        cache_ttl=app.config['SERVICEDESK_CACHE_TTL']
     )
+    
+    # Фоновый подбор решений для новых заявок (ограниченная очередь, не блокирует создание)
+    if app.config['TICKET_AUTO_SOLUTIONS']:
+        ticket_pool = BackgroundWorkerPool(
+            workers=app.config['TICKET_JOB_WORKERS'],
+            queue_size=app.config['TICKET_JOB_QUEUE_SIZE'],
+            name='ticket-solutions'
+        )
+        ticket_pool.start()
+        ticket_suggester = TicketSolutionSuggester(
+            search_module,
+            service_desk,
+            ticket_pool,
+            top_k=app.config['TICKET_SOLUTIONS_TOP_K'],
+            min_similarity=app.config['TICKET_SOLUTIONS_MIN_SIMILARITY'],
+            mediawiki_url=app.config.get('MEDIAWIKI_URL') if app.config['USE_MEDIAWIKI'] else None
+        )
+
+def load_decision_graph(filename, runtime='compact'):
+    """
+    Загрузка графа решений
+    
+    Args:
+        filename (str): Путь к файлу графа (JSON или бинарный формат graph_converter.py)
+        runtime (str): 'compact' - компактное представление только для чтения (без networkx),
+            'networkx' - редактируемый DecisionGraph
+    """
+    if is_binary_graph(filename):
+        # Бинарный граф отображается в память и разделяется всеми воркерами
+        logger.info(f"Загружаем граф решений из бинарного файла {filename}")
+        graph = load_binary(filename)
+        return graph if runtime == 'compact' else graph.to_decision_graph()
+    
+    if runtime == 'compact' and os.path.exists(filename):
+        logger.info(f"Загружаем граф решений из файла {filename} (компактное представление)")
+        return CompactDecisionGraph.load_from_file(filename)
+    
+    # networkx нужен только для редактируемого графа и создания примера
+    from app.modules.decision_graph import DecisionGraph, create_sample_graph
+    if os.path.exists(filename):
+        logger.info(f"Загружаем граф решений из файла {filename}")
+        graph = DecisionGraph.load_from_file(filename)
+    else:
+        # Создаем пример графа
+        logger.info("Создаем пример графа решений")
+        graph = create_sample_graph()
+        graph.save_to_file(filename)
+    if runtime == 'compact':
+        return CompactDecisionGraph.from_decision_graph(graph)
+    return graph
+
 def add_swagger_ui(app):
     """Добавление Swagger UI к приложению Flask"""
     logger.info("Инициализация Swagger UI")
@@ -11,6 +11,10 @@ class Config:
     OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST') or 'localhost'
     OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT') or 9200)
     OPENSEARCH_INDEX = os.environ.get('OPENSEARCH_INDEX') or 'solutions'
+    OPENSEARCH_POOL_SIZE = int(os.environ.get('OPENSEARCH_POOL_SIZE') or 10)
+    OPENSEARCH_KEEP_ALIVE = os.environ.get('OPENSEARCH_KEEP_ALIVE', 'True').lower() == 'true'
+    OPENSEARCH_TIMEOUT = float(os.environ.get('OPENSEARCH_TIMEOUT') or 30)
+    OPENSEARCH_HEALTH_INTERVAL = float(os.environ.get('OPENSEARCH_HEALTH_INTERVAL') or 10)
     
     # Настройки MediaWiki
     MEDIAWIKI_URL = os.environ.get('MEDIAWIKI_URL')
@@ -18,12 +22,68 @@ class Config:
     MEDIAWIKI_PASSWORD = os.environ.get('MEDIAWIKI_PASSWORD')
     USE_MEDIAWIKI = os.environ.get('USE_MEDIAWIKI', 'True').lower() == 'true'
     
+    # Настройки индексации MediaWiki (интервал синхронизации 0 - фоновая синхронизация выключена)
+    INDEXER_WORKERS = int(os.environ.get('INDEXER_WORKERS') or 8)
+    INDEXER_BATCH_SIZE = int(os.environ.get('INDEXER_BATCH_SIZE') or 200)
+    MEDIAWIKI_SYNC_INTERVAL = float(os.environ.get('MEDIAWIKI_SYNC_INTERVAL') or 0)
+    MEDIAWIKI_SYNC_STATE_FILE = os.environ.get('MEDIAWIKI_SYNC_STATE_FILE') or 'mediawiki_sync_state.json'
+    
+    # Настройки федеративного поиска (бюджеты источников в секундах)
+    SEARCH_MAX_WORKERS = int(os.environ.get('SEARCH_MAX_WORKERS') or 16)
+    SEARCH_TIMEOUT_OPENSEARCH = float(os.environ.get('SEARCH_TIMEOUT_OPENSEARCH') or 3)
+    SEARCH_TIMEOUT_MEDIAWIKI = float(os.environ.get('SEARCH_TIMEOUT_MEDIAWIKI') or 5)
+    SEARCH_TIMEOUT_MOCK = float(os.environ.get('SEARCH_TIMEOUT_MOCK') or 1)
+    
+    # Единое ранжирование: нормализация оценок источников (minmax, zscore, rrf) и размер выдачи
+    SEARCH_RANKING_METHOD = os.environ.get('SEARCH_RANKING_METHOD') or 'minmax'
+    SEARCH_DEFAULT_SIZE = int(os.environ.get('SEARCH_DEFAULT_SIZE') or 10)
+    SEARCH_MAX_SIZE = int(os.environ.get('SEARCH_MAX_SIZE') or 50)
+    
+    # Пакетный поиск: одновременные задачи, запросов в одном _msearch, максимум запросов в пакете
+    SEARCH_BATCH_CONCURRENCY = int(os.environ.get('SEARCH_BATCH_CONCURRENCY') or 4)
+    SEARCH_BATCH_CHUNK_SIZE = int(os.environ.get('SEARCH_BATCH_CHUNK_SIZE') or 50)
+    SEARCH_BATCH_MAX_QUERIES = int(os.environ.get('SEARCH_BATCH_MAX_QUERIES') or 10000)
+    
+    # Кэш результатов поиска (TTL свежести и дополнительное время выдачи устаревших результатов)
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE') or 1000)
+    SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL') or 60)
+    SEARCH_CACHE_STALE_TTL = float(os.environ.get('SEARCH_CACHE_STALE_TTL') or 300)
+    
+    # Файл локального поискового индекса (офлайн-поиск); пустое значение - индекс только в памяти
+    LOCAL_SEARCH_INDEX_FILE = os.environ.get('LOCAL_SEARCH_INDEX_FILE', 'local_search_index.idx')
+    # Гибридный офлайн-поиск: BM25 + векторный поиск по хэшированным n-граммам (RRF)
+    SEARCH_HYBRID = os.environ.get('SEARCH_HYBRID', 'True').lower() == 'true'
+    
     # Настройки Service Desk
     SERVICEDESK_URL = os.environ.get('SERVICEDESK_URL')
     SERVICEDESK_API_KEY = os.environ.get('SERVICEDESK_API_KEY')
+    SERVICEDESK_POOL_SIZE = int(os.environ.get('SERVICEDESK_POOL_SIZE') or 10)
+    SERVICEDESK_TIMEOUT = float(os.environ.get('SERVICEDESK_TIMEOUT') or 10)
+    SERVICEDESK_RETRIES = int(os.environ.get('SERVICEDESK_RETRIES') or 3)
+    SERVICEDESK_BREAKER_THRESHOLD = int(os.environ.get('SERVICEDESK_BREAKER_THRESHOLD') or 5)
+    SERVICEDESK_BREAKER_RESET = float(os.environ.get('SERVICEDESK_BREAKER_RESET') or 30)
+    SERVICEDESK_CACHE_SIZE = int(os.environ.get('SERVICEDESK_CACHE_SIZE') or 1000)
+    SERVICEDESK_CACHE_TTL = float(os.environ.get('SERVICEDESK_CACHE_TTL') or 30)
+    
+    # Автоматический подбор решений для новых заявок в фоновом пуле
+    TICKET_AUTO_SOLUTIONS = os.environ.get('TICKET_AUTO_SOLUTIONS', 'True').lower() == 'true'
+    TICKET_JOB_WORKERS = int(os.environ.get('TICKET_JOB_WORKERS') or 2)
+    TICKET_JOB_QUEUE_SIZE = int(os.environ.get('TICKET_JOB_QUEUE_SIZE') or 100)
+    TICKET_SOLUTIONS_TOP_K = int(os.environ.get('TICKET_SOLUTIONS_TOP_K') or 3)
+    # Минимальная косинусная близость текста заявки и решения (абсолютный порог, не зависит от источника)
+    TICKET_SOLUTIONS_MIN_SIMILARITY = float(os.environ.get('TICKET_SOLUTIONS_MIN_SIMILARITY') or 0.25)
     
     # Настройки приложения
+    # Файл графа: JSON или бинарный формат (см. graph_converter.py)
     GRAPH_DATA_FILE = os.environ.get('GRAPH_DATA_FILE') or 'graph_data.json'
+    # Представление графа: 'compact' (только чтение, без networkx) или 'networkx' (редактируемое)
+    GRAPH_RUNTIME = os.environ.get('GRAPH_RUNTIME') or 'compact'
+    # Интервал проверки изменений файла графа в секундах (0 - только через POST /api/admin/graph/reload)
+    GRAPH_RELOAD_INTERVAL = float(os.environ.get('GRAPH_RELOAD_INTERVAL') or 5)
+    # Дисковый кэш отрисовок графа (SVG по хэшу содержимого)
+    GRAPH_RENDER_CACHE_DIR = os.environ.get('GRAPH_RENDER_CACHE_DIR') or 'graph_render_cache'
+    # Максимальное количество файлов в дисковом кэше отрисовок (старые удаляются)
+    GRAPH_RENDER_CACHE_MAX_FILES = int(os.environ.get('GRAPH_RENDER_CACHE_MAX_FILES') or 256)
     USE_MOCK_SERVICES = os.environ.get('USE_MOCK_SERVICES', 'True').lower() == 'true'
     
     # Настройки API и Swagger
@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorkerPool:
+    """
+    Пул фоновых потоков с ограниченной очередью задач.
+
+    Постановка задачи никогда не блокирует вызывающий поток: если очередь
+    заполнена (например, при всплеске заявок), задача отбрасывается и
+    учитывается в счетчике dropped. Потоки обработки запросов не ждут
+    фоновую работу, а число одновременно выполняемых задач ограничено
+    количеством воркеров.
+    """
+
+    def __init__(self, workers=2, queue_size=100, name='background'):
+        """
+        Args:
+            workers (int): Количество потоков-воркеров
+            queue_size (int): Максимальное количество ожидающих задач
+            name (str): Префикс имен потоков (для логов и мониторинга)
+        """
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        """Запустить потоки-воркеры"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Запущен пул фоновых задач {self.name}: {self.workers} потоков, "
+                    f"очередь {self._queue.maxsize}")
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Поставить задачу в очередь без ожидания
+
+        Returns:
+            bool: False, если очередь заполнена и задача отброшена
+        """
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"Очередь фоновых задач {self.name} заполнена, задача отброшена")
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                func, args, kwargs = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                func(*args, **kwargs)
+                with self._lock:
+                    self.completed += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.error(f"Ошибка фоновой задачи {self.name}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def stop(self, timeout=5):
+        """Остановить воркеры (задачи, оставшиеся в очереди, не выполняются)"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def stats(self):
+        """Счетчики пула для мониторинга"""
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
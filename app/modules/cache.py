@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Признак отсутствия значения в кэше (None - допустимое значение)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Потокобезопасный LRU-кэш с ограничением размера и временем жизни записей.
+
+    При переполнении вытесняется давно не использовавшаяся запись, устаревшие
+    записи удаляются при обращении. Счетчики попаданий и промахов доступны
+    через stats() для настройки размера и TTL.
+    """
+
+    def __init__(self, maxsize=1000, ttl=30):
+        """
+        Args:
+            maxsize (int): Максимальное количество записей
+            ttl (float): Время жизни записи в секундах
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=MISSING):
+        """Получить значение по ключу (default, если записи нет или она устарела)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Сохранить значение"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, cache_none=False):
+        """
+        Получить значение из кэша или загрузить его (read-through)
+
+        Args:
+            key: Ключ
+            loader (callable): Функция загрузки значения при промахе
+            cache_none (bool): Кэшировать ли результат None
+
+        Returns:
+            Значение из кэша или результат loader()
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        value = loader()
+        if value is not None or cache_none:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Удалить запись по ключу"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Удалить все записи"""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Счетчики кэша для мониторинга"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,271 @@
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from app.modules.compiled_graph import CompiledGraph
+
+
+class NodeRecord:
+    """Запись узла компактного графа"""
+
+    __slots__ = ('index', 'id', 'content', 'type')
+
+    def __init__(self, index, node_id, content, node_type):
+        self.index = index
+        self.id = node_id
+        self.content = content
+        self.type = node_type
+
+
+class CompactDecisionGraph:
+    """
+    Компактное неизменяемое представление графа решений (только для чтения).
+
+    Идентификаторы, тексты и метки хранятся один раз в таблице строк, узлы -
+    параллельными массивами индексов в этой таблице, ребра - в формате CSR:
+    смещения исходящих ребер узла (offsets) и массивы целей и меток ребер.
+    Узел по ID находится двоичным поиском в массиве номеров узлов,
+    упорядоченных по ID (id_order), без словаря в памяти процесса, поэтому
+    граф, отображенный из файла, не копируется в каждый воркер.
+    Публичные методы совпадают с DecisionGraph; networkx нужен только для
+    редактирования и проверки графа (to_decision_graph).
+    """
+
+    __slots__ = ('_strings', '_node_ids', '_node_contents', '_node_types',
+                 '_offsets', '_targets', '_labels', '_id_order', '_root', '_compiled')
+
+    # Количество готовых ответов узлов в кэше скомпилированного представления
+    NODE_CACHE_SIZE = 4096
+
+    def __init__(self, strings, node_ids, node_contents, node_types, offsets, targets, labels,
+                 id_order=None):
+        """
+        Args:
+            strings (sequence): Таблица строк
+            node_ids, node_contents, node_types (sequence of int): Индексы строк для каждого узла
+            offsets (sequence of int): Смещения ребер узла i: targets[offsets[i]:offsets[i + 1]]
+            targets (sequence of int): Номера дочерних узлов
+            labels (sequence of int): Индексы строк меток ребер
+            id_order (sequence of int, optional): Номера узлов по возрастанию ID;
+                если не указан, вычисляется
+        """
+        self._strings = strings
+        self._node_ids = node_ids
+        self._node_contents = node_contents
+        self._node_types = node_types
+        self._offsets = offsets
+        self._targets = targets
+        self._labels = labels
+        if id_order is None:
+            id_order = array('I', sorted(range(len(node_ids)), key=lambda i: strings[node_ids[i]]))
+        self._id_order = id_order
+        self._root = self._find_root()
+        self._compiled = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Построить граф из словаря в формате graph_data.json
+
+        Args:
+            data (dict): {'nodes': [{'id', 'content', 'type'}], 'edges': [{'source', 'target', 'label'}]}
+
+        Returns:
+            CompactDecisionGraph: Построенный граф
+        """
+        strings = []
+        string_index = {}
+
+        def intern(value):
+            value = value or ''
+            string_id = string_index.get(value)
+            if string_id is None:
+                string_id = len(strings)
+                string_index[value] = string_id
+                strings.append(sys.intern(value))
+            return string_id
+
+        index = {}
+        node_ids = array('I')
+        node_contents = array('I')
+        node_types = array('I')
+        for node in data['nodes']:
+            i = index.get(node['id'])
+            if i is None:
+                index[node['id']] = len(node_ids)
+                node_ids.append(intern(node['id']))
+                node_contents.append(intern(node['content']))
+                node_types.append(intern(node['type']))
+            else:
+                # Повторное описание узла обновляет его атрибуты (как в DiGraph)
+                node_contents[i] = intern(node['content'])
+                node_types[i] = intern(node['type'])
+
+        children = {}
+        for edge in data['edges']:
+            source = index.get(edge['source'])
+            target = index.get(edge['target'])
+            if source is None or target is None:
+                raise ValueError(f"Ребро {edge['source']} -> {edge['target']} ссылается на неизвестный узел")
+            children.setdefault(source, {})[target] = intern(edge.get('label'))
+
+        offsets = array('I', [0])
+        targets = array('I')
+        labels = array('I')
+        for i in range(len(node_ids)):
+            for target, label in children.get(i, {}).items():
+                targets.append(target)
+                labels.append(label)
+            offsets.append(len(targets))
+
+        return cls(strings, node_ids, node_contents, node_types, offsets, targets, labels)
+
+    @classmethod
+    def from_decision_graph(cls, graph):
+        """Построить компактный граф из DecisionGraph"""
+        return cls.from_dict(graph_to_dict(graph))
+
+    @classmethod
+    def load_from_file(cls, filename):
+        """Загружает граф из JSON-файла"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls.from_dict(data)
+
+    def _find_root(self):
+        """Первый узел без входящих ребер"""
+        has_parent = bytearray(len(self._node_ids))
+        for target in self._targets:
+            has_parent[target] = 1
+        for i, flag in enumerate(has_parent):
+            if not flag:
+                return self._strings[self._node_ids[i]]
+        return None
+
+    def __len__(self):
+        return len(self._node_ids)
+
+    def _find(self, node_id):
+        """Номер узла по ID (двоичный поиск) или None"""
+        if not isinstance(node_id, str):
+            return None
+        strings, node_ids, order = self._strings, self._node_ids, self._id_order
+        pos = bisect_left(order, node_id, key=lambda i: strings[node_ids[i]])
+        if pos < len(order) and strings[node_ids[order[pos]]] == node_id:
+            return order[pos]
+        return None
+
+    def _lookup(self, node_id):
+        """Номер узла по ID (KeyError, если узла нет)"""
+        i = self._find(node_id)
+        if i is None:
+            raise KeyError(node_id)
+        return i
+
+    @property
+    def compiled(self):
+        """Скомпилированное представление графа (CompiledGraph); граф не меняется, поэтому строится один раз"""
+        if self._compiled is None:
+            self._compiled = CompiledGraph(self, node_cache_size=self.NODE_CACHE_SIZE)
+        return self._compiled
+
+    def has_node(self, node_id):
+        """Проверяет наличие узла"""
+        return self._find(node_id) is not None
+
+    def get_node_ids(self):
+        """Возвращает список ID всех узлов"""
+        strings = self._strings
+        return [strings[string_id] for string_id in self._node_ids]
+
+    def get_node(self, node_id):
+        """Возвращает запись узла (NodeRecord)"""
+        i = self._lookup(node_id)
+        strings = self._strings
+        return NodeRecord(i, node_id, strings[self._node_contents[i]], strings[self._node_types[i]])
+
+    def get_root_node(self):
+        """Возвращает корневой узел (не имеющий входящих ребер)"""
+        return self._root
+
+    def get_node_content(self, node_id):
+        """Возвращает содержимое узла"""
+        return self._strings[self._node_contents[self._lookup(node_id)]]
+
+    def get_node_type(self, node_id):
+        """Возвращает тип узла"""
+        return self._strings[self._node_types[self._lookup(node_id)]]
+
+    def get_children(self, node_id):
+        """Возвращает дочерние узлы с метками переходов"""
+        i = self._lookup(node_id)
+        strings = self._strings
+        children = []
+        for edge in range(self._offsets[i], self._offsets[i + 1]):
+            child = self._targets[edge]
+            children.append({
+                'id': strings[self._node_ids[child]],
+                'label': strings[self._labels[edge]],
+                'content': strings[self._node_contents[child]],
+                'type': strings[self._node_types[child]]
+            })
+        return children
+
+    def is_solution(self, node_id):
+        """Проверяет, является ли узел решением"""
+        return self.get_node_type(node_id) == 'solution'
+
+    def to_dict(self):
+        """Граф в формате graph_data.json"""
+        strings = self._strings
+        nodes = []
+        edges = []
+        for i, string_id in enumerate(self._node_ids):
+            node_id = strings[string_id]
+            nodes.append({
+                'id': node_id,
+                'content': strings[self._node_contents[i]],
+                'type': strings[self._node_types[i]]
+            })
+            for edge in range(self._offsets[i], self._offsets[i + 1]):
+                edges.append({
+                    'source': node_id,
+                    'target': strings[self._node_ids[self._targets[edge]]],
+                    'label': strings[self._labels[edge]]
+                })
+        return {'nodes': nodes, 'edges': edges}
+
+    def save_to_file(self, filename):
+        """Сохраняет граф в JSON-файл"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def to_decision_graph(self):
+        """Редактируемая копия графа на networkx (DecisionGraph)"""
+        from app.modules.decision_graph import DecisionGraph
+        graph = DecisionGraph()
+        data = self.to_dict()
+        for node in data['nodes']:
+            graph.add_node(node['id'], node['content'], node['type'])
+        for edge in data['edges']:
+            graph.add_edge(edge['source'], edge['target'], edge['label'])
+        return graph
+
+    def visualize(self):
+        """Создает DOT-представление графа для визуализации"""
+        return self.to_decision_graph().visualize()
+
+
+def graph_to_dict(graph):
+    """Граф с публичным API DecisionGraph в формате graph_data.json"""
+    nodes = []
+    edges = []
+    for node_id in graph.get_node_ids():
+        nodes.append({
+            'id': node_id,
+            'content': graph.get_node_content(node_id),
+            'type': graph.get_node_type(node_id)
+        })
+        for child in graph.get_children(node_id):
+            edges.append({'source': node_id, 'target': child['id'], 'label': child['label']})
+    return {'nodes': nodes, 'edges': edges}
@@ -0,0 +1,172 @@
+import hashlib
+import json
+from app.modules.cache import TTLCache
+
+
+class CompiledGraph:
+    """
+    Неизменяемое скомпилированное представление графа решений для выдачи через API.
+
+    Корневой узел вычисляется один раз, ответы для узлов (вместе с дочерними
+    узлами) хранятся уже сериализованными в JSON. Для изменяемого графа
+    (DecisionGraph) ответы всех узлов собираются заранее - представление
+    не зависит от последующих правок. Для неизменяемого графа (в том числе
+    отображенного в память) ответы собираются при первом обращении и хранятся
+    в ограниченном кэше, поэтому воркеры не копируют весь граф в свою память.
+    """
+
+    def __init__(self, graph, version=0, subtree_cache_size=1024, node_cache_size=None):
+        """
+        Args:
+            graph: Граф с методами has_node, get_root_node, get_node_ids,
+                get_node_content, get_node_type и get_children
+            version (int): Версия исходного графа, из которой собрано представление
+            subtree_cache_size (int): Количество сериализованных поддеревьев в кэше
+            node_cache_size (int, optional): Количество готовых ответов узлов в кэше;
+                None - ответы всех узлов собираются сразу
+        """
+        self.version = version
+        # Представление неизменяемо, поэтому записи кэша не устаревают
+        self._subtrees = TTLCache(maxsize=subtree_cache_size, ttl=float('inf'))
+        self._analytics = None
+        self.root_id = graph.get_root_node()
+        if node_cache_size is None:
+            self._graph = None
+            self._nodes = {}
+            for node_id in graph.get_node_ids():
+                payload = self._build_payload(graph, node_id)
+                self._nodes[node_id] = (payload, self._serialize(payload))
+        else:
+            self._graph = graph
+            self._nodes = TTLCache(maxsize=node_cache_size, ttl=float('inf'))
+
+    @staticmethod
+    def _build_payload(graph, node_id):
+        return {
+            'id': node_id,
+            'content': graph.get_node_content(node_id),
+            'type': graph.get_node_type(node_id),
+            'children': graph.get_children(node_id)
+        }
+
+    @staticmethod
+    def _serialize(payload):
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    def _entry(self, node_id):
+        """Ответ узла и его JSON (или None, если узла нет)"""
+        if self._graph is None:
+            return self._nodes.get(node_id)
+        entry = self._nodes.get(node_id, None)
+        if entry is None and self._graph.has_node(node_id):
+            payload = self._build_payload(self._graph, node_id)
+            entry = (payload, self._serialize(payload))
+            self._nodes.set(node_id, entry)
+        return entry
+
+    def _payload(self, node_id):
+        """Ответ узла без сериализации и без заполнения кэша (для обходов)"""
+        if self._graph is None:
+            return self._nodes[node_id][0]
+        entry = self._nodes.get(node_id, None)
+        if entry is not None:
+            return entry[0]
+        return self._build_payload(self._graph, node_id)
+
+    def iter_payloads(self):
+        """Ответы всех узлов (для полного обхода графа: аналитика, визуализация)"""
+        if self._graph is None:
+            for payload, _ in self._nodes.values():
+                yield payload
+        else:
+            for node_id in self._graph.get_node_ids():
+                yield self._payload(node_id)
+
+    @property
+    def analytics(self):
+        """Аналитика графа (GraphAnalytics), строится один раз для представления"""
+        if self._analytics is None:
+            from app.modules.graph_analytics import GraphAnalytics
+            self._analytics = GraphAnalytics(self)
+        return self._analytics
+
+    def resolve(self, node_id):
+        """Преобразует 'root' в ID корневого узла"""
+        return self.root_id if node_id == 'root' else node_id
+
+    def has_node(self, node_id):
+        """Проверяет наличие узла"""
+        node_id = self.resolve(node_id)
+        if self._graph is None:
+            return node_id in self._nodes
+        return self._graph.has_node(node_id)
+
+    def get_node(self, node_id):
+        """Возвращает готовый ответ для узла (или None)"""
+        entry = self._entry(self.resolve(node_id))
+        return entry[0] if entry is not None else None
+
+    def get_node_json(self, node_id):
+        """Возвращает сериализованный в JSON ответ для узла (или None)"""
+        entry = self._entry(self.resolve(node_id))
+        return entry[1] if entry is not None else None
+
+    def get_subtree(self, node_id, depth=None):
+        """
+        Узел вместе с потомками до глубины depth
+
+        Каждый узел входит в ответ один раз (общие поддеревья не дублируются),
+        дочерние узлы перечисляются ссылками {'id', 'label'}. У узлов на границе
+        глубины, имеющих потомков, поле children отсутствует.
+
+        Args:
+            node_id (str): ID узла или 'root'
+            depth (int, optional): Глубина; None - все поддерево
+
+        Returns:
+            dict: {'root', 'depth', 'nodes': {id: {'content', 'type', 'children'}}} или None
+        """
+        root_id = self.resolve(node_id)
+        if not self.has_node(root_id):
+            return None
+        nodes = {}
+        seen = {root_id}
+        frontier = [root_id]
+        level = 0
+        while frontier:
+            expand = depth is None or level < depth
+            next_frontier = []
+            for current in frontier:
+                payload = self._payload(current)
+                entry = {'content': payload['content'], 'type': payload['type']}
+                if expand or not payload['children']:
+                    entry['children'] = [{'id': child['id'], 'label': child['label']}
+                                         for child in payload['children']]
+                if expand:
+                    for child in payload['children']:
+                        if child['id'] not in seen:
+                            seen.add(child['id'])
+                            next_frontier.append(child['id'])
+                nodes[current] = entry
+            frontier = next_frontier
+            level += 1
+        return {'root': root_id, 'depth': depth, 'nodes': nodes}
+
+    def get_subtree_json(self, node_id, depth=None):
+        """
+        Сериализованное поддерево и его ETag (с кэшированием)
+
+        Returns:
+            tuple: (JSON в байтах, ETag) или None, если узла нет
+        """
+        key = (self.resolve(node_id), depth)
+        cached = self._subtrees.get(key, None)
+        if cached is not None:
+            return cached
+        subtree = self.get_subtree(node_id, depth)
+        if subtree is None:
+            return None
+        body = json.dumps(subtree, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        result = (body, hashlib.sha1(body).hexdigest())
+        self._subtrees.set(key, result)
+        return result
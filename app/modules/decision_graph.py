@@ -1,11 +1,18 @@
 import json
+import threading
 import pydot
 import networkx as nx
+from app.modules.compiled_graph import CompiledGraph
+
 
 class DecisionGraph:
     def __init__(self):
         # Создаем направленный ациклический граф
         self.graph = nx.DiGraph()
+        # Версия увеличивается при каждом изменении графа через add_node/add_edge
+        self._version = 0
+        self._compiled = None
+        self._compile_lock = threading.Lock()
         
     def add_node(self, node_id, content, node_type):
         """
@@ -17,6 +24,7 @@ class DecisionGraph:
             node_type (str): Тип узла ('question' или 'solution')
         """
         self.graph.add_node(node_id, content=content, type=node_type)
+        self._version += 1
         
     def add_edge(self, parent_id, child_id, label=None):
         """
@@ -28,6 +36,27 @@ class DecisionGraph:
             label (str, optional): Метка для перехода (ответ на вопрос)
         """
         self.graph.add_edge(parent_id, child_id, label=label)
+        self._version += 1
+        
+    @property
+    def compiled(self):
+        """
+        Скомпилированное представление графа (CompiledGraph)
+
+        Пересобирается только после изменения графа через add_node/add_edge.
+        """
+        compiled = self._compiled
+        if compiled is None or compiled.version != self._version:
+            with self._compile_lock:
+                compiled = self._compiled
+                if compiled is None or compiled.version != self._version:
+                    compiled = CompiledGraph(self, self._version)
+                    self._compiled = compiled
+        return compiled
+        
+    def get_node_ids(self):
+        """Возвращает список ID всех узлов"""
+        return list(self.graph.nodes())
         
     def get_root_node(self):
         """Возвращает корневой узел (не имеющий входящих ребер)"""
@@ -0,0 +1,123 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class SearchSource:
+    """
+    Описание одного источника федеративного поиска
+
+    Args:
+        name (str): Имя источника ('opensearch', 'mediawiki', 'mock', ...)
+        func (callable): Функция без аргументов, возвращающая список результатов
+        timeout (float): Бюджет времени источника в секундах
+    """
+
+    def __init__(self, name, func, timeout):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+
+
+class FederatedSearch:
+    """
+    Параллельный (федеративный) поиск по нескольким источникам.
+
+    Каждый источник запускается в общем пуле потоков и получает собственный
+    дедлайн. Результаты объединяются по мере поступления, поэтому время ответа
+    ограничено бюджетом самого медленного источника, а не суммой всех.
+    Источники, не уложившиеся в дедлайн или завершившиеся ошибкой, попадают
+    в отчет о статусах и не теряются молча.
+    """
+
+    def __init__(self, max_workers=16):
+        """
+        Инициализация движка
+
+        Args:
+            max_workers (int): Размер общего пула потоков для запросов к источникам
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='search-source'
+        )
+
+    def search(self, sources, grouped=False):
+        """
+        Выполнить поиск по всем источникам параллельно
+
+        Args:
+            sources (list): Список объектов SearchSource
+            grouped (bool): Вернуть результаты по источникам, а не общим списком
+
+        Returns:
+            tuple: (список результатов или словарь источник -> результаты,
+            словарь статусов источников)
+        """
+        started = time.monotonic()
+        futures = {}
+        report = {}
+
+        for source in sources:
+            future = self.executor.submit(self._run_source, source)
+            futures[future] = (source, started + source.timeout)
+
+        results = {} if grouped else []
+        pending = set(futures)
+        while pending:
+            nearest_deadline = min(futures[f][1] for f in pending)
+            timeout = max(0.0, nearest_deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = futures[future][0]
+                source_results, status = future.result()
+                report[source.name] = status
+                if grouped:
+                    results[source.name] = source_results
+                else:
+                    results.extend(source_results)
+
+            # Источники, у которых истек дедлайн, помечаем как опоздавшие
+            now = time.monotonic()
+            expired = {f for f in pending if futures[f][1] <= now}
+            for future in expired:
+                source = futures[future][0]
+                future.cancel()
+                report[source.name] = {
+                    'status': 'timeout',
+                    'count': 0,
+                    'took_ms': round((now - started) * 1000, 1),
+                    'error': f"Источник не ответил за {source.timeout} с"
+                }
+                logger.warning(f"Источник поиска {source.name} не уложился в {source.timeout} с")
+            pending -= expired
+
+        return results, report
+
+    def _run_source(self, source):
+        """Выполнить запрос к одному источнику и сформировать его статус"""
+        started = time.monotonic()
+        try:
+            source_results = source.func() or []
+            status = {
+                'status': 'ok',
+                'count': len(source_results),
+                'took_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+            return source_results, status
+        except Exception as e:
+            logger.error(f"Ошибка при поиске в источнике {source.name}: {str(e)}")
+            status = {
+                'status': 'error',
+                'count': 0,
+                'took_ms': round((time.monotonic() - started) * 1000, 1),
+                'error': str(e)
+            }
+            return [], status
+
+    def shutdown(self):
+        """Остановить пул потоков"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,292 @@
+from collections import deque
+
+
+class GraphAnalytics:
+    """
+    Предвычисленная аналитика графа решений.
+
+    Строится один раз для версии графа (по скомпилированному представлению)
+    за линейные проходы: компоненты сильной связности (циклы) и конденсация
+    графа, глубина от корня, кратчайшее и длиннейшее число шагов до решения,
+    достижимые решения, недостижимые узлы, узлы-сироты и тупиковые вопросы.
+
+    Достижимые решения хранятся диапазонами номеров: решения нумеруются
+    в порядке обхода в глубину от корня, поэтому у поддерева дерева все его
+    решения образуют один непрерывный диапазон, а общие узлы DAG добавляют
+    лишь несколько диапазонов вместо битовой маски на каждый узел. Диапазоны
+    хранятся на компоненту сильной связности: узлы цикла достигают одних и
+    тех же решений.
+    """
+
+    def __init__(self, compiled):
+        """
+        Args:
+            compiled (CompiledGraph): Скомпилированное представление графа
+        """
+        self.root_id = compiled.root_id
+        self.types = {}
+        children = {}
+        for payload in compiled.iter_payloads():
+            self.types[payload['id']] = payload['type']
+            children[payload['id']] = [child['id'] for child in payload['children']]
+        parents = {node_id: [] for node_id in children}
+        for node_id, child_ids in children.items():
+            for child_id in child_ids:
+                parents[child_id].append(node_id)
+        self.edge_count = sum(len(child_ids) for child_ids in children.values())
+
+        # Конденсация графа: циклы сворачиваются в одну вершину, и длиннейшие
+        # цепочки и достижимые решения считаются для всех узлов, в том числе выше циклов
+        self._components = self._strong_components(children)
+        self._component_of = {node_id: i for i, component in enumerate(self._components)
+                              for node_id in component}
+        self.order = [node_id for component in reversed(self._components) for node_id in component]
+        self.cyclic_nodes = [node_id for node_id in children
+                             if len(self._components[self._component_of[node_id]]) > 1
+                             or node_id in children[node_id]]
+        self.orphans = [node_id for node_id in children
+                        if not parents[node_id] and node_id != self.root_id]
+        self.depth = self._depths(children)
+        self.unreachable = [node_id for node_id in children if node_id not in self.depth]
+        self.distance = self._distances(parents)
+        self.dead_ends = [node_id for node_id in children if node_id not in self.distance]
+        self.longest = self._longest(children)
+        self._solutions = self._number_solutions(children)
+        self._ranges = self._reachable_ranges(children)
+
+    def _strong_components(self, children):
+        """
+        Компоненты сильной связности (итеративный алгоритм Тарьяна)
+
+        Returns:
+            list: Компоненты (списки ID узлов) в обратном топологическом порядке:
+                компоненты потомков идут раньше компонент предков
+        """
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for start_id in children:
+            if start_id in index:
+                continue
+            index[start_id] = low[start_id] = len(index)
+            stack.append(start_id)
+            on_stack.add(start_id)
+            work = [(start_id, iter(children[start_id]))]
+            while work:
+                node_id, child_ids = work[-1]
+                for child_id in child_ids:
+                    if child_id not in index:
+                        index[child_id] = low[child_id] = len(index)
+                        stack.append(child_id)
+                        on_stack.add(child_id)
+                        work.append((child_id, iter(children[child_id])))
+                        break
+                    if child_id in on_stack:
+                        low[node_id] = min(low[node_id], index[child_id])
+                else:
+                    work.pop()
+                    if work:
+                        parent_id = work[-1][0]
+                        low[parent_id] = min(low[parent_id], low[node_id])
+                    if low[node_id] == index[node_id]:
+                        component = []
+                        while True:
+                            member_id = stack.pop()
+                            on_stack.discard(member_id)
+                            component.append(member_id)
+                            if member_id == node_id:
+                                break
+                        components.append(component)
+        return components
+
+    def _child_components(self, children, i):
+        """Номера компонент, в которые ведут ребра из компоненты i (кроме нее самой)"""
+        targets = set()
+        for node_id in self._components[i]:
+            for child_id in children[node_id]:
+                j = self._component_of[child_id]
+                if j != i:
+                    targets.add(j)
+        return targets
+
+    def _depths(self, children):
+        """Кратчайшее число шагов от корня до каждого достижимого узла"""
+        if self.root_id is None:
+            return {}
+        depth = {self.root_id: 0}
+        queue = deque([self.root_id])
+        while queue:
+            node_id = queue.popleft()
+            for child_id in children[node_id]:
+                if child_id not in depth:
+                    depth[child_id] = depth[node_id] + 1
+                    queue.append(child_id)
+        return depth
+
+    def _distances(self, parents):
+        """Кратчайшее число шагов до ближайшего решения (поиск в ширину от всех решений)"""
+        distance = {node_id: 0 for node_id, node_type in self.types.items() if node_type == 'solution'}
+        queue = deque(distance)
+        while queue:
+            node_id = queue.popleft()
+            for parent_id in parents[node_id]:
+                if parent_id not in distance:
+                    distance[parent_id] = distance[node_id] + 1
+                    queue.append(parent_id)
+        return distance
+
+    def _longest(self, children):
+        """
+        Наибольшее число шагов до решения (None, если решение недостижимо)
+
+        Считается по конденсации графа: цикл проходится как одна вершина,
+        поэтому все узлы цикла получают одно значение.
+        """
+        by_component = []
+        for i, component in enumerate(self._components):
+            best = 0 if any(self.types[node_id] == 'solution' for node_id in component) else None
+            if best == 0 and len(component) == 1:
+                # Цепочка заканчивается на решении
+                by_component.append(best)
+                continue
+            for j in self._child_components(children, i):
+                if by_component[j] is not None and (best is None or by_component[j] + 1 > best):
+                    best = by_component[j] + 1
+            by_component.append(best)
+        longest = {}
+        for node_id, i in self._component_of.items():
+            if self.types[node_id] == 'solution':
+                longest[node_id] = 0
+            elif by_component[i] is not None:
+                longest[node_id] = by_component[i]
+        return longest
+
+    def _number_solutions(self, children):
+        """Нумерация решений в порядке обхода в глубину от корня (затем остальные)"""
+        solutions = []
+        numbered = set()
+        visited = set()
+        stack = [self.root_id] if self.root_id is not None else []
+        while stack:
+            node_id = stack.pop()
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            if self.types[node_id] == 'solution':
+                solutions.append(node_id)
+                numbered.add(node_id)
+            stack.extend(reversed(children[node_id]))
+        for node_id, node_type in self.types.items():
+            if node_type == 'solution' and node_id not in numbered:
+                solutions.append(node_id)
+        return solutions
+
+    def _reachable_ranges(self, children):
+        """Диапазоны номеров достижимых решений для каждой компоненты сильной связности"""
+        number = {node_id: i for i, node_id in enumerate(self._solutions)}
+        ranges = []
+        for i, component in enumerate(self._components):
+            spans = [(number[node_id], number[node_id]) for node_id in component if node_id in number]
+            for j in self._child_components(children, i):
+                spans.extend(ranges[j])
+            ranges.append(_merge_ranges(spans))
+        return ranges
+
+    def reachable_solutions(self, node_id):
+        """Решения, достижимые из узла"""
+        spans = self._ranges[self._component_of[node_id]]
+        return [solution for lo, hi in spans for solution in self._solutions[lo:hi + 1]]
+
+    def reachable_solution_count(self, node_id):
+        """Количество решений, достижимых из узла"""
+        spans = self._ranges[self._component_of[node_id]]
+        return sum(hi - lo + 1 for lo, hi in spans)
+
+    def node_stats(self, node_id, limit=100):
+        """
+        Аналитика по узлу
+
+        Args:
+            node_id (str): ID узла
+            limit (int): Максимальное количество перечисляемых решений
+
+        Returns:
+            dict: Аналитика узла или None, если узла нет
+        """
+        if node_id not in self.types:
+            return None
+        solutions = self.reachable_solutions(node_id)
+        return {
+            'id': node_id,
+            'type': self.types[node_id],
+            'depth': self.depth.get(node_id),
+            'distance_to_solution': self.distance.get(node_id),
+            'longest_to_solution': self.longest.get(node_id),
+            'reachable_solution_count': self.reachable_solution_count(node_id),
+            'reachable_solutions': solutions[:limit],
+            'on_cycle': node_id in self.cyclic_nodes
+        }
+
+    def summary(self, limit=100):
+        """
+        Сводка по графу
+
+        Args:
+            limit (int): Максимальная длина перечисляемых списков узлов
+
+        Returns:
+            dict: Размеры графа, проблемные узлы и самые длинные цепочки вопросов
+        """
+        questions = [node_id for node_id, node_type in self.types.items() if node_type == 'question']
+        longest_chains = sorted(
+            (node_id for node_id in questions if node_id in self.longest),
+            key=lambda node_id: self.longest[node_id],
+            reverse=True
+        )[:limit]
+        return {
+            'root': self.root_id,
+            'nodes': len(self.types),
+            'edges': self.edge_count,
+            'questions': len(questions),
+            'solutions': len(self._solutions),
+            'has_cycles': bool(self.cyclic_nodes),
+            'max_depth': max(self.depth.values(), default=0),
+            'max_distance_to_solution': max(self.distance.values(), default=0),
+            'root_longest_to_solution': self.longest.get(self.root_id),
+            'counts': {
+                'cyclic_nodes': len(self.cyclic_nodes),
+                'orphans': len(self.orphans),
+                'unreachable': len(self.unreachable),
+                'dead_ends': len(self.dead_ends)
+            },
+            'cyclic_nodes': self.cyclic_nodes[:limit],
+            'orphans': self.orphans[:limit],
+            'unreachable': self.unreachable[:limit],
+            'dead_ends': self.dead_ends[:limit],
+            'longest_chains': [
+                {
+                    'id': node_id,
+                    'longest_to_solution': self.longest[node_id],
+                    'distance_to_solution': self.distance[node_id]
+                }
+                for node_id in longest_chains
+            ]
+        }
+
+
+def _merge_ranges(spans):
+    """Объединить пересекающиеся и смежные диапазоны"""
+    if len(spans) <= 1:
+        return tuple(spans)
+    spans.sort()
+    merged = [spans[0]]
+    for lo, hi in spans[1:]:
+        last_lo, last_hi = merged[-1]
+        if lo <= last_hi + 1:
+            if hi > last_hi:
+                merged[-1] = (last_lo, hi)
+        else:
+            merged.append((lo, hi))
+    return tuple(merged)
@@ -0,0 +1,145 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from app.modules.compact_graph import CompactDecisionGraph
+
+# Формат файла (все числа - little-endian uint32):
+#   заголовок: MAGIC, версия, число строк, узлов, ребер, размер данных строк
+#   string_offsets[strings + 1]       - смещения строк в области данных
+#   node_ids, node_contents, node_types [nodes] - индексы строк узлов
+#   edge_offsets[nodes + 1]           - CSR: ребра узла i - [edge_offsets[i], edge_offsets[i + 1])
+#   edge_targets, edge_labels [edges] - номера дочерних узлов и индексы строк меток
+#   id_order[nodes]                   - номера узлов по возрастанию ID (с версии 2)
+#   данные строк (UTF-8)
+MAGIC = b'DGRAPH\x00\x00'
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+HEADER = struct.Struct('<8sIIIII')
+ITEM_SIZE = 4
+
+
+class StringTable:
+    """Таблица строк поверх буфера (например, mmap): строки декодируются при обращении"""
+
+    __slots__ = ('_offsets', '_data')
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+
+def is_binary_graph(filename):
+    """Проверяет, записан ли файл в бинарном формате графа"""
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def save_binary(graph, filename):
+    """
+    Сохранить граф в бинарном формате
+
+    Файл записывается во временный и атомарно подменяется, поэтому процессы,
+    уже отобразившие старую версию в память, продолжают работать с ней.
+
+    Args:
+        graph: CompactDecisionGraph или граф с публичным API DecisionGraph
+        filename (str): Путь к файлу
+    """
+    if not isinstance(graph, CompactDecisionGraph):
+        graph = CompactDecisionGraph.from_decision_graph(graph)
+
+    string_offsets = array('I', [0])
+    encoded = []
+    size = 0
+    for i in range(len(graph._strings)):
+        data = graph._strings[i].encode('utf-8')
+        encoded.append(data)
+        size += len(data)
+        string_offsets.append(size)
+
+    sections = [
+        string_offsets,
+        array('I', graph._node_ids),
+        array('I', graph._node_contents),
+        array('I', graph._node_types),
+        array('I', graph._offsets),
+        array('I', graph._targets),
+        array('I', graph._labels),
+        array('I', graph._id_order)
+    ]
+    if sys.byteorder != 'little':
+        for section in sections:
+            section.byteswap()
+
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded), len(graph._node_ids),
+                            len(graph._targets), size))
+        for section in sections:
+            section.tofile(f)
+        for data in encoded:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filename)
+
+
+def load_binary(filename):
+    """
+    Загрузить граф из бинарного файла без копирования
+
+    Файл отображается в память только для чтения: массивы узлов и ребер
+    и таблица строк работают прямо поверх страниц файла, которые разделяются
+    всеми процессами (воркерами gunicorn), открывшими тот же файл.
+
+    Returns:
+        CompactDecisionGraph: Граф поверх отображенного файла
+    """
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"Файл {filename} слишком короткий для бинарного графа")
+    magic, version, string_count, node_count, edge_count, data_size = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Файл {filename} не является бинарным графом")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Неподдерживаемая версия формата графа: {version}")
+
+    lengths = [string_count + 1, node_count, node_count, node_count, node_count + 1, edge_count, edge_count]
+    if version >= 2:
+        lengths.append(node_count)
+    expected = HEADER.size + sum(lengths) * ITEM_SIZE + data_size
+    if len(buffer) != expected:
+        raise ValueError(f"Файл {filename} поврежден: размер {len(buffer)}, ожидалось {expected}")
+
+    view = memoryview(buffer)
+    sections = []
+    position = HEADER.size
+    for length in lengths:
+        end = position + length * ITEM_SIZE
+        if sys.byteorder == 'little':
+            sections.append(view[position:end].cast('I'))
+        else:
+            section = array('I', view[position:end])
+            section.byteswap()
+            sections.append(section)
+        position = end
+
+    string_offsets, node_ids, node_contents, node_types, offsets, targets, labels = sections[:7]
+    # В файлах версии 1 порядок узлов по ID вычисляется при загрузке
+    id_order = sections[7] if version >= 2 else None
+    strings = StringTable(string_offsets, view[position:position + data_size])
+    return CompactDecisionGraph(strings, node_ids, node_contents, node_types, offsets, targets, labels,
+                                id_order)
@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NODE_TYPES = ('question', 'solution')
+
+
+def validate_graph(graph):
+    """
+    Проверка графа перед публикацией
+
+    Raises:
+        ValueError: Граф пуст, не имеет корня или содержит узлы неизвестного типа
+    """
+    node_ids = graph.get_node_ids()
+    if not node_ids:
+        raise ValueError("Граф не содержит узлов")
+    if graph.get_root_node() is None:
+        raise ValueError("В графе нет корневого узла (узла без входящих ребер)")
+    for node_id in node_ids:
+        node_type = graph.get_node_type(node_id)
+        if node_type not in NODE_TYPES:
+            raise ValueError(f"Узел {node_id} имеет неизвестный тип '{node_type}'")
+
+
+class GraphReloader:
+    """
+    Горячая перезагрузка графа решений без перезапуска приложения.
+
+    Новый граф загружается, проверяется и компилируется в фоновом потоке
+    (или в обработчике административного запроса), после чего ссылка на него
+    подменяется одним присваиванием. Читатели берут текущий граф из атрибута
+    graph без блокировок и всегда видят либо старую, либо полностью готовую
+    новую версию.
+    """
+
+    def __init__(self, filename, loader):
+        """
+        Args:
+            filename (str): Путь к файлу графа
+            loader (callable): Функция загрузки графа из файла: loader(filename) -> граф
+        """
+        self.filename = filename
+        self.loader = loader
+        self.graph = None
+        self.version = 0
+        # Ревизия загруженного файла: одинакова во всех процессах, читающих один файл
+        # (в отличие от счетчика version), по ней клиенты сбрасывают свои кэши
+        self.revision = None
+        self.loaded_at = None
+        self.last_error = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _file_signature(self):
+        """Отметка состояния файла (None, если файла нет)"""
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _build(self):
+        """Загрузить, проверить и скомпилировать граф"""
+        signature = self._file_signature()
+        graph = self.loader(self.filename)
+        validate_graph(graph)
+        # Компилируем и строим аналитику заранее, чтобы первый запрос к новой версии не ждал
+        graph.compiled.analytics
+        return graph, signature
+
+    def load(self):
+        """Начальная загрузка графа (ошибки пробрасываются)"""
+        with self._lock:
+            self._publish(*self._build())
+        return self.graph
+
+    def _publish(self, graph, signature):
+        self.graph = graph
+        self._signature = signature
+        self.revision = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+        self.version += 1
+        self.loaded_at = time.time()
+        self.last_error = None
+
+    def changed(self):
+        """Изменился ли файл графа с момента последней загрузки"""
+        signature = self._file_signature()
+        return signature is not None and signature != self._signature
+
+    def reload(self, force=False):
+        """
+        Перезагрузить граф, если файл изменился (или принудительно)
+
+        При ошибке загрузки или проверки продолжает работать текущий граф.
+
+        Args:
+            force (bool): Перезагрузить даже без изменений файла
+
+        Returns:
+            dict: {'reloaded', 'version', 'error'}
+        """
+        with self._lock:
+            if not force and not self.changed():
+                return {'reloaded': False, 'version': self.version, 'error': None}
+            try:
+                if self._file_signature() is None:
+                    raise FileNotFoundError(f"Файл графа {self.filename} не найден")
+                graph, signature = self._build()
+            except Exception as e:
+                self.last_error = str(e)
+                # Битый файл не перечитываем на каждом цикле, пока он не изменится снова
+                self._signature = self._file_signature()
+                logger.error(f"Ошибка при перезагрузке графа из {self.filename}: {str(e)}")
+                return {'reloaded': False, 'version': self.version, 'error': self.last_error}
+            self._publish(graph, signature)
+            logger.info(f"Граф решений перезагружен из {self.filename} (версия {self.version})")
+            return {'reloaded': True, 'version': self.version, 'error': None}
+
+    def start_watching(self, interval):
+        """
+        Отслеживать изменения файла графа в фоновом потоке
+
+        Args:
+            interval (float): Интервал проверки времени изменения файла в секундах
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Ошибка отслеживания файла графа: {str(e)}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=loop, name='graph-reloader', daemon=True)
+        self._thread.start()
+        logger.info(f"Отслеживание файла графа {self.filename} запущено (интервал {interval} с)")
+
+    def stop(self):
+        """Остановить отслеживание файла"""
+        self._stop_event.set()
+
+    def stats(self):
+        """Состояние перезагрузчика для мониторинга"""
+        return {
+            'file': self.filename,
+            'version': self.version,
+            'revision': self.revision,
+            'loaded_at': self.loaded_at,
+            'nodes': len(self.graph.get_node_ids()) if self.graph is not None else 0,
+            'runtime': type(self.graph).__name__,
+            'watching': bool(self._thread and self._thread.is_alive()),
+            'last_error': self.last_error
+        }
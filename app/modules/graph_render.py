@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import weakref
+from app.modules.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'dot': 'text/vnd.graphviz; charset=utf-8',
+    'svg': 'image/svg+xml'
+}
+
+
+def _quote(value):
+    """Строка в кавычках для DOT"""
+    value = str(value or '').replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{value}"'
+
+
+def build_dot(nodes, edges):
+    """
+    Текст DOT в оформлении DecisionGraph.visualize()
+
+    Args:
+        nodes (iterable): Пары (ID узла, {'content', 'type'})
+        edges (iterable): Тройки (ID родителя, ID потомка, метка)
+
+    Returns:
+        str: Описание графа на языке DOT
+    """
+    lines = ['digraph G {']
+    for node_id, node in nodes:
+        label = f"{node_id}\n{node['content'][:30]}..."
+        if node['type'] == 'question':
+            style = 'shape=box, style=filled, fillcolor=lightblue'
+        else:
+            style = 'shape=ellipse, style=filled, fillcolor=lightgreen'
+        lines.append(f"{_quote(node_id)} [label={_quote(label)}, {style}];")
+    for source, target, label in edges:
+        lines.append(f"{_quote(source)} -> {_quote(target)} [label={_quote(label)}];")
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def graph_dot(compiled, node_id=None, depth=None):
+    """
+    DOT для всего графа или поддерева узла
+
+    Args:
+        compiled (CompiledGraph): Скомпилированное представление графа
+        node_id (str, optional): Корень поддерева; None - весь граф
+        depth (int, optional): Глубина поддерева; None - все поддерево
+
+    Returns:
+        str: Описание графа на языке DOT или None, если узла нет
+    """
+    if node_id is None:
+        payloads = list(compiled.iter_payloads())
+        nodes = ((payload['id'], payload) for payload in payloads)
+        edges = ((payload['id'], child['id'], child['label'])
+                 for payload in payloads for child in payload['children'])
+        return build_dot(nodes, edges)
+
+    subtree = compiled.get_subtree(node_id, depth)
+    if subtree is None:
+        return None
+    nodes = subtree['nodes']
+    edges = ((source, child['id'], child['label'])
+             for source, node in nodes.items() for child in node.get('children', ()))
+    return build_dot(nodes.items(), edges)
+
+
+class GraphRenderer:
+    """
+    Кэширующая отрисовка графа решений в DOT/SVG.
+
+    Текст DOT строится один раз для версии графа (скомпилированного
+    представления) и параметров запроса. SVG кэшируется по хэшу содержимого
+    DOT в памяти и на диске, поэтому повторная отрисовка не требуется ни после
+    перезапуска, ни в других воркерах, ни после перезагрузки того же графа.
+    Одновременные запросы одного артефакта ждут единственный запуск Graphviz;
+    на диске хранятся не более disk_max_files недавно использованных файлов.
+    """
+
+    # Возраст, после которого недописанный временный файл считается брошенным (с)
+    STALE_TMP_AGE = 3600
+
+    def __init__(self, cache_dir=None, memory_size=64, render_timeout=60, disk_max_files=256):
+        """
+        Args:
+            cache_dir (str, optional): Каталог дискового кэша SVG (None - только память)
+            memory_size (int): Количество артефактов в кэше памяти
+            render_timeout (float): Таймаут запуска Graphviz в секундах
+            disk_max_files (int): Максимальное количество файлов в дисковом кэше
+        """
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.render_timeout = render_timeout
+        self.disk_max_files = disk_max_files
+        self._artifacts = TTLCache(maxsize=memory_size, ttl=float('inf'))
+        self._versions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # Блокировки артефактов, которые сейчас загружаются или отрисовываются:
+        # {(хэш, формат): [блокировка, количество ожидающих]}
+        self._pending = {}
+        self.renders = 0
+        self.disk_hits = 0
+        self.pruned = 0
+
+    def _dot_for(self, compiled, node_id, depth):
+        """DOT и его хэш для версии графа (кэшируется на время жизни представления)"""
+        with self._lock:
+            dots = self._versions.get(compiled)
+            if dots is None:
+                dots = TTLCache(maxsize=self.memory_size, ttl=float('inf'))
+                self._versions[compiled] = dots
+        key = (node_id, depth)
+        cached = dots.get(key, None)
+        if cached is not None:
+            return cached
+        dot = graph_dot(compiled, node_id, depth)
+        if dot is None:
+            return None
+        data = dot.encode('utf-8')
+        result = (data, hashlib.sha256(data).hexdigest())
+        dots.set(key, result)
+        return result
+
+    def _disk_path(self, digest, fmt):
+        return os.path.join(self.cache_dir, f"{digest}.{fmt}")
+
+    def _run_graphviz(self, dot_data, fmt):
+        """Запустить Graphviz (dot) для получения артефакта"""
+        executable = shutil.which('dot')
+        if executable is None:
+            raise RuntimeError("Graphviz (dot) не установлен, доступен только формат dot")
+        try:
+            process = subprocess.run(
+                [executable, f"-T{fmt}"],
+                input=dot_data,
+                capture_output=True,
+                timeout=self.render_timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"Graphviz не уложился в {self.render_timeout} с")
+        if process.returncode != 0:
+            raise RuntimeError(f"Ошибка Graphviz: {process.stderr.decode('utf-8', 'replace').strip()}")
+        self.renders += 1
+        return process.stdout
+
+    def _artifact(self, dot_data, digest, fmt):
+        """Артефакт по хэшу DOT: память -> диск -> отрисовка (одна на хэш)"""
+        key = (digest, fmt)
+        data = self._artifacts.get(key, None)
+        if data is not None:
+            return data
+        with self._lock:
+            pending = self._pending.setdefault(key, [threading.Lock(), 0])
+            pending[1] += 1
+        try:
+            with pending[0]:
+                # Пока ждали блокировку, артефакт мог получить другой поток
+                data = self._artifacts.get(key, None)
+                if data is None:
+                    data = self._load_or_render(dot_data, digest, fmt)
+                    self._artifacts.set(key, data)
+                return data
+        finally:
+            with self._lock:
+                pending[1] -= 1
+                if pending[1] == 0:
+                    del self._pending[key]
+
+    def _load_or_render(self, dot_data, digest, fmt):
+        """Прочитать артефакт из дискового кэша или отрисовать и сохранить его"""
+        path = self._disk_path(digest, fmt) if self.cache_dir else None
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                # Время изменения - отметка последнего использования для очистки кэша
+                os.utime(path)
+                self.disk_hits += 1
+                return data
+            except OSError:
+                pass
+        data = self._run_graphviz(dot_data, fmt)
+        if path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._prune_disk()
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить отрисовку графа в кэш: {str(e)}")
+        return data
+
+    def _prune_disk(self):
+        """Удалить давно не использованные файлы сверх disk_max_files и брошенные временные"""
+        now = time.time()
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if now - mtime > self.STALE_TMP_AGE:
+                        self._remove(entry.path)
+                elif entry.name.rpartition('.')[2] in FORMATS:
+                    files.append((mtime, entry.path))
+        if len(files) <= self.disk_max_files:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.disk_max_files]:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.pruned += 1
+        except OSError:
+            pass
+
+    def render(self, compiled, node_id=None, depth=None, fmt='svg'):
+        """
+        Отрисовать граф или поддерево
+
+        Args:
+            compiled (CompiledGraph): Скомпилированное представление графа
+            node_id (str, optional): Корень поддерева ('root' допускается); None - весь граф
+            depth (int, optional): Глубина поддерева
+            fmt (str): 'dot' или 'svg'
+
+        Returns:
+            tuple: (данные, ETag) или None, если узла нет
+
+        Raises:
+            ValueError: Неизвестный формат
+            RuntimeError: Graphviz недоступен или завершился с ошибкой
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат: {fmt}")
+        if node_id is not None:
+            node_id = compiled.resolve(node_id)
+        dot = self._dot_for(compiled, node_id, depth)
+        if dot is None:
+            return None
+        dot_data, digest = dot
+        if fmt == 'dot':
+            return dot_data, digest
+        return self._artifact(dot_data, digest, fmt), f"{digest}-{fmt}"
+
+    def stats(self):
+        """Счетчики кэша отрисовки"""
+        return {
+            'cache_dir': self.cache_dir,
+            'renders': self.renders,
+            'disk_hits': self.disk_hits,
+            'pruned': self.pruned,
+            'memory': self._artifacts.stats()
+        }
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Вызов отклонен: автомат защиты разомкнут, внешний сервис считается недоступным"""
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты (circuit breaker).
+
+    После failure_threshold ошибок подряд размыкается и сразу отклоняет вызовы
+    в течение reset_timeout секунд. Затем пропускает ровно один пробный вызов
+    (полуоткрытое состояние), остальные отклоняются до его завершения: успех
+    замыкает автомат, ошибка снова размыкает. Если проба не завершилась за
+    reset_timeout, пропускается следующая.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Проверить, можно ли выполнять вызов (иначе CircuitOpenError)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probe_started_at = now
+                return
+            if self.state == self.HALF_OPEN and now - self.probe_started_at >= self.reset_timeout:
+                # Пробный вызов завис или потерян - пропускаем новый
+                self.probe_started_at = now
+                return
+            self.rejected += 1
+            raise CircuitOpenError("Сервис временно недоступен (circuit breaker разомкнут)")
+
+    def record_success(self):
+        """Учесть успешный вызов"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self):
+        """Учесть неудачный вызов"""
+        with self._lock:
+            self.probe_started_at = None
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker разомкнут после {self.failures} ошибок подряд")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ResilientSession:
+    """
+    Общая HTTP-сессия с пулом соединений, таймаутами, повторами и автоматом защиты.
+
+    Повторы с экспоненциальной задержкой и случайным разбросом выполняются
+    только для идемпотентных методов (GET, HEAD, OPTIONS); ошибки соединения
+    до отправки запроса повторяются для любых методов.
+    """
+
+    RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, base_url, headers=None, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.3, backoff_jitter=0.5,
+                 failure_threshold=5, reset_timeout=30):
+        """
+        Инициализация сессии
+
+        Args:
+            base_url (str): Базовый URL сервиса
+            headers (dict, optional): Заголовки для всех запросов
+            pool_size (int): Максимальное количество соединений в пуле
+            connect_timeout (float): Таймаут установки соединения в секундах
+            read_timeout (float): Таймаут чтения ответа в секундах
+            retries (int): Максимальное количество повторов
+            backoff_factor (float): Базовая задержка экспоненциального отката
+            backoff_jitter (float): Максимальный случайный разброс задержки
+            failure_threshold (int): Ошибок подряд до размыкания автомата защиты
+            reset_timeout (float): Время в разомкнутом состоянии в секундах
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    def request(self, method, path, **kwargs):
+        """
+        Выполнить запрос к сервису
+
+        Args:
+            method (str): HTTP-метод
+            path (str): Путь относительно base_url
+            **kwargs: Параметры requests (json, params, timeout, ...)
+
+        Returns:
+            requests.Response: Ответ сервиса
+        """
+        self.breaker.before_call()
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self._requests += 1
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except Exception:
+            # Любая ошибка, включая непредвиденные, завершает пробный вызов
+            with self._lock:
+                self._errors += 1
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            with self._lock:
+                self._errors += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def stats(self):
+        """Статистика пула соединений и автомата защиты для мониторинга"""
+        pools = []
+        poolmanager = self.adapter.poolmanager
+        for key in list(poolmanager.pools.keys()):
+            pool = poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool is not None else 0
+            })
+        return {
+            'base_url': self.base_url,
+            'pool_size': self.pool_size,
+            'requests': self._requests,
+            'errors': self._errors,
+            'circuit_breaker': {
+                'state': self.breaker.state,
+                'consecutive_failures': self.breaker.failures,
+                'rejected': self.breaker.rejected
+            },
+            'pools': pools
+        }
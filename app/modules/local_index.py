@@ -0,0 +1,520 @@
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import chain
+from app.modules.text_index import InvertedIndex, analyze, bm25, notify_listeners
+
+try:
+    import fcntl
+except ImportError:
+    # На платформах без fcntl (Windows) остается только блокировка между потоками
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Формат файла индекса (little-endian):
+#   заголовок: MAGIC, версия, число документов, число секций
+#   каталог секций: (смещение, длина) для каждой секции (uint64)
+#   секции: метаданные (JSON), документы (JSON), ID документов и их порядок
+#   сортировки, затем для каждого поля - отсортированный словарь термов,
+#   списки вхождений (номера документов и частоты) и длины поля документов
+MAGIC = b'SRCHIDX\x00'
+# Версия 3: термы стандартного русского стеммера Snowball (файлы старых версий нужно пересобрать)
+FORMAT_VERSION = 3
+HEADER = struct.Struct('<8sIII')
+SECTION = struct.Struct('<QQ')
+FIELD_SECTIONS = ('term_offsets', 'terms', 'posting_offsets', 'posting_docs', 'posting_tfs', 'lengths')
+
+
+def _string_sections(values):
+    """Смещения (uint64) и склеенные байты для списка строк в байтах"""
+    offsets = array('Q', [0])
+    total = 0
+    for value in values:
+        total += len(value)
+        offsets.append(total)
+    return offsets, b''.join(values)
+
+
+def build_index_file(documents, filename, fields=None, k1=1.2, b=0.75):
+    """
+    Построить файл индекса из документов
+
+    Файл записывается во временный и атомарно подменяется, поэтому процессы,
+    уже отобразившие старую версию в память, продолжают работать с ней.
+
+    Args:
+        documents (iterable): Документы ({'id', 'title', 'content', 'tags', ...})
+        filename (str): Путь к файлу индекса
+        fields (dict, optional): Поля и их веса (по умолчанию как у InvertedIndex)
+
+    Returns:
+        int: Количество документов в индексе
+    """
+    fields = fields or dict(InvertedIndex.FIELDS)
+    unique = {}
+    for document in documents:
+        unique[document['id']] = document
+    docs = list(unique.values())
+
+    doc_ids = [str(document['id']).encode('utf-8') for document in docs]
+    id_order = array('I', sorted(range(len(docs)), key=lambda i: doc_ids[i]))
+    postings = {field: {} for field in fields}
+    lengths = {field: array('I', bytes(4 * len(docs))) for field in fields}
+    total_lengths = dict.fromkeys(fields, 0)
+    for i, document in enumerate(docs):
+        for field in fields:
+            value = document.get(field)
+            if not value:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            terms = analyze(value)
+            field_postings = postings[field]
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                field_postings.setdefault(term.encode('utf-8'), []).append((i, tf))
+            lengths[field][i] = len(terms)
+            total_lengths[field] += len(terms)
+
+    meta = {'fields': fields, 'total_lengths': total_lengths, 'k1': k1, 'b': b}
+    sections = [json.dumps(meta, ensure_ascii=False).encode('utf-8')]
+    sections.extend(_string_sections([json.dumps(document, ensure_ascii=False).encode('utf-8') for document in docs]))
+    sections.extend(_string_sections(doc_ids))
+    sections.append(id_order)
+    for field in fields:
+        terms = sorted(postings[field])
+        term_offsets, term_blob = _string_sections(terms)
+        posting_offsets = array('Q', [0])
+        posting_docs = array('I')
+        posting_tfs = array('I')
+        for term in terms:
+            for doc_index, tf in postings[field][term]:
+                posting_docs.append(doc_index)
+                posting_tfs.append(tf)
+            posting_offsets.append(len(posting_docs))
+        sections.extend([term_offsets, term_blob, posting_offsets, posting_docs, posting_tfs, lengths[field]])
+
+    payloads = []
+    for section in sections:
+        if isinstance(section, array):
+            if sys.byteorder != 'little':
+                section = array(section.typecode, section)
+                section.byteswap()
+            section = section.tobytes()
+        payloads.append(section)
+
+    position = HEADER.size + SECTION.size * len(payloads)
+    directory = []
+    for payload in payloads:
+        # Выравниваем секции по 8 байт
+        position += -position % 8
+        directory.append((position, len(payload)))
+        position += len(payload)
+
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(docs), len(payloads)))
+        for offset, length in directory:
+            f.write(SECTION.pack(offset, length))
+        for (offset, _), payload in zip(directory, payloads):
+            f.write(b'\x00' * (offset - f.tell()))
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filename)
+    return len(docs)
+
+
+class MappedIndex:
+    """
+    Неизменяемый индекс, отображенный в память (только чтение).
+
+    Словарь термов хранится отсортированным по байтам и ищется двоичным
+    поиском прямо в отображенном файле, документы декодируются при обращении,
+    поэтому загрузка занимает миллисекунды, а страницы файла разделяются
+    всеми процессами, открывшими его.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.signature = (stat.st_ino, stat.st_mtime_ns)
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buffer) < HEADER.size:
+            raise ValueError(f"Файл {filename} слишком короткий для индекса")
+        magic, version, doc_count, section_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Файл {filename} не является файлом поискового индекса")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата индекса: {version} "
+                             f"(пересоберите индекс: mediawiki_indexer.py --local-index)")
+
+        view = memoryview(self._buffer)
+        sections = []
+        for i in range(section_count):
+            offset, length = SECTION.unpack_from(self._buffer, HEADER.size + i * SECTION.size)
+            if offset + length > len(self._buffer):
+                raise ValueError(f"Файл {filename} поврежден: секция {i} выходит за пределы файла")
+            sections.append(view[offset:offset + length])
+
+        self.doc_count = doc_count
+        meta = json.loads(str(sections[0], 'utf-8'))
+        self.fields = meta['fields']
+        self.total_lengths = meta['total_lengths']
+        self.k1 = meta['k1']
+        self.b = meta['b']
+        self._doc_offsets = self._cast(sections[1], 'Q')
+        self._doc_blob = sections[2]
+        self._id_offsets = self._cast(sections[3], 'Q')
+        self._id_blob = sections[4]
+        self._id_order = self._cast(sections[5], 'I')
+        self._field_data = {}
+        position = 6
+        for field in self.fields:
+            data = dict(zip(FIELD_SECTIONS, sections[position:position + len(FIELD_SECTIONS)]))
+            for name, typecode in (('term_offsets', 'Q'), ('posting_offsets', 'Q'), ('posting_docs', 'I'),
+                                   ('posting_tfs', 'I'), ('lengths', 'I')):
+                data[name] = self._cast(data[name], typecode)
+            self._field_data[field] = data
+            position += len(FIELD_SECTIONS)
+
+    @staticmethod
+    def _cast(section, typecode):
+        if sys.byteorder == 'little':
+            return section.cast(typecode)
+        values = array(typecode, section)
+        values.byteswap()
+        return values
+
+    def __len__(self):
+        return self.doc_count
+
+    def doc_id(self, i):
+        """ID документа по его номеру"""
+        return str(self._id_blob[self._id_offsets[i]:self._id_offsets[i + 1]], 'utf-8')
+
+    def document(self, i):
+        """Документ по его номеру"""
+        return json.loads(str(self._doc_blob[self._doc_offsets[i]:self._doc_offsets[i + 1]], 'utf-8'))
+
+    def iter_documents(self):
+        for i in range(self.doc_count):
+            yield self.document(i)
+
+    def find(self, doc_id):
+        """Номер документа по ID (двоичный поиск) или None"""
+        target = str(doc_id).encode('utf-8')
+        lo, hi = 0, self.doc_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = self._id_order[mid]
+            value = self._id_blob[self._id_offsets[i]:self._id_offsets[i + 1]].tobytes()
+            if value < target:
+                lo = mid + 1
+            elif value > target:
+                hi = mid
+            else:
+                return i
+        return None
+
+    def postings(self, field, term):
+        """
+        Список вхождений терма в поле
+
+        Returns:
+            tuple: (номера документов, частоты) - срезы отображенного файла
+        """
+        data = self._field_data[field]
+        offsets = data['term_offsets']
+        terms = data['terms']
+        target = term.encode('utf-8')
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = terms[offsets[mid]:offsets[mid + 1]].tobytes()
+            if value < target:
+                lo = mid + 1
+            elif value > target:
+                hi = mid
+            else:
+                start, end = data['posting_offsets'][mid], data['posting_offsets'][mid + 1]
+                return data['posting_docs'][start:end], data['posting_tfs'][start:end]
+        return (), ()
+
+    def field_length(self, field, i):
+        return self._field_data[field]['lengths'][i]
+
+
+class LocalSearchIndex:
+    """
+    Сохраняемый на диск локальный поисковый индекс.
+
+    Основа - неизменяемый файл индекса (MappedIndex), отображенный в память и
+    общий для всех процессов. Документы, добавленные во время работы,
+    дописываются в журнал изменений (<файл>.delta) и держатся в небольшом
+    индексе в памяти; другие процессы подхватывают журнал при следующем
+    запросе. При накоплении compact_threshold изменений основа пересобирается
+    вместе с журналом. Ранжирование - BM25 по полям с общей статистикой основы
+    и журнала.
+    """
+
+    def __init__(self, filename, compact_threshold=1000):
+        """
+        Args:
+            filename (str): Путь к файлу индекса
+            compact_threshold (int): Количество изменений в журнале до пересборки основы
+        """
+        self.filename = filename
+        self.delta_path = f"{filename}.delta"
+        self.compact_threshold = compact_threshold
+        self.fields = dict(InvertedIndex.FIELDS)
+        self.base = None
+        self.delta = InvertedIndex(self.fields)
+        self._shadowed = set()
+        self._delta_ops = 0
+        self._delta_offset = 0
+        self._lock = threading.RLock()
+        self.listeners = []
+        self._reload()
+
+    def _base_signature(self):
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _reload(self):
+        """Отобразить основу и перечитать журнал с начала"""
+        self.base = None
+        if self._base_signature() is not None:
+            try:
+                self.base = MappedIndex(self.filename)
+                self.fields = dict(self.base.fields)
+            except (OSError, ValueError) as e:
+                logger.error(f"Ошибка при загрузке поискового индекса {self.filename}: {str(e)}")
+        self.delta = InvertedIndex(self.fields)
+        self._shadowed = set()
+        self._delta_ops = 0
+        self._delta_offset = 0
+        self._replay_delta()
+        logger.info(f"Локальный поисковый индекс загружен: {len(self)} документов "
+                    f"(в журнале изменений: {self._delta_ops})")
+        notify_listeners(self.listeners, 'reload', None)
+
+    def _replay_delta(self):
+        """Применить новые записи журнала изменений (в том числе от других процессов)"""
+        try:
+            with open(self.delta_path, 'rb') as f:
+                f.seek(self._delta_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Пропущена поврежденная запись журнала поискового индекса")
+                continue
+            self._apply(record)
+        self._delta_offset += end
+
+    def _apply(self, record):
+        self._delta_ops += 1
+        if record['op'] == 'add':
+            document = record['doc']
+            self.delta.add(document)
+            self._shadowed.add(document['id'])
+            notify_listeners(self.listeners, 'add', document)
+        elif record['op'] == 'remove':
+            self.delta.remove(record['id'])
+            self._shadowed.add(record['id'])
+            notify_listeners(self.listeners, 'remove', record['id'])
+
+    def add_listener(self, callback):
+        """
+        Подписаться на изменения индекса, в том числе сделанные другими процессами
+
+        Args:
+            callback (callable): Вызывается как callback(event, value): ('add', документ),
+                ('remove', ID документа) или ('reload', None) - основа перечитана
+        """
+        self.listeners.append(callback)
+
+    def _sync(self):
+        """Проверить, не изменили ли основу или журнал другие процессы"""
+        base_signature = self._base_signature()
+        current = self.base.signature if self.base is not None else None
+        if base_signature != current:
+            self._reload()
+            return
+        try:
+            size = os.path.getsize(self.delta_path)
+        except OSError:
+            size = 0
+        if size < self._delta_offset:
+            self._reload()
+        elif size > self._delta_offset:
+            self._replay_delta()
+
+    @contextmanager
+    def _locked_delta(self):
+        """Дескриптор журнала изменений под монопольной блокировкой (между процессами)"""
+        fd = os.open(self.delta_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)
+
+    def _write(self, record):
+        """
+        Дописать запись в журнал и применить ее
+
+        Чтение чужих записей, запись и сдвиг смещения выполняются под одной
+        блокировкой журнала, поэтому записи других процессов не пропускаются.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock, self._locked_delta() as fd:
+            self._sync()
+            size = os.fstat(fd).st_size
+            if size != self._delta_offset:
+                # Хвост прерванной записи без перевода строки отделяем, чтобы не склеить записи
+                line = b'\n' + line
+            os.write(fd, line)
+            self._apply(record)
+            self._delta_offset = size + len(line)
+
+    def __len__(self):
+        with self._lock:
+            base_count = len(self.base) if self.base is not None else 0
+            shadowed = sum(1 for doc_id in self._shadowed
+                           if self.base is not None and self.base.find(doc_id) is not None)
+            return base_count - shadowed + len(self.delta)
+
+    def __contains__(self, doc_id):
+        with self._lock:
+            self._sync()
+            if doc_id in self.delta:
+                return True
+            if doc_id in self._shadowed or self.base is None:
+                return False
+            return self.base.find(doc_id) is not None
+
+    def add(self, document):
+        """Добавить или заменить документ (с записью в журнал)"""
+        with self._lock:
+            self._write({'op': 'add', 'doc': document})
+            if self._delta_ops >= self.compact_threshold:
+                self.compact()
+
+    def remove(self, doc_id):
+        """Удалить документ (с записью в журнал)"""
+        self._write({'op': 'remove', 'id': doc_id})
+
+    def iter_documents(self):
+        """Все актуальные документы (основа без замененных и журнал)"""
+        # Снимок под блокировкой, чтение - без нее: потребитель генератора не держит индекс.
+        # Отображение старой основы остается действительным и после ее замены.
+        with self._lock:
+            base = self.base
+            shadowed = frozenset(self._shadowed)
+            delta_documents = list(self.delta.documents.values())
+        if base is not None:
+            for i in range(len(base)):
+                if not shadowed or base.doc_id(i) not in shadowed:
+                    yield base.document(i)
+        yield from delta_documents
+
+    def compact(self, documents=()):
+        """
+        Пересобрать файл индекса с учетом журнала и очистить журнал
+
+        Args:
+            documents (iterable, optional): Дополнительные документы (заменяют имеющиеся по ID)
+
+        Returns:
+            int: Количество документов в индексе
+        """
+        with self._lock:
+            with self._locked_delta() as fd:
+                # Под блокировкой журнала дочитываем записи других процессов; новые
+                # записи они смогут дописать только после очистки журнала
+                self._sync()
+                count = build_index_file(chain(self.iter_documents(), documents), self.filename, self.fields)
+                os.ftruncate(fd, 0)
+            self._reload()
+            logger.info(f"Локальный поисковый индекс пересобран: {count} документов")
+            return count
+
+    def search(self, query_text, size=None):
+        """
+        Поиск по основе и журналу (BM25 по полям, оценка - лучшее поле)
+
+        Returns:
+            list: Пары (документ, оценка), отсортированные по убыванию оценки
+        """
+        terms = set(analyze(query_text))
+        if not terms:
+            return []
+        with self._lock:
+            self._sync()
+            base = self.base
+            delta = self.delta
+            k1 = base.k1 if base is not None else delta.k1
+            b = base.b if base is not None else delta.b
+            total_docs = (len(base) if base is not None else 0) + len(delta)
+            if total_docs == 0:
+                return []
+            scores = {}
+            for field, boost in self.fields.items():
+                total_length = delta.total_length(field)
+                if base is not None:
+                    total_length += base.total_lengths.get(field, 0)
+                avg_length = total_length / total_docs or 1
+                field_scores = {}
+                for term in terms:
+                    base_docs, base_tfs = base.postings(field, term) if base is not None else ((), ())
+                    delta_postings = delta.postings(field, term)
+                    df = len(base_docs) + len(delta_postings)
+                    if df == 0:
+                        continue
+                    # Документы основы - по номеру (int), журнала - по ID (str)
+                    for doc_index, tf in zip(base_docs, base_tfs):
+                        length = base.field_length(field, doc_index)
+                        field_scores[doc_index] = field_scores.get(doc_index, 0.0) + \
+                            bm25(tf, df, total_docs, length, avg_length, k1, b)
+                    for doc_id, tf in delta_postings.items():
+                        length = delta.field_length(field, doc_id)
+                        field_scores[doc_id] = field_scores.get(doc_id, 0.0) + \
+                            bm25(tf, df, total_docs, length, avg_length, k1, b)
+                for key, score in field_scores.items():
+                    score *= boost
+                    if score > scores.get(key, 0.0):
+                        scores[key] = score
+
+            if self._shadowed and base is not None:
+                for key in [key for key in scores if isinstance(key, int)]:
+                    if base.doc_id(key) in self._shadowed:
+                        del scores[key]
+            if size is None:
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            else:
+                ranked = heapq.nlargest(size, scores.items(), key=lambda item: item[1])
+            return [
+                (base.document(key) if isinstance(key, int) else delta.documents[key], score)
+                for key, score in ranked
+            ]
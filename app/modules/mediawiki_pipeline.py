@@ -0,0 +1,384 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from opensearchpy.helpers import streaming_bulk
+from app.modules.local_index import LocalSearchIndex, MappedIndex, build_index_file
+
+logger = logging.getLogger(__name__)
+
+
+class ThroughputMeter:
+    """Счетчик пропускной способности индексации (страниц/с и байт/с)"""
+
+    def __init__(self, report_interval=5, reporter=None):
+        """
+        Args:
+            report_interval (float): Как часто (в секундах) выводить промежуточную статистику
+            reporter (callable, optional): Функция вывода строки отчета (по умолчанию logger.info)
+        """
+        self.report_interval = report_interval
+        self.reporter = reporter or logger.info
+        self.pages = 0
+        self.bytes = 0
+        self.indexed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def add_page(self, size):
+        """Учесть загруженную страницу размером size байт"""
+        with self._lock:
+            self.pages += 1
+            self.bytes += size
+
+    def add_indexed(self, ok):
+        """Учесть результат записи документа в OpenSearch"""
+        with self._lock:
+            if ok:
+                self.indexed += 1
+            else:
+                self.failed += 1
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.reporter(self.format())
+
+    def snapshot(self):
+        """Текущая статистика в виде словаря"""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'indexed': self.indexed,
+            'failed': self.failed,
+            'elapsed_s': round(elapsed, 1),
+            'pages_per_s': round(self.pages / elapsed, 1),
+            'bytes_per_s': round(self.bytes / elapsed, 1)
+        }
+
+    def format(self):
+        """Строка с текущей статистикой для вывода в лог"""
+        stats = self.snapshot()
+        return (f"Загружено {stats['pages']} страниц, проиндексировано {stats['indexed']}, "
+                f"ошибок {stats['failed']} | {stats['pages_per_s']} стр/с, "
+                f"{stats['bytes_per_s'] / 1024:.1f} КБ/с")
+
+
+class MediaWikiIndexPipeline:
+    """
+    Потоковый конвейер индексации MediaWiki в OpenSearch.
+
+    Постранично обходит list=allpages (с учетом apcontinue), загружает
+    разобранное содержимое страниц ограниченным пулом потоков и записывает
+    документы пакетами через _bulk API. На время загрузки обновление индекса
+    (refresh) отключается.
+    """
+
+    def __init__(self, mediawiki_url, client, index_name, workers=8, batch_size=200,
+                 page_limit=500, request_timeout=30, report_interval=5, reporter=None):
+        """
+        Инициализация конвейера
+
+        Args:
+            mediawiki_url (str): Базовый URL MediaWiki
+            client (OpenSearch): Клиент OpenSearch (из общего реестра пулов)
+            index_name (str): Имя индекса
+            workers (int): Количество параллельных загрузок страниц
+            batch_size (int): Размер пакета для _bulk API
+            page_limit (int): Размер страницы выдачи list=allpages
+            request_timeout (float): Таймаут HTTP-запросов к MediaWiki
+            report_interval (float): Интервал вывода статистики в секундах
+            reporter (callable, optional): Функция вывода строк отчета
+        """
+        self.mediawiki_url = mediawiki_url
+        self.api_endpoint = f"{mediawiki_url}/api.php"
+        self.client = client
+        self.index_name = index_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.page_limit = page_limit
+        self.request_timeout = request_timeout
+        self.report_interval = report_interval
+        self.reporter = reporter or logger.info
+        self._local = threading.local()
+
+    def _session(self):
+        """HTTP-сессия текущего потока с пулом соединений к MediaWiki"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def _api_get(self, params):
+        """GET-запрос к API MediaWiki; возвращает (json, размер ответа в байтах)"""
+        response = self._session().get(self.api_endpoint, params=params, timeout=self.request_timeout)
+        response.raise_for_status()
+        return response.json(), len(response.content)
+
+    def iter_pages(self, namespace=0):
+        """
+        Постранично обойти все страницы вики
+
+        Args:
+            namespace (int): Пространство имен MediaWiki
+
+        Yields:
+            dict: Описание страницы ({'pageid', 'ns', 'title'})
+        """
+        params = {
+            'action': 'query',
+            'list': 'allpages',
+            'apnamespace': namespace,
+            'aplimit': self.page_limit,
+            'format': 'json'
+        }
+        while True:
+            data, _ = self._api_get(params)
+            for page in data.get('query', {}).get('allpages', []):
+                yield page
+            if 'continue' not in data:
+                break
+            params.update(data['continue'])
+
+    def fetch_page(self, page_id):
+        """
+        Загрузить разобранное содержимое страницы
+
+        Args:
+            page_id (int): ID страницы
+
+        Returns:
+            tuple: ({'text', 'categories', 'revid'} или None, размер ответа в байтах)
+        """
+        data, size = self._api_get({
+            'action': 'parse',
+            'pageid': page_id,
+            'prop': 'text|categories|revid',
+            'format': 'json'
+        })
+        if 'parse' not in data:
+            logger.warning(f"Не удалось получить содержимое для страницы {page_id}")
+            return None, size
+
+        parse_data = data['parse']
+        html_content = parse_data.get('text', {}).get('*', '')
+
+        # Удаляем HTML-теги
+        text_content = re.sub(r'<[^>]+>', ' ', html_content)
+        text_content = re.sub(r'\s+', ' ', text_content).strip()
+
+        categories = [cat.get('*', '') for cat in parse_data.get('categories', [])]
+        return {
+            'text': text_content,
+            'categories': categories,
+            'revid': parse_data.get('revid')
+        }, size
+
+    def build_document(self, page, content_data):
+        """Сформировать документ OpenSearch для страницы MediaWiki"""
+        page_id = page['pageid']
+        return {
+            'id': f"mediawiki_{page_id}",
+            'title': page['title'],
+            'content': content_data['text'],
+            'categories': content_data['categories'],
+            'url': f"{self.mediawiki_url}/index.php?curid={page_id}",
+            'source': 'mediawiki',
+            'revid': content_data.get('revid')
+        }
+
+    def _load_document(self, page, meter):
+        """Загрузить одну страницу и построить документ (выполняется в пуле)"""
+        try:
+            content_data, size = self.fetch_page(page['pageid'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении страницы {page.get('title')}: {str(e)}")
+            meter.add_indexed(False)
+            return None
+        meter.add_page(size)
+        if not content_data:
+            meter.add_indexed(False)
+            return None
+        return self.build_document(page, content_data)
+
+    def iter_documents(self, pages, meter):
+        """
+        Загрузить страницы ограниченным пулом потоков
+
+        В работе одновременно держится не более 2 * workers страниц, поэтому
+        память не растет с размером вики.
+
+        Yields:
+            dict: Документ для индексации
+        """
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='wiki-fetch') as executor:
+            for page in pages:
+                window.append(executor.submit(self._load_document, page, meter))
+                if len(window) >= self.workers * 2:
+                    document = window.popleft().result()
+                    if document:
+                        yield document
+            while window:
+                document = window.popleft().result()
+                if document:
+                    yield document
+
+    def iter_actions(self, documents):
+        """Преобразовать документы в действия _bulk API"""
+        for document in documents:
+            yield {
+                '_op_type': 'index',
+                '_index': self.index_name,
+                '_id': document['id'],
+                '_source': document
+            }
+
+    def write_documents(self, documents, meter, revisions=None):
+        """
+        Записать документы пакетами через _bulk API
+
+        Args:
+            documents (iterable): Документы для записи
+            meter (ThroughputMeter): Счетчик пропускной способности
+            revisions (dict, optional): Сюда добавляются ревизии записанных документов ({ID: revid})
+
+        Returns:
+            list: ID успешно записанных документов
+        """
+        # Ревизии документов, отправленных, но еще не подтвержденных _bulk API
+        pending = {}
+
+        def track(documents):
+            for document in documents:
+                pending[document['id']] = document.get('revid')
+                yield document
+
+        written = []
+        for ok, item in streaming_bulk(
+            self.client,
+            self.iter_actions(track(documents)),
+            chunk_size=self.batch_size,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            meter.add_indexed(ok)
+            doc_id = item.get('index', {}).get('_id')
+            revid = pending.pop(doc_id, None)
+            if ok:
+                written.append(doc_id)
+                if revisions is not None:
+                    revisions[doc_id] = revid
+            else:
+                logger.error(f"Ошибка при записи документа: {item}")
+        return written
+
+    def delete_documents(self, doc_ids):
+        """
+        Удалить документы из индекса через _bulk API (отсутствующие считаются удаленными)
+
+        Returns:
+            list: ID документов, которые удалить не удалось
+        """
+        actions = ({'_op_type': 'delete', '_index': self.index_name, '_id': doc_id} for doc_id in doc_ids)
+        failed = []
+        for ok, item in streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=self.batch_size,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            result = item.get('delete', {})
+            if not ok and result.get('status') != 404:
+                logger.error(f"Ошибка при удалении документа: {item}")
+                failed.append(result.get('_id'))
+        return failed
+
+    def new_meter(self):
+        """Создать счетчик пропускной способности с настройками конвейера"""
+        return ThroughputMeter(report_interval=self.report_interval, reporter=self.reporter)
+
+    def _get_refresh_interval(self):
+        """Текущее явно заданное значение refresh_interval индекса (или None)"""
+        settings = self.client.indices.get_settings(index=self.index_name, name='index.refresh_interval')
+        index_settings = settings.get(self.index_name, {}).get('settings', {})
+        return index_settings.get('index', {}).get('refresh_interval')
+
+    def _set_refresh_interval(self, value):
+        """Установить refresh_interval (None возвращает значение по умолчанию)"""
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={'index': {'refresh_interval': value}}
+        )
+
+    def run(self, pages=None, revisions=None):
+        """
+        Выполнить индексацию
+
+        Args:
+            pages (iterable, optional): Страницы для индексации; по умолчанию все страницы вики
+            revisions (dict, optional): Сюда добавляются ревизии записанных документов ({ID: revid})
+
+        Returns:
+            dict: Итоговая статистика (страницы, байты, скорость)
+        """
+        meter = self.new_meter()
+        previous_refresh = self._get_refresh_interval()
+        self._set_refresh_interval('-1')
+        try:
+            if pages is None:
+                pages = self.iter_pages()
+            self.write_documents(self.iter_documents(pages, meter), meter, revisions)
+        finally:
+            self._set_refresh_interval(previous_refresh)
+            self.client.indices.refresh(index=self.index_name)
+        self.reporter(meter.format())
+        return meter.snapshot()
+
+    def build_local_index(self, filename, pages=None):
+        """
+        Построить файл локального поискового индекса (без OpenSearch)
+
+        Документы уже сохраненного индекса сохраняются, страницы вики
+        заменяют их по ID.
+
+        Args:
+            filename (str): Путь к файлу индекса
+            pages (iterable, optional): Страницы для индексации; по умолчанию все страницы вики
+
+        Returns:
+            dict: Итоговая статистика (страницы, байты, скорость, документов в индексе)
+        """
+        meter = self.new_meter()
+        if pages is None:
+            pages = self.iter_pages()
+
+        def documents():
+            for document in self.iter_documents(pages, meter):
+                meter.add_indexed(True)
+                yield document
+
+        # Долгая загрузка страниц - во временный файл без блокировки журнала;
+        # объединение с индексом выполняется под блокировкой (записи воркеров не теряются)
+        pages_path = f"{filename}.pages.{os.getpid()}"
+        build_index_file(documents(), pages_path)
+        try:
+            count = LocalSearchIndex(filename).compact(MappedIndex(pages_path).iter_documents())
+        finally:
+            os.remove(pages_path)
+        self.reporter(meter.format())
+        stats = meter.snapshot()
+        stats['documents'] = count
+        return stats
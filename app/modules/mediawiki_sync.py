@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # На платформах без fcntl (Windows) остается только блокировка между потоками
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SyncState:
+    """
+    Сохраняемая отметка синхронизации (high-water mark).
+
+    Хранит последний обработанный rcid и его timestamp, ревизии и
+    заголовки проиндексированных страниц, а также страницы, которые не
+    удалось записать или удалить (повторяются при следующей синхронизации).
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.rcid = 0
+        self.timestamp = None
+        self.pages = {}
+        self.retry_index = {}
+        self.retry_delete = {}
+        self.load()
+
+    @property
+    def initialized(self):
+        """Была ли уже выполнена начальная полная индексация"""
+        return self.timestamp is not None
+
+    def load(self, quiet=False):
+        """
+        Загрузка состояния из файла
+
+        Args:
+            quiet (bool): Не выводить сообщение об успешной загрузке
+        """
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.rcid = data.get('rcid', 0)
+            self.timestamp = data.get('timestamp')
+            self.pages = data.get('pages', {})
+            self.retry_index = data.get('retry_index', {})
+            self.retry_delete = data.get('retry_delete', {})
+            if not quiet:
+                logger.info(f"Состояние синхронизации загружено: rcid={self.rcid}, страниц: {len(self.pages)}")
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке состояния синхронизации: {str(e)}")
+
+    def save(self):
+        """Атомарное сохранение состояния (через временный файл)"""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'rcid': self.rcid,
+                'timestamp': self.timestamp,
+                'pages': self.pages,
+                'retry_index': self.retry_index,
+                'retry_delete': self.retry_delete
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
+
+    def find_page_id(self, title):
+        """Найти ID страницы по заголовку"""
+        for page_id, page in self.pages.items():
+            if page.get('title') == title:
+                return page_id
+        return None
+
+
+class MediaWikiIncrementalSync:
+    """
+    Инкрементальная синхронизация индекса по list=recentchanges.
+
+    Вместо полного обхода вики загружает только изменения с момента последней
+    синхронизации: переиндексирует измененные страницы и удаляет из индекса
+    удаленные. Может запускаться разово (периодическая задача) или в фоновом
+    потоке внутри Flask-приложения.
+
+    Цикл синхронизации выполняется под файловой блокировкой (flock) рядом с
+    файлом состояния, поэтому несколько процессов (воркеры, перезапуск
+    Werkzeug, скрипт индексации) не синхронизируют вики одновременно; после
+    получения блокировки состояние перечитывается с диска.
+    """
+
+    # Количество циклов, в которых повторяется запись или удаление страницы
+    MAX_RETRIES = 5
+
+    def __init__(self, pipeline, state_file, on_change=None):
+        """
+        Args:
+            pipeline (MediaWikiIndexPipeline): Конвейер загрузки и записи документов
+            state_file (str): Путь к файлу с отметкой синхронизации
+            on_change (callable, optional): Вызывается с (индексированные ID, удаленные ID)
+                после каждой синхронизации с изменениями; после полной индексации
+                оба аргумента равны None
+        """
+        self.pipeline = pipeline
+        self.state = SyncState(state_file)
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._lock_path = f"{state_file}.lock"
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def page_documents(self, doc_ids=None):
+        """
+        Известные страницы вики из состояния синхронизации (для подсказок поиска)
+
+        Args:
+            doc_ids (iterable, optional): ID документов (mediawiki_<pageid>); None - все страницы
+
+        Yields:
+            dict: {'id', 'title', 'url'}
+        """
+        pages = self.state.pages
+        if doc_ids is None:
+            page_ids = list(pages)
+        else:
+            page_ids = [doc_id[len('mediawiki_'):] for doc_id in doc_ids if doc_id.startswith('mediawiki_')]
+        for page_id in page_ids:
+            page = pages.get(page_id)
+            if page and page.get('title'):
+                yield {
+                    'id': f"mediawiki_{page_id}",
+                    'title': page['title'],
+                    'url': f"{self.pipeline.mediawiki_url}/index.php?curid={page_id}"
+                }
+
+    def _latest_change(self):
+        """Последняя запись recentchanges (для начальной отметки)"""
+        data, _ = self.pipeline._api_get({
+            'action': 'query',
+            'list': 'recentchanges',
+            'rcprop': 'ids|timestamp',
+            'rcdir': 'older',
+            'rclimit': 1,
+            'format': 'json'
+        })
+        changes = data.get('query', {}).get('recentchanges', [])
+        return changes[0] if changes else None
+
+    def iter_changes(self):
+        """
+        Изменения после сохраненной отметки в хронологическом порядке
+
+        Yields:
+            dict: Запись recentchanges
+        """
+        params = {
+            'action': 'query',
+            'list': 'recentchanges',
+            'rcprop': 'ids|title|timestamp|loginfo',
+            'rctype': 'edit|new|log',
+            'rcdir': 'newer',
+            'rclimit': 500,
+            'format': 'json'
+        }
+        if self.state.timestamp:
+            params['rcstart'] = self.state.timestamp
+        while True:
+            data, _ = self.pipeline._api_get(params)
+            for change in data.get('query', {}).get('recentchanges', []):
+                # rcstart включает записи с той же секундой — отбрасываем уже обработанные
+                if change.get('rcid', 0) > self.state.rcid:
+                    yield change
+            if 'continue' not in data:
+                break
+            params.update(data['continue'])
+
+    def full_reindex(self):
+        """Начальная полная индексация с фиксацией отметки до ее начала"""
+        latest = self._latest_change()
+        crawled = {}
+
+        def record_pages():
+            for page in self.pipeline.iter_pages():
+                crawled[str(page['pageid'])] = page['title']
+                yield page
+
+        revisions = {}
+        stats = self.pipeline.run(record_pages(), revisions)
+        # В состояние попадают только записанные страницы, остальные повторяются
+        for page_id, title in crawled.items():
+            doc_id = f"mediawiki_{page_id}"
+            if doc_id in revisions:
+                self.state.pages[page_id] = {'title': title, 'revid': revisions[doc_id]}
+                self.state.retry_index.pop(page_id, None)
+            else:
+                self._schedule_retry(self.state.retry_index, page_id, {'title': title, 'revid': None})
+        if latest:
+            self.state.rcid = latest.get('rcid', 0)
+            self.state.timestamp = latest.get('timestamp')
+        else:
+            self.state.timestamp = ''
+        self.state.save()
+        return stats
+
+    def _collect(self, changes):
+        """Свести поток изменений к наборам страниц для переиндексации и удаления"""
+        to_index = {}
+        to_delete = set()
+        mark = (self.state.rcid, self.state.timestamp)
+        for change in changes:
+            page_id = str(change.get('pageid') or '')
+            if change.get('type') == 'log':
+                log_type = change.get('logtype')
+                if log_type == 'delete' and change.get('logaction') in ('delete', 'delete_redir'):
+                    deleted_id = self.state.find_page_id(change.get('title')) or (page_id if page_id != '0' else None)
+                    if deleted_id:
+                        to_delete.add(deleted_id)
+                        to_index.pop(deleted_id, None)
+                elif log_type in ('move', 'delete') and page_id and page_id != '0':
+                    # Переименование (в логе - старый заголовок, новый в logparams) или восстановление
+                    title = (change.get('logparams') or {}).get('target_title') or change.get('title')
+                    to_index[page_id] = {'title': title, 'revid': None}
+                    to_delete.discard(page_id)
+            elif page_id:
+                to_index[page_id] = {'title': change.get('title'), 'revid': change.get('revid')}
+                to_delete.discard(page_id)
+            if change.get('rcid', 0) > mark[0]:
+                mark = (change['rcid'], change.get('timestamp', mark[1]))
+        return to_index, to_delete, mark
+
+    def run_once(self):
+        """
+        Выполнить один цикл синхронизации
+
+        Returns:
+            dict: Количество переиндексированных и удаленных страниц
+        """
+        with self._lock, self._locked_state():
+            if not self.state.initialized:
+                logger.info("Отметка синхронизации отсутствует, выполняем полную индексацию")
+                stats = self.full_reindex()
+                if self.on_change:
+                    self.on_change(None, None)
+                return {'full_reindex': True, 'indexed': stats['indexed'], 'deleted': 0}
+
+            to_index, to_delete, mark = self._collect(self.iter_changes())
+
+            # Страницы, не записанные или не удаленные в прошлых циклах, повторяем
+            for page_id, info in self.state.retry_index.items():
+                if page_id not in to_index and page_id not in to_delete:
+                    to_index[page_id] = info
+            for page_id in self.state.retry_delete:
+                if page_id not in to_index:
+                    to_delete.add(page_id)
+
+            # Страницы, ревизия которых уже проиндексирована, повторно не загружаем
+            pages = []
+            for page_id, info in to_index.items():
+                known = self.state.pages.get(page_id)
+                if known and info['revid'] is not None and known.get('revid') == info['revid']:
+                    self.state.retry_index.pop(page_id, None)
+                    continue
+                pages.append({'pageid': int(page_id), 'title': info['title']})
+
+            indexed_ids = []
+            if pages:
+                meter = self.pipeline.new_meter()
+                revisions = {}
+                self.pipeline.write_documents(self.pipeline.iter_documents(pages, meter), meter, revisions)
+                for page in pages:
+                    page_id = str(page['pageid'])
+                    info = to_index[page_id]
+                    doc_id = f"mediawiki_{page_id}"
+                    if doc_id in revisions:
+                        indexed_ids.append(doc_id)
+                        # Фиксируем загруженную ревизию (у записей журнала revid нет)
+                        revid = revisions[doc_id] if revisions[doc_id] is not None else info['revid']
+                        self.state.pages[page_id] = {'title': info['title'], 'revid': revid}
+                        self.state.retry_index.pop(page_id, None)
+                        self.state.retry_delete.pop(page_id, None)
+                    else:
+                        # Загрузка или запись не удалась - ревизию не фиксируем
+                        self._schedule_retry(self.state.retry_index, page_id,
+                                             {'title': info['title'], 'revid': info['revid']})
+
+            deleted_ids = []
+            if to_delete:
+                failed = set(self.pipeline.delete_documents([f"mediawiki_{page_id}" for page_id in to_delete]))
+                for page_id in to_delete:
+                    if f"mediawiki_{page_id}" in failed:
+                        self._schedule_retry(self.state.retry_delete, page_id, {})
+                        continue
+                    deleted_ids.append(f"mediawiki_{page_id}")
+                    self.state.pages.pop(page_id, None)
+                    self.state.retry_delete.pop(page_id, None)
+                    self.state.retry_index.pop(page_id, None)
+
+            if indexed_ids or deleted_ids:
+                self.pipeline.client.indices.refresh(index=self.pipeline.index_name)
+                logger.info(f"Синхронизация MediaWiki: переиндексировано {len(indexed_ids)}, "
+                            f"удалено {len(deleted_ids)}")
+                if self.on_change:
+                    self.on_change(indexed_ids, deleted_ids)
+            # Отметку сдвигаем после записи: незаписанные страницы сохранены для повтора
+            self.state.rcid, self.state.timestamp = mark
+            self.state.save()
+            return {'full_reindex': False, 'indexed': len(indexed_ids), 'deleted': len(deleted_ids)}
+
+    @contextmanager
+    def _locked_state(self):
+        """
+        Исключительная файловая блокировка состояния между процессами
+
+        После получения блокировки состояние перечитывается: его могли
+        обновить другие процессы.
+        """
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                self.state.load(quiet=True)
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _schedule_retry(self, retries, page_id, info):
+        """Отложить страницу до следующего цикла (не более MAX_RETRIES попыток)"""
+        attempts = retries.get(page_id, {}).get('attempts', 0) + 1
+        if attempts > self.MAX_RETRIES:
+            retries.pop(page_id, None)
+            logger.error(f"Страница {page_id} не синхронизирована после {self.MAX_RETRIES} попыток, пропускаем")
+            return
+        retries[page_id] = {**info, 'attempts': attempts}
+
+    def start_background(self, interval):
+        """
+        Запустить периодическую синхронизацию в фоновом потоке
+
+        Args:
+            interval (float): Интервал между циклами в секундах
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Ошибка инкрементальной синхронизации MediaWiki: {str(e)}")
+                self._stop_event.wait(interval)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=loop, name='mediawiki-sync', daemon=True)
+        self._thread.start()
+        logger.info(f"Фоновая синхронизация MediaWiki запущена (интервал {interval} с)")
+
+    def stop(self):
+        """Остановить фоновую синхронизацию"""
+        self._stop_event.set()
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from opensearchpy import OpenSearch
+
+logger = logging.getLogger(__name__)
+
+
+class OpenSearchClientRegistry:
+    """
+    Долгоживущий клиент OpenSearch с пулом соединений и отслеживанием состояния.
+
+    Клиент создается один раз на процесс и переиспользуется всеми маршрутами
+    и индексатором, вместо создания нового подключения на каждый запрос.
+    """
+
+    def __init__(self, host='localhost', port=9200, pool_size=10, keep_alive=True,
+                 timeout=30, max_retries=3, health_check_interval=10):
+        """
+        Инициализация реестра
+
+        Args:
+            host (str): Хост OpenSearch
+            port (int): Порт OpenSearch
+            pool_size (int): Максимальное количество соединений в пуле
+            keep_alive (bool): Держать ли HTTP-соединения открытыми между запросами
+            timeout (float): Таймаут запросов по умолчанию в секундах
+            max_retries (int): Количество повторов при ошибке соединения
+            health_check_interval (float): Как часто (в секундах) перепроверять доступность
+        """
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.health_check_interval = health_check_interval
+
+        self._client = None
+        self._lock = threading.Lock()
+        self._healthy = None
+        self._last_check = 0.0
+        self._last_error = None
+        self._consecutive_failures = 0
+        self._prepared_indices = set()
+
+    @property
+    def client(self):
+        """Возвращает общий клиент OpenSearch, создавая его при первом обращении"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    logger.info(f"Создание пула соединений OpenSearch {self.host}:{self.port} "
+                                f"(размер пула: {self.pool_size})")
+                    self._client = OpenSearch(
+                        hosts=[{'host': self.host, 'port': self.port}],
+                        http_auth=None,
+                        use_ssl=False,
+                        verify_certs=False,
+                        ssl_show_warn=False,
+                        timeout=self.timeout,
+                        retry_on_timeout=True,
+                        max_retries=self.max_retries,
+                        maxsize=self.pool_size,
+                        headers={'Connection': 'keep-alive' if self.keep_alive else 'close'}
+                    )
+        return self._client
+
+    def is_healthy(self, force=False):
+        """
+        Проверить доступность OpenSearch
+
+        Результат проверки кэшируется на health_check_interval секунд, чтобы
+        не выполнять ping на каждый поисковый запрос.
+
+        Args:
+            force (bool): Выполнить проверку немедленно, игнорируя кэш
+
+        Returns:
+            bool: Доступен ли кластер
+        """
+        now = time.monotonic()
+        if not force and self._healthy is not None and now - self._last_check < self.health_check_interval:
+            return self._healthy
+
+        try:
+            healthy = bool(self.client.ping())
+            error = None if healthy else "ping вернул False"
+        except Exception as e:
+            healthy = False
+            error = str(e)
+
+        if healthy:
+            self.mark_success()
+        else:
+            self.mark_failure(error)
+        self._last_check = now
+        return healthy
+
+    def mark_success(self):
+        """Отметить успешное обращение к кластеру"""
+        self._healthy = True
+        self._consecutive_failures = 0
+        self._last_error = None
+
+    def mark_failure(self, error=None):
+        """Отметить неудачное обращение к кластеру"""
+        if self._healthy:
+            logger.warning(f"OpenSearch {self.host}:{self.port} помечен как недоступный: {error}")
+        self._healthy = False
+        self._consecutive_failures += 1
+        self._last_error = str(error) if error else None
+        self._last_check = time.monotonic()
+
+    def ensure_index(self, index_name, body):
+        """
+        Создать индекс, если он еще не существует
+
+        Проверка выполняется один раз на процесс для каждого индекса.
+
+        Args:
+            index_name (str): Имя индекса
+            body (dict): Настройки и маппинги индекса
+
+        Returns:
+            bool: True, если индекс был создан
+        """
+        if index_name in self._prepared_indices:
+            return False
+        created = False
+        if not self.client.indices.exists(index=index_name):
+            logger.info(f"Создание индекса {index_name}")
+            self.client.indices.create(index=index_name, body=body)
+            created = True
+        self._prepared_indices.add(index_name)
+        return created
+
+    def stats(self):
+        """Статистика пула и состояния кластера для мониторинга"""
+        return {
+            'host': self.host,
+            'port': self.port,
+            'pool_size': self.pool_size,
+            'keep_alive': self.keep_alive,
+            'healthy': self._healthy,
+            'consecutive_failures': self._consecutive_failures,
+            'last_error': self._last_error,
+            'connected': self._client is not None
+        }
+
+    def close(self):
+        """Закрыть все соединения пула"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Реестр клиентов на процесс: один пул на каждый адрес кластера
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(host='localhost', port=9200, **options):
+    """
+    Получить общий для процесса реестр клиента OpenSearch
+
+    Args:
+        host (str): Хост OpenSearch
+        port (int): Порт OpenSearch
+        **options: Параметры пула (pool_size, keep_alive, timeout, ...),
+            учитываются только при первом создании реестра
+
+    Returns:
+        OpenSearchClientRegistry: Реестр для указанного адреса
+    """
+    key = (host, int(port))
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = OpenSearchClientRegistry(host=host, port=int(port), **options)
+            _registries[key] = registry
+        return registry
@@ -0,0 +1,126 @@
+import heapq
+import math
+import re
+
+METHODS = ('minmax', 'zscore', 'rrf')
+
+# Константа сглаживания RRF
+RRF_K = 60
+
+# Нижняя граница min-max: последний найденный результат остается релевантным (не 0)
+MINMAX_FLOOR = 0.1
+
+# Оценка лучшего результата источника без различимых оценок (все равны, например
+# MediaWiki всегда отдает 1.0, или найден один результат): такой источник не должен
+# перекрывать источники с настоящими оценками
+NEUTRAL_PRIOR = 0.5
+
+CURID_RE = re.compile(r'[?&]curid=(\d+)')
+
+
+def _rank_scores(count):
+    """Оценки по рангу (RRF, масштабированные так, что первый результат получает 1.0)"""
+    return [(RRF_K + 1) / (RRF_K + rank) for rank in range(1, count + 1)]
+
+
+def normalize_scores(scores, method='minmax'):
+    """
+    Нормализовать оценки одного источника в диапазон [0, 1]
+
+    Если все оценки одинаковы (например, MediaWiki всегда отдает 1.0),
+    результаты ранжируются по порядку выдачи источника с нейтральной
+    оценкой лучшего результата NEUTRAL_PRIOR. При min-max последний
+    результат получает MINMAX_FLOOR, а не 0.
+
+    Args:
+        scores (list): Оценки в порядке выдачи источника (по убыванию релевантности)
+        method (str): 'minmax', 'zscore' (логистическое преобразование z-оценки)
+            или 'rrf' (по рангу, без учета самих оценок)
+
+    Returns:
+        list: Нормализованные оценки в том же порядке
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод нормализации: {method}")
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if method == 'rrf':
+        return _rank_scores(len(scores))
+    if high == low:
+        return [NEUTRAL_PRIOR * score for score in _rank_scores(len(scores))]
+    if method == 'zscore':
+        mean = sum(scores) / len(scores)
+        std = math.sqrt(sum((score - mean) ** 2 for score in scores) / len(scores))
+        return [1 / (1 + math.exp(-(score - mean) / std)) for score in scores]
+    return [MINMAX_FLOOR + (1 - MINMAX_FLOOR) * (score - low) / (high - low) for score in scores]
+
+
+def dedupe_key(result):
+    """
+    Ключ дедупликации результата
+
+    Одна и та же статья MediaWiki приходит из OpenSearch (проиндексированной
+    как mediawiki_<pageid>), из поиска MediaWiki и из локального индекса, а
+    решения базы знаний - из OpenSearch и офлайн-индекса под одним ID; без ID
+    используется curid или сам URL.
+    """
+    if result.get('id'):
+        return str(result['id'])
+    url = result.get('url') or ''
+    match = CURID_RE.search(url)
+    if match:
+        return f"mediawiki_{match.group(1)}"
+    return url or None
+
+
+def rank_results(results_by_source, size=10, method='minmax', weights=None):
+    """
+    Единое ранжирование результатов федеративного поиска
+
+    Оценки каждого источника нормализуются отдельно (BM25 OpenSearch не
+    ограничен, MediaWiki отдает 1.0), дубликаты одной статьи объединяются:
+    остается лучший результат, оценка - максимум (для 'rrf' - сумма).
+    Возвращаются только size лучших.
+
+    Args:
+        results_by_source (dict): Имя источника -> список результатов в порядке выдачи
+        size (int): Количество результатов
+        method (str): Метод нормализации ('minmax', 'zscore', 'rrf')
+        weights (dict, optional): Веса источников (по умолчанию 1.0)
+
+    Returns:
+        list: Результаты по убыванию нормализованной оценки; исходная оценка
+        сохраняется в raw_score, все источники статьи - в sources
+    """
+    weights = weights or {}
+    merged = {}
+    for source_name, results in results_by_source.items():
+        results = sorted(results, key=lambda x: x.get('score', 0), reverse=True)
+        normalized = normalize_scores([result.get('score', 0) for result in results], method)
+        weight = weights.get(source_name, 1.0)
+        for result, score in zip(results, normalized):
+            score *= weight
+            key = dedupe_key(result) or (source_name, len(merged))
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = {
+                    **result,
+                    'score': score,
+                    'raw_score': result.get('score', 0),
+                    'sources': [source_name]
+                }
+                continue
+            if source_name not in entry['sources']:
+                entry['sources'].append(source_name)
+            if method == 'rrf':
+                entry['score'] += score
+            elif score > entry['score']:
+                sources = entry['sources']
+                entry.clear()
+                entry.update(result, score=score, raw_score=result.get('score', 0), sources=sources)
+
+    ranked = heapq.nlargest(size, merged.values(), key=lambda x: x['score'])
+    for result in ranked:
+        result['score'] = round(result['score'], 4)
+    return ranked
@@ -0,0 +1,134 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.modules.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+(?:-\w+)*')
+
+
+def normalize_query(query_text):
+    """
+    Нормализованный поисковый запрос для ключа кэша
+
+    Регистр, пунктуация, лишние пробелы и порядок слов не влияют на результат:
+    "Wi-Fi не работает " и "не работает wi-fi" дают один ключ.
+    """
+    return ' '.join(sorted(set(TOKEN_RE.findall(query_text.casefold()))))
+
+
+class SearchResultCache:
+    """
+    Кэш результатов поиска с ограничением размера, TTL и stale-while-revalidate.
+
+    Свежая запись (моложе ttl) отдается сразу. Устаревшая, но не старше
+    ttl + stale_ttl, тоже отдается сразу, а в фоне запускается одно обновление
+    на ключ. Инвалидация (после записи в индекс) увеличивает поколение кэша,
+    поэтому результаты обновлений, начатых до нее, не сохраняются.
+    """
+
+    def __init__(self, maxsize=1000, ttl=60, stale_ttl=300, refresh_workers=2):
+        """
+        Args:
+            maxsize (int): Максимальное количество запросов в кэше
+            ttl (float): Время, в течение которого результат считается свежим, в секундах
+            stale_ttl (float): Сколько еще секунд можно отдавать устаревший результат
+            refresh_workers (int): Количество потоков фонового обновления
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='search-cache')
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.saved_ms = 0.0
+
+    def _compute(self, key, compute, generation):
+        """Выполнить запрос и сохранить результат, если кэш не инвалидирован за это время"""
+        started = time.monotonic()
+        value, cacheable = compute()
+        took_ms = (time.monotonic() - started) * 1000
+        if cacheable:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries.set(key, (value, time.monotonic() + self.ttl, took_ms))
+        return value
+
+    def _refresh(self, key, compute, generation):
+        try:
+            self._compute(key, compute, generation)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            logger.error(f"Ошибка фонового обновления кэша поиска: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_compute(self, key, compute):
+        """
+        Результат из кэша или выполнение запроса
+
+        Args:
+            key: Ключ (нормализованный запрос и набор источников)
+            compute (callable): Функция без аргументов, возвращающая (значение, можно ли кэшировать)
+
+        Returns:
+            tuple: (значение, 'hit' | 'stale' | 'miss')
+        """
+        entry = self._entries.get(key)
+        if entry is not MISSING:
+            value, fresh_until, took_ms = entry
+            with self._lock:
+                self.saved_ms += took_ms
+                if time.monotonic() < fresh_until:
+                    self.hits += 1
+                    return value, 'hit'
+                self.stale_hits += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+                generation = self._generation
+            if start_refresh:
+                self._executor.submit(self._refresh, key, compute, generation)
+            return value, 'stale'
+
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+        return self._compute(key, compute, generation), 'miss'
+
+    def invalidate(self, *args):
+        """Сбросить все результаты (после изменения индекса); аргументы игнорируются"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Метрики кэша: доля попаданий и сэкономленное время"""
+        served = self.hits + self.stale_hits
+        total = served + self.misses
+        return {
+            'size': len(self._entries),
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': round(served / total, 3) if total else 0.0,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'invalidations': self._generation,
+            'saved_ms': round(self.saved_ms, 1)
+        }
@@ -2,17 +2,66 @@ import logging
 import json
 import requests
 import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from opensearchpy import OpenSearch, ConnectionError, NotFoundError, RequestError
+from opensearchpy.helpers import scan
+from app.modules.text_index import InvertedIndex
+from app.modules.local_index import LocalSearchIndex
+from app.modules.vector_search import VectorIndex, reciprocal_rank_fusion
+from app.modules.ranking import rank_results
+from app.modules.suggest import SuggestIndex
 
 logger = logging.getLogger(__name__)
 
 class SearchModule:
-    def __init__(self, host='localhost', port=9200, index_name='solutions', use_mock=True):
+    # Количество кандидатов векторного поиска, если размер выдачи не ограничен
+    HYBRID_CANDIDATES = 50
+    # Размер пула HTTP-соединений к MediaWiki
+    HTTP_POOL_SIZE = 16
+    # Общий для всех пакетных запросов предел одновременных обращений к источникам
+    BATCH_WORKERS = 16
+
+    def __init__(self, host='localhost', port=9200, index_name='solutions', use_mock=True, client=None,
+                 local_index_path=None, hybrid_search=True):
+        """
+        Инициализация модуля поиска
+
+        Args:
+            host (str): Хост OpenSearch
+            port (int): Порт OpenSearch
+            index_name (str): Имя индекса с решениями
+            use_mock (bool): Использовать мок-данные вместо OpenSearch
+            client (OpenSearch, optional): Общий клиент из реестра пулов; если не
+                указан, модуль создает собственный клиент
+            local_index_path (str, optional): Файл локального поискового индекса;
+                если указан, офлайн-индекс сохраняется на диск и переживает перезапуск
+            hybrid_search (bool): Дополнять офлайн-поиск по ключевым словам векторным
+                поиском (объединение рангов RRF)
+        """
         self.use_mock = use_mock
         self.mock_data = []
+        # Инвертированный индекс для офлайн-поиска (в памяти или в файле)
+        if local_index_path:
+            self.text_index = LocalSearchIndex(local_index_path)
+        else:
+            self.text_index = InvertedIndex()
+        # Векторный индекс для гибридного поиска (заполняется при индексации)
+        self.vector_index = VectorIndex() if hybrid_search else None
+        # Префиксный индекс подсказок (заголовки, теги, популярные запросы)
+        self.suggest_index = SuggestIndex()
         self.host = host
         self.port = port
         self.index_name = index_name
+        self.client = client
+        # Обработчики изменения индекса (например, сброс кэша результатов поиска)
+        self.change_listeners = []
+        # HTTP-сессия с пулом соединений к MediaWiki (общая для всех запросов)
+        self._http = None
+        self._http_lock = threading.Lock()
+        # Общий пул потоков пакетного поиска (создается при первом обращении)
+        self._batch_executor = None
         
         if use_mock:
             # Используем имитацию вместо реального OpenSearch для демонстрации
@@ -21,16 +70,17 @@ class SearchModule:
         else:
             logger.info(f"Попытка подключения к OpenSearch: {host}:{port}")
             try:
-                self.client = OpenSearch(
-                    hosts=[{'host': host, 'port': port}],
-                    http_auth=None,
-                    use_ssl=False,
-                    verify_certs=False,
-                    ssl_show_warn=False,
-                    timeout=30,
-                    retry_on_timeout=True,
-                    max_retries=3
-                )
+                if self.client is None:
+                    self.client = OpenSearch(
+                        hosts=[{'host': host, 'port': port}],
+                        http_auth=None,
+                        use_ssl=False,
+                        verify_certs=False,
+                        ssl_show_warn=False,
+                        timeout=30,
+                        retry_on_timeout=True,
+                        max_retries=3
+                    )
                 if not self.client.ping():
                     raise ConnectionError("Не удалось установить соединение с OpenSearch")
                 logger.info("Подключение к OpenSearch успешно установлено")
@@ -124,8 +174,73 @@ class SearchModule:
         ]
         
         self.mock_data = mock_solutions
+        for doc in self.mock_data:
+            # Сохраненный индекс уже может содержать демо-данные
+            if doc['id'] not in self.text_index:
+                self.text_index.add(doc)
+        if self.vector_index is not None:
+            # Векторы всего офлайн-индекса вычисляются пакетами один раз при загрузке
+            self.vector_index.add_batch(self.text_index.iter_documents())
+        self.suggest_index.add_documents(self.text_index.iter_documents())
+        # Дальше векторный индекс и подсказки следуют за изменениями офлайн-индекса
+        # (в том числе сделанными другими процессами и скриптом индексации)
+        self.text_index.add_listener(self._on_text_index_change)
         logger.info(f"Загружено {len(self.mock_data)} мок-записей")
     
+    def _on_text_index_change(self, event, value):
+        """Перенести изменение офлайн-индекса в векторный индекс и подсказки"""
+        if event == 'add':
+            if self.vector_index is not None:
+                self.vector_index.add(value)
+            self.suggest_index.add_document(value)
+        elif event == 'remove':
+            if self.vector_index is not None:
+                self.vector_index.remove(value)
+            self.suggest_index.remove_document(value)
+        elif event == 'reload':
+            if self.vector_index is not None:
+                self.vector_index.sync(self.text_index.iter_documents())
+            self.suggest_index.replace_documents(self.text_index.iter_documents())
+
+    def reload_suggestions(self):
+        """
+        Перестроить подсказки по документам текущего источника
+
+        В режиме OpenSearch заголовки и теги читаются прокруткой (scroll)
+        по индексу, в режиме моков - из офлайн-индекса. Подсказки по
+        запросам сохраняются.
+
+        Returns:
+            int: Количество документов, по которым построены подсказки
+        """
+        if self.use_mock:
+            documents = self.text_index.iter_documents()
+        else:
+            documents = (
+                {'id': hit['_id'], **hit.get('_source', {})}
+                for hit in scan(self.client, index=self.index_name,
+                                query={'_source': ['title', 'tags', 'url']}, size=1000)
+            )
+        count = self.suggest_index.replace_documents(documents)
+        logger.info(f"Подсказки поиска перестроены: {count} документов")
+        return count
+
+    def add_change_listener(self, callback):
+        """
+        Подписаться на изменения индекса
+
+        Args:
+            callback (callable): Вызывается с ID добавленного или обновленного документа
+        """
+        self.change_listeners.append(callback)
+
+    def _notify_change(self, doc_id):
+        for callback in self.change_listeners:
+            try:
+                callback(doc_id)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике изменения индекса: {str(e)}")
+    
     def index_document(self, doc_id, title, content, tags=None):
         """Добавить или обновить документ в индексе"""
         document = {
@@ -137,14 +252,20 @@ class SearchModule:
             document['tags'] = tags
             
         if self.use_mock:
-            # Для имитации просто добавляем в массив
-            for i, doc in enumerate(self.mock_data):
-                if doc['id'] == doc_id:
-                    self.mock_data[i] = document
-                    logger.info(f"Обновлен мок-документ: {doc_id}")
-                    return
+            # Для имитации добавляем в массив и инвертированный индекс
+            exists = doc_id in self.text_index
+            # Векторный индекс и подсказки обновляются обработчиком изменений офлайн-индекса
+            self.text_index.add(document)
+            if exists:
+                for i, doc in enumerate(self.mock_data):
+                    if doc['id'] == doc_id:
+                        self.mock_data[i] = document
+                        logger.info(f"Обновлен мок-документ: {doc_id}")
+                        self._notify_change(doc_id)
+                        return
             self.mock_data.append(document)
             logger.info(f"Добавлен мок-документ: {doc_id}")
+            self._notify_change(doc_id)
         else:
             # Для реального OpenSearch
             try:
@@ -155,11 +276,43 @@ class SearchModule:
                     refresh=True
                 )
                 logger.info(f"Документ успешно проиндексирован в OpenSearch: {doc_id}")
+                self.suggest_index.add_document(document)
+                self._notify_change(doc_id)
             except Exception as e:
                 logger.error(f"Ошибка при индексации документа {doc_id}: {str(e)}")
     
-    def search_mediawiki(self, query_text, base_url=None, limit=5):
-        """Выполнить поиск в MediaWiki API"""
+    def _http_session(self):
+        """Общая HTTP-сессия с пулом соединений (создается при первом обращении)"""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.HTTP_POOL_SIZE)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._http = session
+        return self._http
+    
+    def _batch_pool(self):
+        """Общий пул потоков пакетного поиска (BATCH_WORKERS потоков на процесс)"""
+        if self._batch_executor is None:
+            with self._http_lock:
+                if self._batch_executor is None:
+                    self._batch_executor = ThreadPoolExecutor(max_workers=self.BATCH_WORKERS,
+                                                              thread_name_prefix='search-batch')
+        return self._batch_executor
+
+    def search_mediawiki(self, query_text, base_url=None, limit=5, timeout=10, raise_errors=False):
+        """
+        Выполнить поиск в MediaWiki API
+
+        Args:
+            query_text (str): Поисковый запрос
+            base_url (str): Базовый URL MediaWiki
+            limit (int): Максимальное количество результатов
+            timeout (float): Таймаут HTTP-запроса в секундах
+            raise_errors (bool): Пробрасывать ошибки вместо возврата пустого списка
+        """
         if not base_url:
             # Если URL MediaWiki не указан, пропускаем поиск
             logger.debug("URL MediaWiki не указан, поиск пропущен")
@@ -179,11 +332,13 @@ class SearchModule:
                 'srlimit': limit
             }
             
-            # Выполняем запрос к MediaWiki API
-            response = requests.get(api_url, params=params, timeout=10)
+            # Выполняем запрос к MediaWiki API через общий пул соединений
+            response = self._http_session().get(api_url, params=params, timeout=timeout)
             
             if response.status_code != 200:
                 logger.error(f"Ошибка при запросе к MediaWiki API: {response.status_code}")
+                if raise_errors:
+                    raise RuntimeError(f"MediaWiki API вернул статус {response.status_code}")
                 return []
                 
             data = response.json()
@@ -208,6 +363,8 @@ class SearchModule:
         
         except Exception as e:
             logger.error(f"Ошибка при поиске в MediaWiki: {str(e)}")
+            if raise_errors:
+                raise
             return []
     
     def _clean_html(self, html_text):
@@ -218,125 +375,291 @@ class SearchModule:
     
     def search(self, query_text, size=10, mediawiki_url=None):
         """Выполнить полнотекстовый поиск из всех источников"""
-        all_results = []
+        results_by_source = {}
         logger.info(f"Поисковый запрос: '{query_text}'")
         
         # 1. Поиск в мок-данных (если включен режим моков)
         if self.use_mock:
             logger.info("Выполняем поиск в мок-данных...")
-            mock_results = self._search_mock(query_text)
+            mock_results = self._search_mock(query_text, size)
             for result in mock_results:
                 result['source'] = 'mock'
-            all_results.extend(mock_results)
+            results_by_source['mock'] = mock_results
         
         # 2. Поиск в OpenSearch (если не используем моки)
         else:
             try:
-                opensearch_results = self._search_opensearch(query_text, size)
-                for result in opensearch_results:
-                    result['source'] = 'opensearch'
-                all_results.extend(opensearch_results)
+                results_by_source['opensearch'] = self._search_opensearch(query_text, size, raise_errors=True)
             except Exception as e:
                 logger.error(f"Ошибка при поиске в OpenSearch: {str(e)}")
                 logger.info("Используем мок-данные из-за ошибки OpenSearch")
-                mock_results = self._search_mock(query_text)
+                mock_results = self._search_mock(query_text, size)
                 for result in mock_results:
                     result['source'] = 'mock'
-                all_results.extend(mock_results)
+                results_by_source['mock'] = mock_results
         
         # 3. Поиск в MediaWiki (если указан URL)
         if mediawiki_url:
             logger.info(f"Выполняем поиск в MediaWiki по URL: {mediawiki_url}")
             try:
-                mediawiki_results = self.search_mediawiki(query_text, mediawiki_url)
-                all_results.extend(mediawiki_results)
+                results_by_source['mediawiki'] = self.search_mediawiki(query_text, mediawiki_url, limit=size)
             except Exception as e:
                 logger.error(f"Ошибка при поиске в MediaWiki: {str(e)}")
         
-        # Сортируем по релевантности
-        all_results.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Ограничиваем количество результатов
+        # Нормализуем оценки источников, объединяем дубликаты и оставляем size лучших
+        all_results = rank_results(results_by_source, size)
         logger.info(f"Найдено {len(all_results)} результатов")
-        return all_results[:size]
+        return all_results
     
-    def _search_mock(self, query_text):
-        """Поиск в мок-данных"""
+    def _search_mock(self, query_text, size=None):
+        """
+        Поиск в мок-данных по инвертированному индексу (BM25, веса полей как в OpenSearch)
+
+        При включенном гибридном поиске результаты BM25 объединяются
+        с результатами векторного поиска методом RRF, поэтому находятся и
+        перефразированные описания проблемы.
+
+        Args:
+            query_text (str): Поисковый запрос
+            size (int, optional): Количество результатов (None - все найденные)
+        """
+        keyword_hits = self.text_index.search(query_text, size)
+        if self.vector_index is None:
+            ranked = [(doc, score) for doc, score in keyword_hits]
+        else:
+            vector_hits = self.vector_index.search(query_text, size or self.HYBRID_CANDIDATES)
+            documents = {doc['id']: doc for doc, _ in vector_hits}
+            documents.update((doc['id'], doc) for doc, _ in keyword_hits)
+            fused = reciprocal_rank_fusion([
+                [doc['id'] for doc, _ in keyword_hits],
+                [doc['id'] for doc, _ in vector_hits]
+            ])
+            ranked = [(documents[doc_id], score) for doc_id, score in fused[:size]]
+
         results = []
-        query_lower = query_text.lower()
-        
-        for doc in self.mock_data:
-            score = 0
-            
-            # Проверяем наличие ключевых слов в заголовке
-            if query_lower in doc['title'].lower():
-                score += 2
-            
-            # Проверяем наличие ключевых слов в содержимом
-            if query_lower in doc['content'].lower():
-                score += 1
-            
-            # Проверяем наличие ключевых слов в тегах
-            if 'tags' in doc:
-                for tag in doc['tags']:
-                    if query_lower in tag.lower():
-                        score += 1
-                        break
-            
-            if score > 0:
-                result = {
-                    'id': doc['id'],
-                    'title': doc['title'],
-                    'content': doc['content'],
-                    'score': score,
-                    'source': doc.get('source', 'mock')
-                }
-                results.append(result)
-        results.sort(key=lambda x: x['score'], reverse=True)
+        for doc, score in ranked:
+            result = {
+                'id': doc['id'],
+                'title': doc['title'],
+                'content': doc['content'],
+                'score': round(score, 4),
+                'source': doc.get('source', 'mock')
+            }
+            if doc.get('url'):
+                result['url'] = doc['url']
+            results.append(result)
         logger.info(f"Найдено {len(results)} результатов в мок-данных")
         return results
     
-    def _search_opensearch(self, query_text, size=10):
-        """Поиск в OpenSearch"""
-        try:
-            # Формируем поисковый запрос
-            query = {
-                'query': {
-                    'multi_match': {
-                        'query': query_text,
-                        'fields': ['title^2', 'content', 'tags^1.5'],
-                        'type': 'best_fields'
-                    }
-                },
-                'highlight': {
-                    'fields': {
-                        'content': {}
-                    }
+    def _opensearch_query(self, query_text):
+        """Тело поискового запроса к OpenSearch"""
+        return {
+            'query': {
+                'multi_match': {
+                    'query': query_text,
+                    'fields': ['title^2', 'content', 'tags^1.5'],
+                    'type': 'best_fields'
+                }
+            },
+            'highlight': {
+                'fields': {
+                    'content': {}
                 }
             }
+        }
+    
+    def _opensearch_results(self, response):
+        """Преобразовать ответ OpenSearch в список результатов"""
+        results = []
+        for hit in response['hits']['hits']:
+            source = hit['_source']
+            result = {
+                'id': source.get('id', hit['_id']),
+                'title': source.get('title', 'Без названия'),
+                'content': source.get('content', ''),
+                'score': hit['_score'],
+                'source': 'opensearch',  # Принудительно указываем источник
+                'url': source.get('url', '')
+            }
+            if 'highlight' in hit and 'content' in hit['highlight']:
+                result['highlight'] = hit['highlight']['content'][0]
+            results.append(result)
+        return results
+    
+    def _search_opensearch(self, query_text, size=10, timeout=None, raise_errors=False):
+        """
+        Поиск в OpenSearch
+
+        Args:
+            query_text (str): Поисковый запрос
+            size (int): Количество результатов
+            timeout (float, optional): Таймаут запроса в секундах
+            raise_errors (bool): Пробрасывать ошибки вместо возврата пустого списка
+        """
+        try:
+            # Формируем поисковый запрос
+            query = self._opensearch_query(query_text)
             logger.info(f"Поисковый запрос к OpenSearch: {json.dumps(query)}")
+            search_params = {}
+            if timeout is not None:
+                search_params['request_timeout'] = timeout
             response = self.client.search(
                 index=self.index_name,
                 body=query,
-                size=size
+                size=size,
+                **search_params
             )
-            results = []
-            for hit in response['hits']['hits']:
-                source = hit['_source']
-                result = {
-                    'id': source.get('id', hit['_id']),
-                    'title': source.get('title', 'Без названия'),
-                    'content': source.get('content', ''),
-                    'score': hit['_score'],
-                    'source': 'opensearch',  # Принудительно указываем источник
-                    'url': source.get('url', '')
-                }
-                if 'highlight' in hit and 'content' in hit['highlight']:
-                    result['highlight'] = hit['highlight']['content'][0]
-                results.append(result)
+            results = self._opensearch_results(response)
             logger.info(f"Найдено {len(results)} результатов в OpenSearch")
             return results
         except Exception as e:
             logger.error(f"Ошибка при поиске в OpenSearch: {str(e)}")
             logger.exception("Детальная информация об ошибке:")
-            return []
\ No newline at end of file
+            if raise_errors:
+                raise
+            return []
+    
+    def _msearch_opensearch(self, query_texts, size=10, timeout=None):
+        """
+        Пакетный поиск в OpenSearch одним запросом _msearch
+
+        Returns:
+            list: Для каждого запроса пара (результаты, ошибка или None)
+        """
+        body = []
+        for query_text in query_texts:
+            body.append({'index': self.index_name})
+            body.append({**self._opensearch_query(query_text), 'size': size})
+        search_params = {}
+        if timeout is not None:
+            search_params['request_timeout'] = timeout
+        response = self.client.msearch(body=body, **search_params)
+        answers = []
+        for item in response['responses']:
+            if 'error' in item:
+                error = item['error']
+                answers.append(([], error.get('reason', str(error)) if isinstance(error, dict) else str(error)))
+            else:
+                answers.append((self._opensearch_results(item), None))
+        return answers
+    
+    def search_many(self, queries, size=10, sources=('opensearch', 'mediawiki', 'mock'), mediawiki_url=None,
+                    concurrency=4, chunk_size=50, timeouts=None, method='minmax'):
+        """
+        Пакетный поиск (например, для разбора накопившихся заявок)
+
+        Запросы к OpenSearch отправляются пачками по chunk_size через _msearch,
+        офлайн-индекс опрашивается теми же пачками, поиск MediaWiki (у API нет
+        пакетного режима) выполняется по запросу через общий пул соединений.
+        Задачи выполняются в общем для всех вызовов пуле потоков (BATCH_WORKERS),
+        от одного вызова одновременно - не более concurrency задач; следующая
+        задача ставится по завершении предыдущей. Результат запроса отдается,
+        как только ответили все его источники.
+
+        Args:
+            queries (list): Тексты запросов
+            size (int): Количество результатов на запрос
+            sources (iterable): Источники ('opensearch', 'mediawiki', 'mock')
+            mediawiki_url (str, optional): Базовый URL MediaWiki
+            concurrency (int): Максимальное количество одновременных задач
+            chunk_size (int): Количество запросов в одном _msearch
+            timeouts (dict, optional): Таймауты обращения к источникам в секундах
+                ({'opensearch': ..., 'mediawiki': ...})
+            method (str): Метод нормализации оценок источников
+
+        Yields:
+            dict: {'index', 'query', 'results', 'errors'} в порядке готовности
+        """
+        queries = list(queries)
+        if not queries:
+            return
+        sources = set(sources)
+        timeouts = timeouts or {}
+        use_opensearch = 'opensearch' in sources and not self.use_mock
+        use_mock = 'mock' in sources or ('opensearch' in sources and self.use_mock)
+        use_mediawiki = 'mediawiki' in sources and bool(mediawiki_url)
+        chunks = [range(start, min(start + chunk_size, len(queries)))
+                  for start in range(0, len(queries), chunk_size)]
+
+        def run_opensearch(indexes):
+            try:
+                answers = self._msearch_opensearch([queries[i] for i in indexes], size, timeouts.get('opensearch'))
+            except Exception as e:
+                logger.error(f"Ошибка пакетного поиска в OpenSearch: {str(e)}")
+                answers = [([], str(e))] * len(indexes)
+            return [(i, 'opensearch', results, error) for i, (results, error) in zip(indexes, answers)]
+
+        def run_mock(indexes):
+            answers = []
+            for i in indexes:
+                try:
+                    answers.append((i, 'mock', self._search_mock(queries[i], size), None))
+                except Exception as e:
+                    logger.error(f"Ошибка пакетного поиска в офлайн-индексе: {str(e)}")
+                    answers.append((i, 'mock', [], str(e)))
+            return answers
+
+        def run_mediawiki(i):
+            try:
+                results = self.search_mediawiki(queries[i], mediawiki_url, limit=size,
+                                                timeout=timeouts.get('mediawiki') or 10, raise_errors=True)
+                return [(i, 'mediawiki', results, None)]
+            except Exception as e:
+                return [(i, 'mediawiki', [], str(e))]
+
+        parts = [0] * len(queries)
+        results_by_source = [{} for _ in queries]
+        errors = [{} for _ in queries]
+        # Задачи идут по пачкам, чтобы первые запросы завершались раньше
+        tasks = []
+        for indexes in chunks:
+            if use_opensearch:
+                tasks.append((run_opensearch, indexes))
+            if use_mock:
+                tasks.append((run_mock, indexes))
+            for i in indexes:
+                parts[i] = use_opensearch + use_mock
+                if use_mediawiki:
+                    tasks.append((run_mediawiki, i))
+                    parts[i] += 1
+        tasks = iter(tasks)
+
+        executor = self._batch_pool()
+        in_flight = set()
+
+        def submit_next():
+            task = next(tasks, None)
+            if task is not None:
+                in_flight.add(executor.submit(*task))
+
+        try:
+            for _ in range(max(1, concurrency)):
+                submit_next()
+            for i, query_text in enumerate(queries):
+                if parts[i] == 0:
+                    yield {'index': i, 'query': query_text, 'results': [], 'errors': {}}
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    in_flight.discard(future)
+                    submit_next()
+                    finished.extend(future.result())
+                for i, source_name, results, error in finished:
+                    results_by_source[i][source_name] = results
+                    if error:
+                        errors[i][source_name] = error
+                    parts[i] -= 1
+                    if parts[i] == 0:
+                        yield {
+                            'index': i,
+                            'query': queries[i],
+                            'results': rank_results(results_by_source[i], size, method=method),
+                            'errors': errors[i]
+                        }
+                        # Результаты отданы, память под них больше не нужна
+                        results_by_source[i] = errors[i] = None
+        finally:
+            # Клиент мог прервать чтение потока - не выполняем оставшиеся задачи
+            for future in in_flight:
+                future.cancel()
@@ -1,8 +1,25 @@
-import requests
+import base64
+import json
 from app.modules.ticket_storage import TicketStorage
+from app.modules.http_client import ResilientSession
+from app.modules.cache import TTLCache
+
+# Максимальный размер страницы, который отдает Redmine
+MAX_PAGE_SIZE = 100
 
 class ServiceDeskModule:
-    def __init__(self, api_url=None, api_key=None, use_mock=True):
+    def __init__(self, api_url=None, api_key=None, use_mock=True, http_options=None,
+                 cache_size=1000, cache_ttl=30):
+        """
+        Args:
+            api_url (str): URL Redmine
+            api_key (str): API-ключ Redmine
+            use_mock (bool): Использовать локальное хранилище вместо Redmine
+            http_options (dict, optional): Параметры ResilientSession (pool_size,
+                read_timeout, retries, failure_threshold, reset_timeout, ...)
+            cache_size (int): Максимальное количество записей в кэше чтения Redmine
+            cache_ttl (float): Время жизни записей кэша в секундах
+        """
         self.use_mock = use_mock
         
         if not use_mock:
@@ -14,6 +31,11 @@ class ServiceDeskModule:
                 "Content-Type": "application/json",
                 "X-Redmine-API-Key": api_key
             }
+            # Общая сессия с пулом соединений, таймаутами, повторами и circuit breaker
+            self.http = ResilientSession(api_url, headers=self.headers, **(http_options or {}))
+            # Кэши чтения: отдельные заявки и страницы списков
+            self.ticket_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+            self.list_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
         else:
             # Используем локальное хранилище для моков
             self.ticket_storage = TicketStorage()
@@ -52,12 +74,10 @@ class ServiceDeskModule:
             }
             if assigned_to:
                 issue_data['issue']['assigned_to_id'] = assigned_to  
-            response = requests.post(
-                f"{self.api_url}/issues.json",
-                headers=self.headers,
-                json=issue_data
-            )
+            response = self.http.post("/issues.json", json=issue_data)
             if response.status_code in (200, 201):
+                # Новая заявка меняет состав страниц списка
+                self.list_cache.clear()
                 return response.json()['issue']
             else:
                 raise Exception(f"Failed to create ticket: {response.text}")
@@ -74,15 +94,14 @@ class ServiceDeskModule:
         if self.use_mock:
             return self.ticket_storage.get_ticket(ticket_id)
         else:
-            response = requests.get(
-                f"{self.api_url}/issues/{ticket_id}.json",
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()['issue']
-            else:
-                return None
+            return self.ticket_cache.get_or_load(ticket_id, lambda: self._fetch_ticket(ticket_id))
+    
+    def _fetch_ticket(self, ticket_id):
+        """Загрузить заявку из Redmine"""
+        response = self.http.get(f"/issues/{ticket_id}.json")
+        if response.status_code == 200:
+            return response.json()['issue']
+        return None
     
     def get_all_tickets(self):
         """
@@ -94,16 +113,116 @@ class ServiceDeskModule:
         if self.use_mock:
             return self.ticket_storage.get_all_tickets()
         else:
-            response = requests.get(
-                f"{self.api_url}/issues.json",
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()['issues']
-            else:
-                return []
+            return self.list_cache.get_or_load('all', self._fetch_all_tickets) or []
+    
+    def _fetch_all_tickets(self):
+        """Загрузить список заявок из Redmine"""
+        response = self.http.get("/issues.json")
+        if response.status_code == 200:
+            return response.json()['issues']
+        return None
     
+    def list_tickets(self, offset=0, limit=25, filters=None, sort='-created_on', fields=None, cursor=None):
+        """
+        Получить страницу заявок
+
+        Args:
+            offset (int): Смещение первой заявки страницы
+            limit (int): Размер страницы (не более MAX_PAGE_SIZE)
+            filters (dict, optional): Фильтры: status, priority, project_id, assigned_to,
+                created_from, created_to
+            sort (str): Поле сортировки, префикс '-' - по убыванию
+            fields (list, optional): Список возвращаемых полей (по умолчанию все)
+            cursor (str, optional): Курсор следующей страницы из предыдущего ответа;
+                если указан, заменяет offset
+
+        Returns:
+            dict: Заявки страницы, общее количество и курсор следующей страницы
+        """
+        if cursor:
+            offset = self._decode_cursor(cursor)
+        offset = max(0, offset)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = filters or {}
+
+        if self.use_mock:
+            tickets, total = self.ticket_storage.query_tickets(
+                filters=filters, sort=sort, offset=offset, limit=limit, fields=fields
+            )
+        else:
+            cache_key = (offset, limit, tuple(sorted(filters.items())), sort, tuple(fields or ()))
+            page = self.list_cache.get_or_load(
+                cache_key,
+                lambda: self._fetch_ticket_page(offset, limit, filters, sort, fields)
+            )
+            tickets, total = page if page is not None else ([], 0)
+
+        next_offset = offset + len(tickets)
+        return {
+            'tickets': tickets,
+            'total_count': total,
+            'offset': offset,
+            'limit': limit,
+            'next_cursor': self._encode_cursor(next_offset) if next_offset < total else None
+        }
+
+    def _fetch_ticket_page(self, offset, limit, filters, sort, fields):
+        """Загрузить страницу заявок из Redmine"""
+        response = self.http.get(
+            "/issues.json",
+            params=self._redmine_list_params(offset, limit, filters, sort)
+        )
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        tickets = data.get('issues', [])
+        if fields:
+            tickets = [{f: t[f] for f in fields if f in t} for t in tickets]
+        return tickets, data.get('total_count', 0)
+
+    def _invalidate(self, ticket_id):
+        """Сбросить кэшированные данные после изменения заявки"""
+        self.ticket_cache.invalidate(ticket_id)
+        self.list_cache.clear()
+
+    def _redmine_list_params(self, offset, limit, filters, sort):
+        """Преобразует параметры списка заявок в параметры /issues.json Redmine"""
+        params = {'offset': offset, 'limit': limit}
+        sort_field = sort.lstrip('-') or 'created_on'
+        params['sort'] = f"{sort_field}:desc" if sort.startswith('-') else sort_field
+        if 'status' in filters:
+            params['status_id'] = self._get_status_id(filters['status'])
+        if 'priority' in filters:
+            params['priority_id'] = self._get_priority_id(filters['priority'])
+        if 'project_id' in filters:
+            params['project_id'] = filters['project_id']
+        if 'assigned_to' in filters:
+            params['assigned_to_id'] = filters['assigned_to']
+        created_from = filters.get('created_from')
+        created_to = filters.get('created_to')
+        if created_from and created_to:
+            params['created_on'] = f"><{created_from}|{created_to}"
+        elif created_from:
+            params['created_on'] = f">={created_from}"
+        elif created_to:
+            params['created_on'] = f"<={created_to}"
+        return params
+
+    @staticmethod
+    def _encode_cursor(offset):
+        """Непрозрачный курсор следующей страницы"""
+        raw = json.dumps({'offset': offset}).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Смещение из курсора страницы"""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return max(0, int(data['offset']))
+        except Exception:
+            raise ValueError("Invalid cursor")
+
     def update_ticket(self, ticket_id, **kwargs):
         """
         Обновить заявку
@@ -119,11 +238,8 @@ class ServiceDeskModule:
             issue_data = {
                 'issue': kwargs
             }
-            response = requests.put(
-                f"{self.api_url}/issues/{ticket_id}.json",
-                headers=self.headers,
-                json=issue_data
-            )
+            response = self.http.put(f"/issues/{ticket_id}.json", json=issue_data)
+            self._invalidate(ticket_id)
             return response.status_code == 200
     def add_comment(self, ticket_id, comment):
         """
@@ -144,11 +260,8 @@ class ServiceDeskModule:
                     'notes': comment
                 }
             }
-            response = requests.put(
-                f"{self.api_url}/issues/{ticket_id}.json",
-                headers=self.headers,
-                json=issue_data
-            )
+            response = self.http.put(f"/issues/{ticket_id}.json", json=issue_data)
+            self._invalidate(ticket_id)
             return response.status_code == 200
     
     def attach_solution(self, ticket_id, solution_text, source="unknown"):
@@ -168,6 +281,24 @@ class ServiceDeskModule:
         else:
             return self.add_comment(ticket_id, f"Найденное решение: {solution_text}\n\nИсточник: {source}")
     
+    def get_stats(self):
+        """
+        Статистика подключения к Service Desk для мониторинга
+
+        Returns:
+            dict: Статистика пула соединений, circuit breaker и кэша чтения (для Redmine)
+        """
+        if self.use_mock:
+            return {'backend': 'local'}
+        return {
+            'backend': 'redmine',
+            'http': self.http.stats(),
+            'cache': {
+                'tickets': self.ticket_cache.stats(),
+                'lists': self.list_cache.stats()
+            }
+        }
+    
     def _get_priority_id(self, priority_name):
         """Преобразует текстовый приоритет в ID для Redmine"""
         priorities = {
@@ -176,4 +307,22 @@ class ServiceDeskModule:
             'high': 3,
             'urgent': 4
         }
-        return priorities.get(priority_name.lower(), 2)
\ No newline at end of file
+        return priorities.get(priority_name.lower(), 2)
+
+    def _get_status_id(self, status_name):
+        """Преобразует текстовый статус в значение status_id для Redmine (ID или open/closed/*)"""
+        status = str(status_name).strip().lower()
+        if status in ('open', 'closed', '*') or status.isdigit():
+            return status
+        statuses = {
+            'new': 1,
+            'in_progress': 2,
+            'resolved': 3,
+            'feedback': 4,
+            'closed': 5,
+            'rejected': 6
+        }
+        status_id = statuses.get(status.replace(' ', '_'))
+        if status_id is None:
+            raise ValueError(f"Unknown status: {status_name}")
+        return status_id
@@ -0,0 +1,247 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+SPACE_RE = re.compile(r'\s+')
+
+# Порядок типов подсказок при равном весе
+KIND_PRIORITY = {'title': 0, 'query': 1, 'tag': 2}
+
+
+def normalize_prefix(text):
+    """Нормализованный текст для сравнения префиксов (регистр и пробелы)"""
+    return SPACE_RE.sub(' ', text.casefold()).strip()
+
+
+class SuggestIndex:
+    """
+    Префиксный индекс подсказок поиска (заголовки, теги, популярные запросы).
+
+    Ключи хранятся в отсортированном массиве пар (ключ, номер подсказки);
+    поиск по префиксу - bisect до первого подходящего ключа и просмотр
+    соседних, поэтому время ответа не зависит от размера базы. Каждая
+    подсказка индексируется с начала каждого слова ("проблем с wi-fi",
+    "wi-fi"), чтобы находиться по любому слову. Обновляется по одному
+    документу без перестроения.
+    """
+
+    def __init__(self, max_queries=10000, scan_limit=200, min_query_count=3):
+        """
+        Args:
+            max_queries (int): Максимальное количество запоминаемых запросов
+            scan_limit (int): Максимальное количество просматриваемых ключей на запрос
+            min_query_count (int): Сколько раз запрос должен быть выполнен, чтобы стать подсказкой
+        """
+        self.max_queries = max_queries
+        self.scan_limit = scan_limit
+        self.min_query_count = min_query_count
+        self._keys = []
+        self._entries = {}
+        self._by_text = {}
+        # Документы, ссылающиеся на подсказку-заголовок: {номер подсказки: {ID документа: URL}}
+        self._owners = {}
+        self._documents = {}
+        # Счетчики запросов и куча (счетчик, запрос) для вытеснения самого редкого;
+        # устаревшие элементы кучи пропускаются при вытеснении
+        self._query_counts = {}
+        self._query_heap = []
+        self._query_entries = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _word_keys(self, text):
+        """Ключи для каждого начала слова фразы"""
+        words = text.split(' ')
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def _add_entry(self, text, kind, weight=1, doc_id=None, url=None):
+        """Добавить подсказку или увеличить вес существующей; возвращает ее номер"""
+        key = normalize_prefix(text)
+        if not key:
+            return None
+        entry_id = self._by_text.get((kind, key))
+        if entry_id is not None:
+            entry = self._entries[entry_id]
+            entry['weight'] += weight
+            entry['refs'] += 1
+        else:
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = {'text': text.strip(), 'type': kind, 'weight': weight, 'refs': 1}
+            self._entries[entry_id] = entry
+            self._by_text[(kind, key)] = entry_id
+            for word_key in self._word_keys(key):
+                insort(self._keys, (word_key, entry_id))
+        if doc_id is not None:
+            owners = self._owners.setdefault(entry_id, {})
+            owners[doc_id] = url
+            if len(owners) == 1:
+                self._point_to(entry, doc_id, url)
+        return entry_id
+
+    @staticmethod
+    def _point_to(entry, doc_id, url):
+        """Направить подсказку на документ"""
+        entry['id'] = doc_id
+        if url:
+            entry['url'] = url
+        else:
+            entry.pop('url', None)
+
+    def _release_entry(self, entry_id, weight=1, doc_id=None):
+        """Уменьшить счетчик ссылок подсказки и удалить ее, если он обнулился"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        entry['refs'] -= 1
+        entry['weight'] -= weight
+        owners = self._owners.get(entry_id)
+        if owners is not None and doc_id in owners:
+            del owners[doc_id]
+            if owners and entry.get('id') == doc_id:
+                # Общий заголовок ведет на следующий ссылающийся документ
+                self._point_to(entry, *next(iter(owners.items())))
+        if entry['refs'] > 0:
+            return
+        del self._entries[entry_id]
+        self._owners.pop(entry_id, None)
+        key = normalize_prefix(entry['text'])
+        self._by_text.pop((entry['type'], key), None)
+        for word_key in self._word_keys(key):
+            i = bisect_left(self._keys, (word_key, entry_id))
+            if i < len(self._keys) and self._keys[i] == (word_key, entry_id):
+                del self._keys[i]
+
+    def add_document(self, document):
+        """Добавить или обновить подсказки документа (заголовок и теги)"""
+        with self._lock:
+            self._remove_document(document['id'])
+            title_id = None
+            if document.get('title'):
+                title_id = self._add_entry(document['title'], 'title',
+                                           doc_id=document['id'], url=document.get('url'))
+            tags = document.get('tags') or []
+            if isinstance(tags, str):
+                tags = [tags]
+            tag_ids = [self._add_entry(tag, 'tag') for tag in tags]
+            self._documents[document['id']] = (title_id, [entry_id for entry_id in tag_ids if entry_id is not None])
+
+    def add_documents(self, documents):
+        for document in documents:
+            self.add_document(document)
+
+    def replace_documents(self, documents):
+        """
+        Заменить набор документов (подсказки по запросам сохраняются)
+
+        Документы, отсутствующие в новом наборе, удаляются из подсказок.
+
+        Returns:
+            int: Количество документов в новом наборе
+        """
+        seen = set()
+        for document in documents:
+            self.add_document(document)
+            seen.add(document['id'])
+        with self._lock:
+            for doc_id in [doc_id for doc_id in self._documents if doc_id not in seen]:
+                self._remove_document(doc_id)
+        return len(seen)
+
+    def remove_document(self, doc_id):
+        """Удалить подсказки документа"""
+        with self._lock:
+            self._remove_document(doc_id)
+
+    def _remove_document(self, doc_id):
+        entry_ids = self._documents.pop(doc_id, None)
+        if entry_ids is None:
+            return
+        title_id, tag_ids = entry_ids
+        if title_id is not None:
+            self._release_entry(title_id, doc_id=doc_id)
+        for entry_id in tag_ids:
+            self._release_entry(entry_id)
+
+    def record_query(self, query_text):
+        """
+        Учесть выполненный поисковый запрос
+
+        Запрос становится подсказкой после min_query_count выполнений, популярные
+        запросы поднимаются выше. При переполнении вытесняется самый редкий
+        запрос (куча по счетчику, O(log n)).
+        """
+        key = normalize_prefix(query_text)
+        if not key:
+            return
+        with self._lock:
+            count = self._query_counts.get(key)
+            if count is None and len(self._query_counts) >= self.max_queries:
+                self._evict_rare_query()
+            count = (count or 0) + 1
+            self._query_counts[key] = count
+            heapq.heappush(self._query_heap, (count, key))
+            if len(self._query_heap) > 2 * self.max_queries:
+                # Убираем устаревшие элементы кучи
+                self._query_heap = [(value, item) for item, value in self._query_counts.items()]
+                heapq.heapify(self._query_heap)
+
+            entry_id = self._query_entries.get(key)
+            if entry_id is not None:
+                self._entries[entry_id]['weight'] += 1
+            elif count >= self.min_query_count:
+                self._query_entries[key] = self._add_entry(query_text, 'query', weight=count)
+
+    def _evict_rare_query(self):
+        """Вытеснить самый редкий запрос"""
+        while self._query_heap:
+            count, key = heapq.heappop(self._query_heap)
+            if self._query_counts.get(key) != count:
+                continue
+            del self._query_counts[key]
+            entry_id = self._query_entries.pop(key, None)
+            if entry_id is not None:
+                self._release_entry(entry_id, weight=self._entries[entry_id]['weight'])
+            return
+
+    def suggest(self, prefix, limit=8):
+        """
+        Подсказки по префиксу
+
+        Args:
+            prefix (str): Начало любого слова подсказки
+            limit (int): Количество подсказок
+
+        Returns:
+            list: Подсказки ({'text', 'type', 'weight', 'id'?, 'url'?}) по убыванию веса
+        """
+        key = normalize_prefix(prefix)
+        if not key:
+            return []
+        with self._lock:
+            found = {}
+            i = bisect_left(self._keys, (key,))
+            end = min(len(self._keys), i + self.scan_limit)
+            while i < end and self._keys[i][0].startswith(key):
+                entry_id = self._keys[i][1]
+                found[entry_id] = self._entries[entry_id]
+                i += 1
+            ranked = sorted(found.values(),
+                            key=lambda entry: (-entry['weight'], KIND_PRIORITY[entry['type']], entry['text']))
+            return [
+                {name: value for name, value in entry.items() if name != 'refs'}
+                for entry in ranked[:limit]
+            ]
+
+    def stats(self):
+        return {
+            'suggestions': len(self._entries),
+            'keys': len(self._keys),
+            'documents': len(self._documents),
+            'queries': len(self._query_counts),
+            'query_suggestions': len(self._query_entries)
+        }
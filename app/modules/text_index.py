@@ -0,0 +1,314 @@
+import functools
+import heapq
+import logging
+import math
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+(?:-\w+)*')
+CYRILLIC_RE = re.compile('[а-я]')
+
+# Русский стеммер - алгоритм Snowball (как фильтр russian в OpenSearch): окончания
+# отсекаются только в области RV (после первой гласной), суффиксы -ост/-ость - в
+# области R2, поэтому "интернет" и "интернета" дают одну основу. Группы окончаний:
+# (требующие перед собой "а" или "я", остальные)
+RU_VOWELS = frozenset('аеиоуыэюя')
+RU_PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                        ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+RU_ADJECTIVE = ((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+                     'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+RU_PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+RU_REFLEXIVE = ((), ('ся', 'сь'))
+RU_VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+           ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+            'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+RU_NOUN = ((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой',
+                'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+                'ью', 'ю', 'ия', 'ья', 'я'))
+RU_DERIVATIONAL = ('ость', 'ост')
+RU_SUPERLATIVE = ('ейше', 'ейш')
+
+def _ru_endings(groups):
+    """Окончания группы по убыванию длины с признаком: требуется ли перед окончанием а или я"""
+    conditional, plain = groups
+    endings = [(ending, True) for ending in conditional] + [(ending, False) for ending in plain]
+    return sorted(endings, key=lambda item: len(item[0]), reverse=True)
+
+
+RU_STEPS = {name: _ru_endings(groups) for name, groups in (
+    ('gerund', RU_PERFECTIVE_GERUND), ('adjective', RU_ADJECTIVE), ('participle', RU_PARTICIPLE),
+    ('reflexive', RU_REFLEXIVE), ('verb', RU_VERB), ('noun', RU_NOUN)
+)}
+
+
+def _ru_strip(word, start, step):
+    """
+    Отсечь самое длинное окончание шага, лежащее не левее start
+
+    Returns:
+        str: Слово без окончания или None, если окончание не найдено
+    """
+    for ending, after_a in RU_STEPS[step]:
+        cut = len(word) - len(ending)
+        if cut < start or not word.endswith(ending):
+            continue
+        if after_a and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            return None
+        return word[:cut]
+    return None
+
+
+def _ru_regions(word):
+    """Начала областей RV и R2 слова"""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in RU_VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in RU_VOWELS and word[i - 1] in RU_VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def stem_russian(word):
+    """Основа русского слова (Snowball)"""
+    word = word.replace('ё', 'е')
+    rv, r2 = _ru_regions(word)
+
+    stemmed = _ru_strip(word, rv, 'gerund')
+    if stemmed is None:
+        word = _ru_strip(word, rv, 'reflexive') or word
+        stemmed = _ru_strip(word, rv, 'adjective')
+        if stemmed is not None:
+            stemmed = _ru_strip(stemmed, rv, 'participle') or stemmed
+        else:
+            stemmed = _ru_strip(word, rv, 'verb') or _ru_strip(word, rv, 'noun') or word
+    word = stemmed
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    for ending in RU_DERIVATIONAL:
+        if word.endswith(ending) and len(word) - len(ending) >= r2:
+            word = word[:-len(ending)]
+            break
+
+    for ending in RU_SUPERLATIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= rv:
+            word = word[:-len(ending)]
+            break
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+EN_SUFFIXES = [
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('ousness', 'ous'),
+    ('iveness', 'ive'), ('ations', 'ate'), ('ation', 'ate'), ('ingly', ''), ('edly', ''),
+    ('ings', ''), ('ing', ''), ('ies', 'y'), ('ied', 'y'), ('ed', ''), ('ly', ''),
+    ('es', ''), ('s', '')
+]
+
+MIN_STEM = 3
+
+
+@functools.lru_cache(maxsize=100000)
+def stem(token):
+    """Стеммер для русских (Snowball) и английских (отсечение суффиксов) слов, с кэшем"""
+    if CYRILLIC_RE.search(token):
+        return stem_russian(token)
+    if not token.isalpha():
+        return token
+    for suffix, replacement in EN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= MIN_STEM:
+            if suffix == 's' and token.endswith('ss'):
+                break
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def bm25(tf, df, total_docs, length, avg_length, k1=1.2, b=0.75):
+    """Оценка BM25 одного терма в поле документа"""
+    idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+    return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+
+
+def notify_listeners(listeners, event, value):
+    """Вызвать обработчики изменения индекса (ошибки обработчиков не прерывают индексацию)"""
+    for callback in listeners:
+        try:
+            callback(event, value)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике изменения индекса: {str(e)}")
+
+
+def analyze(text):
+    """Разбить текст на нормализованные термы (нижний регистр и стемминг)"""
+    return [stem(token) for token in TOKEN_RE.findall(text.casefold())]
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс в памяти с ранжированием BM25 по полям.
+
+    Для каждого поля хранятся списки вхождений терм -> {ID документа: частота}
+    и длины документов. Оценка документа, как у multi_match с типом
+    best_fields, - максимум оценок BM25 по полям с учетом весов полей. Время
+    запроса зависит от длины списков вхождений термов запроса, а не от
+    размера корпуса.
+    """
+
+    # Веса полей, как в запросе к OpenSearch: title^2, content, tags^1.5
+    FIELDS = {'title': 2.0, 'content': 1.0, 'tags': 1.5}
+
+    def __init__(self, fields=None, k1=1.2, b=0.75):
+        """
+        Args:
+            fields (dict, optional): Поля и их веса
+            k1 (float): Параметр насыщения частоты терма BM25
+            b (float): Параметр нормализации по длине BM25
+        """
+        self.fields = fields or dict(self.FIELDS)
+        self.k1 = k1
+        self.b = b
+        self.documents = {}
+        self._postings = {field: {} for field in self.fields}
+        self._lengths = {field: {} for field in self.fields}
+        self._total_lengths = dict.fromkeys(self.fields, 0)
+        self._lock = threading.RLock()
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def iter_documents(self):
+        """Все документы индекса"""
+        with self._lock:
+            documents = list(self.documents.values())
+        yield from documents
+
+    def postings(self, field, term):
+        """Список вхождений терма в поле: {ID документа: частота}"""
+        return self._postings[field].get(term, {})
+
+    def field_length(self, field, doc_id):
+        """Длина поля документа в термах"""
+        return self._lengths[field][doc_id]
+
+    def total_length(self, field):
+        """Суммарная длина поля по всем документам"""
+        return self._total_lengths[field]
+
+    def _field_terms(self, document, field):
+        value = document.get(field)
+        if not value:
+            return []
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(value)
+        return analyze(value)
+
+    def add_listener(self, callback):
+        """
+        Подписаться на изменения индекса
+
+        Args:
+            callback (callable): Вызывается как callback(event, value): ('add', документ),
+                ('remove', ID документа) или ('reload', None) - индекс заменен целиком
+        """
+        self.listeners.append(callback)
+
+    def add(self, document):
+        """Добавить или заменить документ (по полю id)"""
+        doc_id = document['id']
+        with self._lock:
+            if doc_id in self.documents:
+                self._remove(doc_id)
+            self.documents[doc_id] = document
+            for field in self.fields:
+                terms = self._field_terms(document, field)
+                if not terms:
+                    continue
+                postings = self._postings[field]
+                for term in terms:
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = {}
+                    entry[doc_id] = entry.get(doc_id, 0) + 1
+                self._lengths[field][doc_id] = len(terms)
+                self._total_lengths[field] += len(terms)
+        notify_listeners(self.listeners, 'add', document)
+
+    def remove(self, doc_id):
+        """Удалить документ из индекса"""
+        with self._lock:
+            if doc_id not in self.documents:
+                return
+            self._remove(doc_id)
+        notify_listeners(self.listeners, 'remove', doc_id)
+
+    def _remove(self, doc_id):
+        document = self.documents.pop(doc_id)
+        for field in self.fields:
+            length = self._lengths[field].pop(doc_id, None)
+            if length is None:
+                continue
+            self._total_lengths[field] -= length
+            postings = self._postings[field]
+            for term in set(self._field_terms(document, field)):
+                entry = postings.get(term)
+                if entry is not None:
+                    entry.pop(doc_id, None)
+                    if not entry:
+                        del postings[term]
+
+    def search(self, query_text, size=None):
+        """
+        Поиск по индексу
+
+        Args:
+            query_text (str): Поисковый запрос
+            size (int, optional): Количество результатов (None - все найденные)
+
+        Returns:
+            list: Пары (документ, оценка), отсортированные по убыванию оценки
+        """
+        terms = set(analyze(query_text))
+        if not terms:
+            return []
+        with self._lock:
+            total_docs = len(self.documents)
+            scores = {}
+            for field, boost in self.fields.items():
+                postings = self._postings[field]
+                lengths = self._lengths[field]
+                avg_length = self._total_lengths[field] / total_docs if total_docs else 0
+                field_scores = {}
+                for term in terms:
+                    entry = postings.get(term)
+                    if not entry:
+                        continue
+                    df = len(entry)
+                    for doc_id, tf in entry.items():
+                        score = bm25(tf, df, total_docs, lengths[doc_id], avg_length, self.k1, self.b)
+                        field_scores[doc_id] = field_scores.get(doc_id, 0.0) + score
+                for doc_id, score in field_scores.items():
+                    score *= boost
+                    if score > scores.get(doc_id, 0.0):
+                        scores[doc_id] = score
+            if size is None:
+                ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            else:
+                ranked = heapq.nlargest(size, scores.items(), key=lambda item: item[1])
+            return [(self.documents[doc_id], score) for doc_id, score in ranked]
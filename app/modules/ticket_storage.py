@@ -1,114 +1,489 @@
 import json
 import os
 import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:
+    # На платформах без fcntl (Windows) остается только блокировка между потоками
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+def _sort_key(value):
+    """Ключ сортировки, допускающий отсутствующие значения"""
+    return (value is not None, value if value is not None else '')
+
+
+def _project(ticket, fields):
+    """Оставить в заявке только запрошенные поля"""
+    if not fields:
+        return ticket
+    return {field: ticket[field] for field in fields if field in ticket}
+
+
+# Поля заявки, по которым строятся вторичные индексы
+INDEXED_FIELDS = ('status', 'priority', 'project_id', 'assigned_to')
+
+
+class TicketIndex:
+    """
+    Вторичные индексы по заявкам.
+
+    Для каждого индексируемого поля хранит отображение значение -> список
+    ключей (created_on, id), отсортированный по дате создания, а также общий
+    список ключей для запросов по диапазону дат. Индексы обновляются
+    инкрементально при создании и изменении заявок, поэтому запросы вида
+    «срочные открытые заявки исполнителя X» выполняются за O(результат),
+    а не за O(все заявки).
+    """
+
+    def __init__(self, fields=INDEXED_FIELDS):
+        self.fields = fields
+        self.clear()
+
+    def clear(self):
+        """Очистить все индексы"""
+        self._postings = {field: {} for field in self.fields}
+        self._by_created = []
+
+    @staticmethod
+    def key(ticket):
+        """Ключ заявки в индексах"""
+        return (ticket.get('created_on') or '', ticket['id'])
+
+    def add(self, ticket):
+        """Добавить заявку во все индексы"""
+        key = self.key(ticket)
+        insort(self._by_created, key)
+        for field in self.fields:
+            self._add_posting(field, ticket.get(field), key)
+
+    def update(self, ticket, old_key, old_values):
+        """
+        Обновить индексы после изменения заявки
+
+        Args:
+            ticket (dict): Заявка после изменения
+            old_key (tuple): Ключ заявки до изменения
+            old_values (dict): Значения индексируемых полей до изменения
+        """
+        key = self.key(ticket)
+        if key != old_key:
+            # Изменилась дата создания - переносим заявку во всех индексах
+            i = bisect_left(self._by_created, old_key)
+            if i < len(self._by_created) and self._by_created[i] == old_key:
+                del self._by_created[i]
+            for field, old_value in old_values.items():
+                self._remove_posting(field, old_value, old_key)
+            self.add(ticket)
+            return
+        for field, old_value in old_values.items():
+            new_value = ticket.get(field)
+            if new_value != old_value:
+                self._remove_posting(field, old_value, key)
+                self._add_posting(field, new_value, key)
+
+    def _add_posting(self, field, value, key):
+        if value is None:
+            return
+        try:
+            insort(self._postings[field].setdefault(value, []), key)
+        except TypeError:
+            # Нехешируемые значения (например, объекты Redmine) не индексируются
+            pass
+
+    def _remove_posting(self, field, value, key):
+        if value is None:
+            return
+        try:
+            keys = self._postings[field].get(value)
+        except TypeError:
+            return
+        if not keys:
+            return
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+        if not keys:
+            del self._postings[field][value]
+
+    def candidates(self, filters):
+        """
+        Наименьший набор ключей-кандидатов для фильтров
+
+        Args:
+            filters (dict): Фильтры запроса
+
+        Returns:
+            list: Ключи, отсортированные по дате создания, или None,
+                если ни один индекс к фильтрам не применим
+        """
+        lists = []
+        for field in self.fields:
+            if field in filters:
+                try:
+                    lists.append(self._postings[field].get(filters[field], []))
+                except TypeError:
+                    return None
+        created_from = filters.get('created_from')
+        created_to = filters.get('created_to')
+        if created_from or created_to:
+            lo = bisect_left(self._by_created, (created_from,)) if created_from else 0
+            # Верхняя граница включает все значения с префиксом created_to
+            hi = bisect_right(self._by_created, (created_to + '\uffff',)) if created_to else len(self._by_created)
+            lists.append(self._by_created[lo:hi])
+        if not lists:
+            return None
+        return min(lists, key=len)
+
+
+class _StorageLock:
+    """
+    Блокировка хранилища: потоковая внутри процесса и файловая (flock)
+    между процессами (например, воркерами gunicorn)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+
+    @contextmanager
+    def _locked(self, mode):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def shared(self):
+        """Разделяемая блокировка для чтения"""
+        return self._locked(fcntl.LOCK_SH if fcntl else None)
+
+    def exclusive(self):
+        """Исключительная блокировка для записи"""
+        return self._locked(fcntl.LOCK_EX if fcntl else None)
+
+
 class TicketStorage:
     """
     Класс для управления хранилищем заявок.
-    Сохраняет заявки в JSON-файл для обеспечения персистентного хранения.
+
+    Заявки хранятся в памяти в словаре по ID (поиск за O(1)). Каждое изменение
+    дописывается одной строкой в журнал (write-ahead log), а полный снимок
+    в JSON-файл записывается только при периодическом уплотнении журнала.
+    При запуске загружается снимок и воспроизводится журнал.
+
+    Хранилище безопасно для нескольких потоков и процессов: изменения
+    выполняются под исключительной файловой блокировкой, перед каждой операцией
+    догоняются записи журнала, сделанные другими процессами, поэтому ID заявок
+    выделяются атомарно. Снимок записывается во временный файл и атомарно
+    заменяет старый.
     """
-    
-    def __init__(self, file_path='tickets_storage.json'):
+
+    def __init__(self, file_path='tickets_storage.json', compact_threshold=1000, fsync=False):
         """
         Инициализация хранилища
-        
+
         Args:
-            file_path (str): Путь к файлу для хранения заявок
+            file_path (str): Путь к файлу снимка заявок
+            compact_threshold (int): Количество записей в журнале, после которого
+                журнал уплотняется в новый снимок
+            fsync (bool): Сбрасывать ли каждую запись журнала на диск (os.fsync)
         """
         self.file_path = file_path
-        self.tickets = []
+        self.log_path = f"{file_path}.log"
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self._lock = _StorageLock(f"{file_path}.lock")
+        self._tickets = {}
+        self._index = TicketIndex()
         self.next_id = 1
-        self.load_tickets()
-    
+        self._seq = 0
+        self._log_entries = 0
+        self._log_offset = 0
+        self._snapshot_stamp = None
+        with self._lock.shared():
+            self._load()
+
+    @property
+    def tickets(self):
+        """Список всех заявок в порядке создания"""
+        return list(self._tickets.values())
+
     def load_tickets(self):
-        """Загрузка заявок из файла"""
-        if os.path.exists(self.file_path):
+        """Загрузка снимка заявок и воспроизведение журнала изменений"""
+        with self._lock.shared():
+            self._load()
+
+    def _stamp(self, path):
+        """Отпечаток файла для обнаружения его замены другим процессом"""
+        try:
+            st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """Загрузка снимка и журнала (вызывается под блокировкой)"""
+        self._tickets = {}
+        self.next_id = 1
+        self._seq = 0
+        self._snapshot_stamp = self._stamp(self.file_path)
+        if self._snapshot_stamp is not None:
             try:
                 with open(self.file_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.tickets = data.get('tickets', [])
+                    self._tickets = {ticket['id']: ticket for ticket in data.get('tickets', [])}
                     self.next_id = data.get('next_id', 1)
-                logger.info(f"Загружено {len(self.tickets)} заявок из {self.file_path}")
+                    self._seq = data.get('last_seq', 0)
+                logger.info(f"Загружено {len(self._tickets)} заявок из {self.file_path}")
             except Exception as e:
                 logger.error(f"Ошибка при загрузке заявок: {str(e)}")
-                self.tickets = []
+                self._tickets = {}
                 self.next_id = 1
-    
+                self._seq = 0
+        self._index.clear()
+        for ticket in self._tickets.values():
+            self._index.add(ticket)
+        self._log_entries = 0
+        self._log_offset = 0
+        self._replay_log()
+
+    def _sync(self):
+        """
+        Догнать изменения других процессов (вызывается под блокировкой)
+
+        Если снимок был заменен (уплотнение в другом процессе), состояние
+        перезагружается полностью, иначе применяются только новые записи журнала.
+        """
+        if self._stamp(self.file_path) != self._snapshot_stamp:
+            self._load()
+            return
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+        if log_size < self._log_offset:
+            self._load()
+        elif log_size > self._log_offset:
+            self._replay_log()
+
+    def _replay_log(self):
+        """Применение записей журнала, начиная с уже прочитанной позиции"""
+        if not os.path.exists(self.log_path):
+            return
+        applied = 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            for line in f:
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # Недописанная последняя строка после аварийного завершения
+                    logger.warning(f"Поврежденный хвост журнала {self.log_path} пропущен")
+                    break
+                self._log_offset += len(line)
+                self._log_entries += 1
+                if record['seq'] <= self._seq:
+                    continue
+                self._apply(record)
+                applied += 1
+        if applied:
+            logger.info(f"Воспроизведено {applied} записей журнала {self.log_path}")
+
+    def _apply(self, record):
+        """Применение одной записи журнала к состоянию в памяти"""
+        op = record['op']
+        if op == 'create':
+            ticket = record['ticket']
+            self._tickets[ticket['id']] = ticket
+            self._index.add(ticket)
+            self.next_id = max(self.next_id, ticket['id'] + 1)
+        elif op == 'update':
+            ticket = self._tickets.get(record['id'])
+            if ticket is not None:
+                old_key = self._index.key(ticket)
+                old_values = {f: ticket.get(f) for f in INDEXED_FIELDS}
+                ticket.update(record['fields'])
+                self._index.update(ticket, old_key, old_values)
+        elif op == 'comment':
+            ticket = self._tickets.get(record['id'])
+            if ticket is not None:
+                ticket.setdefault('comments', []).append(record['comment'])
+        self._seq = record['seq']
+
+    def _write(self, op, **payload):
+        """Дописать запись в журнал и применить ее в памяти (под исключительной блокировкой)"""
+        record = {'seq': self._seq + 1, 'op': op, **payload}
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with open(self.log_path, 'ab') as f:
+            if f.tell() > self._log_offset:
+                # Обрезаем поврежденный хвост, чтобы новая запись не склеилась с ним
+                f.truncate(self._log_offset)
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._log_offset += len(data)
+        self._log_entries += 1
+        self._apply(record)
+        if self._log_entries >= self.compact_threshold:
+            self._compact()
+
+    def _compact(self):
+        """Запись снимка во временный файл с атомарной заменой и очистка журнала"""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'tickets': self.tickets,
+                'next_id': self.next_id,
+                'last_seq': self._seq
+            }, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        # Записи журнала уже учтены в снимке (last_seq), поэтому его можно очистить
+        with open(self.log_path, 'wb'):
+            pass
+        self._snapshot_stamp = self._stamp(self.file_path)
+        self._log_offset = 0
+        self._log_entries = 0
+        logger.info(f"Сохранено {len(self._tickets)} заявок в {self.file_path}")
+
     def save_tickets(self):
-        """Сохранение заявок в файл"""
+        """Уплотнение: запись полного снимка заявок и очистка журнала"""
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'tickets': self.tickets,
-                    'next_id': self.next_id
-                }, f, ensure_ascii=False, indent=2)
-            logger.info(f"Сохранено {len(self.tickets)} заявок в {self.file_path}")
+            with self._lock.exclusive():
+                self._sync()
+                self._compact()
             return True
         except Exception as e:
             logger.error(f"Ошибка при сохранении заявок: {str(e)}")
             return False
-    
+
     def get_all_tickets(self):
         """Получить все заявки"""
-        return self.tickets
-    
+        with self._lock.shared():
+            self._sync()
+            return self.tickets
+
+    def query_tickets(self, filters=None, sort='-created_on', offset=0, limit=25, fields=None):
+        """
+        Получить страницу заявок с фильтрацией, сортировкой и проекцией полей
+
+        Args:
+            filters (dict, optional): Фильтры: status, priority, project_id, assigned_to,
+                created_from, created_to (даты в формате ISO)
+            sort (str): Поле сортировки, префикс '-' - по убыванию
+            offset (int): Смещение первой заявки страницы
+            limit (int): Размер страницы
+            fields (list, optional): Список возвращаемых полей (по умолчанию все)
+
+        Returns:
+            tuple: (список заявок страницы, общее количество подходящих заявок)
+        """
+        sort_field = sort.lstrip('-') or 'created_on'
+        descending = sort.startswith('-')
+        offset = max(0, offset)
+        with self._lock.shared():
+            self._sync()
+            keys = self._index.candidates(filters) if filters else None
+            if keys is not None:
+                # Кандидаты из вторичного индекса уже упорядочены по дате создания
+                candidates = (self._tickets[key[1]] for key in keys)
+            else:
+                candidates = self._tickets.values()
+            matched = [t for t in candidates if self._matches(t, filters)] if filters else list(candidates)
+            if sort_field in ('id', 'created_on'):
+                # Порядок индекса и порядок вставки совпадают с порядком создания - сортировка не нужна
+                if descending:
+                    matched.reverse()
+            else:
+                matched.sort(key=lambda t: _sort_key(t.get(sort_field)), reverse=descending)
+            page = matched[offset:offset + limit]
+            return [_project(t, fields) for t in page], len(matched)
+
+    @staticmethod
+    def _matches(ticket, filters):
+        """Проверка заявки на соответствие фильтрам"""
+        for key, value in filters.items():
+            # Даты сравниваются по длине границы: '2025-03-23' включает весь день
+            if key == 'created_from':
+                if ticket.get('created_on', '')[:len(value)] < value:
+                    return False
+            elif key == 'created_to':
+                if ticket.get('created_on', '')[:len(value)] > value:
+                    return False
+            elif ticket.get(key) != value:
+                return False
+        return True
+
     def get_ticket(self, ticket_id):
         """Получить заявку по ID"""
-        for ticket in self.tickets:
-            if ticket['id'] == ticket_id:
-                return ticket
-        return None
-    
+        with self._lock.shared():
+            self._sync()
+            return self._tickets.get(ticket_id)
+
     def create_ticket(self, subject, description, priority='normal', assigned_to=None, project_id=1):
         """Создать новую заявку"""
-        ticket = {
-            'id': self.next_id,
-            'subject': subject,
-            'description': description,
-            'priority': priority,
-            'status': 'new',
-            'created_on': datetime.now().isoformat(),
-            'project_id': project_id,
-            'comments': []
-        }
-        
-        if assigned_to:
-            ticket['assigned_to'] = assigned_to
-        
-        self.tickets.append(ticket)
-        self.next_id += 1
-        self.save_tickets()
-        
+        with self._lock.exclusive():
+            # ID выделяется после синхронизации с журналом, поэтому уникален между процессами
+            self._sync()
+            ticket = {
+                'id': self.next_id,
+                'subject': subject,
+                'description': description,
+                'priority': priority,
+                'status': 'new',
+                'created_on': datetime.now().isoformat(),
+                'project_id': project_id,
+                'comments': []
+            }
+
+            if assigned_to:
+                ticket['assigned_to'] = assigned_to
+
+            self._write('create', ticket=ticket)
+
         return ticket
-    
+
     def update_ticket(self, ticket_id, **kwargs):
         """Обновить заявку по ID"""
-        for i, ticket in enumerate(self.tickets):
-            if ticket['id'] == ticket_id:
-                self.tickets[i].update(kwargs)
-                self.save_tickets()
-                return True
-        return False
-    
+        kwargs.pop('id', None)
+        with self._lock.exclusive():
+            self._sync()
+            if ticket_id not in self._tickets:
+                return False
+            self._write('update', id=ticket_id, fields=kwargs)
+        return True
+
     def add_comment(self, ticket_id, comment):
         """Добавить комментарий к заявке"""
-        for i, ticket in enumerate(self.tickets):
-            if ticket['id'] == ticket_id:
-                if 'comments' not in self.tickets[i]:
-                    self.tickets[i]['comments'] = []
-                
-                self.tickets[i]['comments'].append({
-                    'text': comment,
-                    'created_on': datetime.now().isoformat()
-                })
-                self.save_tickets()
-                return True
-        return False
-    
-    def attach_solution(self, ticket_id, solution_text):
-        """Прикрепить решение к заявке"""
+        with self._lock.exclusive():
+            self._sync()
+            if ticket_id not in self._tickets:
+                return False
+            self._write('comment', id=ticket_id, comment={
+                'text': comment,
+                'created_on': datetime.now().isoformat()
+            })
+        return True
+
+    def attach_solution(self, ticket_id, solution_text, source=None):
+        """Прикрепить решение к заявке (с указанием источника, если он известен)"""
         comment = f"Найденное решение: {solution_text}"
-        return self.add_comment(ticket_id, comment)
\ No newline at end of file
+        if source:
+            comment += f"\n\nИсточник: {source}"
+        return self.add_comment(ticket_id, comment)
@@ -0,0 +1,97 @@
+import logging
+import threading
+from app.modules.vector_search import HashingEmbedder, document_text
+
+logger = logging.getLogger(__name__)
+
+
+class TicketSolutionSuggester:
+    """
+    Автоматический подбор решений для новых заявок.
+
+    После создания заявки ее тема и описание прогоняются через поиск по
+    базе знаний в фоновом пуле, лучшие найденные решения прикрепляются
+    к заявке. Создание заявки не ждет поиска; при переполнении очереди
+    подбор для заявки пропускается (заявка создается в любом случае).
+
+    Оценки поиска нормализуются по каждому запросу (лучший результат всегда
+    получает высокую оценку), поэтому решение прикрепляется, только если
+    косинусная близость векторов заявки и решения не ниже min_similarity -
+    абсолютного порога, одинакового для всех источников.
+    """
+
+    # Во сколько раз больше кандидатов запрашивается у поиска, чем прикрепляется
+    CANDIDATES_FACTOR = 3
+
+    def __init__(self, search_module, service_desk, pool, top_k=3, min_similarity=0.25, mediawiki_url=None,
+                 embedder=None):
+        """
+        Args:
+            search_module (SearchModule): Модуль поиска
+            service_desk (ServiceDeskModule): Модуль Service Desk
+            pool (BackgroundWorkerPool): Пул фоновых задач
+            top_k (int): Максимальное количество прикрепляемых решений
+            min_similarity (float): Минимальная косинусная близость заявки и решения
+            mediawiki_url (str, optional): Базовый URL MediaWiki для поиска
+            embedder (HashingEmbedder, optional): Векторизатор (по умолчанию - векторного индекса поиска)
+        """
+        self.search_module = search_module
+        self.service_desk = service_desk
+        self.pool = pool
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.mediawiki_url = mediawiki_url
+        if embedder is None:
+            vector_index = getattr(search_module, 'vector_index', None)
+            embedder = vector_index.embedder if vector_index is not None else HashingEmbedder()
+        self.embedder = embedder
+        self.attached = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, ticket):
+        """
+        Поставить подбор решений для заявки в очередь
+
+        Returns:
+            bool: False, если очередь заполнена
+        """
+        ticket_id = ticket.get('id')
+        text = ' '.join(part for part in (ticket.get('subject'), ticket.get('description')) if part)
+        if ticket_id is None or not text.strip():
+            return False
+        return self.pool.submit(self.suggest, ticket_id, text)
+
+    def suggest(self, ticket_id, text):
+        """Найти решения и прикрепить лучшие к заявке"""
+        results = self.search_module.search(text, size=self.top_k * self.CANDIDATES_FACTOR,
+                                            mediawiki_url=self.mediawiki_url)
+        results = self._relevant(text, results)[:self.top_k]
+        for result in results:
+            solution = f"{result['title']}\n{result.get('content', '')}"
+            if result.get('url'):
+                solution += f"\n{result['url']}"
+            self.service_desk.attach_solution(ticket_id, solution, result.get('source'))
+        with self._lock:
+            self.attached += len(results)
+        logger.info(f"К заявке {ticket_id} автоматически прикреплено решений: {len(results)}")
+        return results
+
+    def _relevant(self, text, results):
+        """Результаты с косинусной близостью к тексту заявки не ниже порога (в порядке поиска)"""
+        if not results:
+            return []
+        vectors = self.embedder.embed_batch([text] + [document_text(result) for result in results])
+        similarities = vectors[1:] @ vectors[0]
+        relevant = []
+        for result, similarity in zip(results, similarities):
+            if similarity >= self.min_similarity:
+                relevant.append({**result, 'similarity': round(float(similarity), 4)})
+        return relevant
+
+    def stats(self):
+        return {
+            **self.pool.stats(),
+            'attached': self.attached,
+            'top_k': self.top_k,
+            'min_similarity': self.min_similarity
+        }
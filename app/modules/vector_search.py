@@ -0,0 +1,265 @@
+import threading
+import zlib
+import numpy as np
+from app.modules.text_index import analyze
+
+
+class HashingEmbedder:
+    """
+    Векторизация текста без модели: хэширование символьных n-грамм.
+
+    Каждый терм (после стемминга) дополняется пробелами по краям и
+    разбивается на символьные n-граммы; n-граммы и сами термы хэшируются
+    в фиксированное число измерений со знаком (hashing trick), вектор
+    нормируется по длине. Общие части слов ("перезагруз-ка",
+    "перезагруз-ите", "подключ-ение") дают близкие векторы, поэтому
+    перефразированные описания проблемы находятся и без точного совпадения
+    термов. Хэш (crc32) не зависит от процесса, векторы воспроизводимы.
+    """
+
+    def __init__(self, dim=1024, ngram_range=(3, 5), term_weight=2.0, cache_size=100000):
+        """
+        Args:
+            dim (int): Размерность векторов
+            ngram_range (tuple): Минимальная и максимальная длина n-грамм
+            term_weight (float): Вес терма целиком относительно его n-грамм
+            cache_size (int): Количество термов в кэше признаков
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.term_weight = term_weight
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def _term_features(self, term):
+        """Признаки терма: номера измерений и веса со знаком (кэшируются)"""
+        features = self._cache.get(term)
+        if features is not None:
+            return features
+        hashes = [(zlib.crc32(term.encode('utf-8')), self.term_weight)]
+        min_n, max_n = self.ngram_range
+        padded = f" {term} "
+        for n in range(min_n, max_n + 1):
+            for i in range(len(padded) - n + 1):
+                hashes.append((zlib.crc32(padded[i:i + n].encode('utf-8')), 1.0))
+        columns = np.fromiter((value % self.dim for value, _ in hashes), dtype=np.int64, count=len(hashes))
+        # Старший бит хэша задает знак, чтобы коллизии взаимно гасились
+        weights = np.fromiter((weight if value & 0x80000000 else -weight for value, weight in hashes),
+                              dtype=np.float32, count=len(hashes))
+        features = (columns, weights)
+        if len(self._cache) < self.cache_size:
+            self._cache[term] = features
+        return features
+
+    def embed_batch(self, texts):
+        """
+        Векторы для пакета текстов
+
+        Args:
+            texts (list): Тексты
+
+        Returns:
+            numpy.ndarray: Матрица float32 размером (len(texts), dim) с единичными строками
+        """
+        columns, weights = [], []
+        for row, text in enumerate(texts):
+            for term in analyze(text):
+                term_columns, term_weights = self._term_features(term)
+                columns.append(term_columns + row * self.dim)
+                weights.append(term_weights)
+        size = len(texts) * self.dim
+        if columns:
+            flat = np.bincount(np.concatenate(columns), weights=np.concatenate(weights), minlength=size)
+        else:
+            flat = np.zeros(size)
+        matrix = flat.astype(np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed(self, text):
+        """Вектор одного текста"""
+        return self.embed_batch([text])[0]
+
+
+def document_text(document):
+    """Текст документа для векторизации: заголовок, теги и содержимое"""
+    parts = [document.get('title') or '']
+    tags = document.get('tags')
+    if tags:
+        parts.append(' '.join(tags) if isinstance(tags, (list, tuple)) else tags)
+    parts.append(document.get('content') or '')
+    return ' '.join(parts)
+
+
+class VectorIndex:
+    """
+    Векторный индекс документов в матрице NumPy.
+
+    Векторы вычисляются пакетами при индексации и хранятся строками матрицы
+    float32 (емкость растет удвоением). Поиск - одно умножение матрицы на
+    вектор запроса (косинусная близость) и выбор top-k через argpartition,
+    без сортировки всего корпуса. Замененный документ перезаписывает свою
+    строку, строки удаленных обнуляются и занимаются новыми документами,
+    поэтому матрица не растет больше числа документов. Неизмененные
+    документы повторно не векторизуются.
+    """
+
+    def __init__(self, embedder=None, batch_size=256, min_score=0.15):
+        """
+        Args:
+            embedder (HashingEmbedder, optional): Векторизатор
+            batch_size (int): Размер пакета при векторизации
+            min_score (float): Минимальная косинусная близость результата
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.batch_size = batch_size
+        self.min_score = min_score
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._documents = []
+        self._rows = {}
+        self._free = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    def _reserve(self, count):
+        """Увеличить емкость матрицы под count новых строк"""
+        needed = len(self._documents) + max(0, count - len(self._free))
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        matrix = np.zeros((max(needed, capacity * 2, 64), self.embedder.dim), dtype=np.float32)
+        matrix[:len(self._documents)] = self._matrix[:len(self._documents)]
+        self._matrix = matrix
+
+    def add_batch(self, documents):
+        """
+        Добавить или заменить документы (векторизация пакетами)
+
+        Args:
+            documents (iterable): Документы с полями id, title, content, tags
+        """
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                self._add_vectors(batch)
+                batch = []
+        if batch:
+            self._add_vectors(batch)
+
+    def add(self, document):
+        """Добавить или заменить один документ"""
+        self._add_vectors([document])
+
+    def _add_vectors(self, documents):
+        with self._lock:
+            documents = [document for document in documents if not self._is_current(document)]
+        if not documents:
+            return
+        vectors = self.embedder.embed_batch([document_text(document) for document in documents])
+        with self._lock:
+            self._reserve(len(documents))
+            for document, vector in zip(documents, vectors):
+                row = self._rows.get(document['id'])
+                if row is None:
+                    if self._free:
+                        row = self._free.pop()
+                    else:
+                        row = len(self._documents)
+                        self._documents.append(None)
+                    self._rows[document['id']] = row
+                self._matrix[row] = vector
+                self._documents[row] = document
+
+    def _is_current(self, document):
+        """Документ уже проиндексирован в том же виде"""
+        row = self._rows.get(document['id'])
+        return row is not None and self._documents[row] == document
+
+    def sync(self, documents):
+        """
+        Привести индекс к набору документов
+
+        Векторизуются только новые и измененные документы, отсутствующие
+        в наборе удаляются.
+
+        Args:
+            documents (iterable): Полный набор документов
+        """
+        seen = set()
+
+        def changed():
+            for document in documents:
+                seen.add(document['id'])
+                yield document
+
+        self.add_batch(changed())
+        with self._lock:
+            for doc_id in [doc_id for doc_id in self._rows if doc_id not in seen]:
+                self._remove(doc_id)
+
+    def remove(self, doc_id):
+        """Удалить документ из индекса"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        row = self._rows.pop(doc_id, None)
+        if row is not None:
+            self._matrix[row] = 0
+            self._documents[row] = None
+            self._free.append(row)
+
+    def search(self, query_text, size=10):
+        """
+        Поиск ближайших документов
+
+        Args:
+            query_text (str): Поисковый запрос
+            size (int): Количество результатов
+
+        Returns:
+            list: Пары (документ, косинусная близость), отсортированные по убыванию
+        """
+        query = self.embedder.embed(query_text)
+        if not query.any():
+            return []
+        with self._lock:
+            count = len(self._documents)
+            if count == 0:
+                return []
+            scores = self._matrix[:count] @ query
+            if size < count:
+                top = np.argpartition(scores, -size)[-size:]
+            else:
+                top = np.arange(count)
+            top = top[np.argsort(scores[top])[::-1]]
+            return [(self._documents[row], float(scores[row])) for row in top
+                    if scores[row] >= self.min_score and self._documents[row] is not None]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Объединение ранжирований (Reciprocal Rank Fusion)
+
+    Оценка документа - сумма 1 / (k + ранг) по всем спискам, где он найден;
+    масштаб исходных оценок (BM25, косинусная близость) не важен.
+
+    Args:
+        rankings (list): Списки ID документов, каждый упорядочен по убыванию релевантности
+        k (int): Сглаживающая константа
+
+    Returns:
+        list: Пары (ID документа, оценка RRF), отсортированные по убыванию оценки
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
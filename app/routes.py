@@ -1,8 +1,19 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
-from app import decision_graph, search_module, service_desk, SearchModule
+import json
+from flask import Blueprint, render_template, request, jsonify, current_app, stream_with_context
+from app import graph_reloader, graph_renderer, search_module, service_desk, federated_search, opensearch_registry, mediawiki_sync, search_cache, ticket_suggester
+from app.modules.federated_search import SearchSource
+from app.modules.graph_render import FORMATS
+from app.modules.ranking import rank_results
+from app.modules.search_cache import normalize_query
+from app.modules.http_client import CircuitOpenError
 
 bp = Blueprint('main', __name__)
 
+@bp.errorhandler(CircuitOpenError)
+def service_unavailable(e):
+    """Внешний сервис недоступен - отвечаем сразу, не дожидаясь таймаута"""
+    return jsonify({'error': str(e)}), 503
+
 @bp.route('/')
 def index():
     """Главная страница"""
@@ -27,59 +38,268 @@ def servicedesk():
 @bp.route('/api/node/<node_id>', methods=['GET'])
 def get_node(node_id):
     """Получить данные узла"""
-    if node_id == 'root':
-        node_id = decision_graph.get_root_node()
-    
-    if not node_id or node_id not in decision_graph.graph.nodes():
+    # Ответ заранее собран и сериализован в скомпилированном представлении графа
+    body = graph_reloader.graph.compiled.get_node_json(node_id)
+    if body is None:
         return jsonify({'error': 'Node not found'}), 404
+    return current_app.response_class(body, mimetype='application/json')
+
+def parse_depth(value):
+    """Глубина поддерева из параметра запроса (None - все поддерево)"""
+    if value in (None, '', 'all'):
+        return None
+    depth = int(value)
+    if depth < 0:
+        raise ValueError("depth must be a non-negative integer")
+    return depth
+
+@bp.route('/api/node/<node_id>/subtree', methods=['GET'])
+def get_subtree(node_id):
+    """Получить узел вместе с потомками до глубины depth (без depth - все поддерево)"""
+    try:
+        depth = parse_depth(request.args.get('depth'))
+    except ValueError:
+        return jsonify({'error': 'depth must be a non-negative integer'}), 400
     
-    node_content = decision_graph.get_node_content(node_id)
-    node_type = decision_graph.get_node_type(node_id)
-    children = decision_graph.get_children(node_id)
+    result = graph_reloader.graph.compiled.get_subtree_json(node_id, depth)
+    if result is None:
+        return jsonify({'error': 'Node not found'}), 404
+    body, etag = result
+    response = current_app.response_class(body, mimetype='application/json')
+    # Клиент хранит поддерево и перепроверяет его по ETag (304 без тела);
+    # при смене ревизии графа клиент сбрасывает весь свой кэш узлов
+    response.set_etag(etag)
+    response.headers['X-Graph-Revision'] = graph_reloader.revision or ''
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@bp.route('/api/graph/analytics', methods=['GET'])
+def graph_analytics():
+    """Сводная аналитика графа решений (циклы, недостижимые узлы, длинные цепочки)"""
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify(graph_reloader.graph.compiled.analytics.summary(limit=max(limit, 0)))
+
+@bp.route('/api/graph/analytics/<node_id>', methods=['GET'])
+def graph_node_analytics(node_id):
+    """Аналитика узла: глубина, шаги до решения и достижимые решения"""
+    compiled = graph_reloader.graph.compiled
+    limit = request.args.get('limit', 100, type=int)
+    stats = compiled.analytics.node_stats(compiled.resolve(node_id), limit=max(limit, 0))
+    if stats is None:
+        return jsonify({'error': 'Node not found'}), 404
+    return jsonify(stats)
+
+@bp.route('/api/graph/visualize', methods=['GET'])
+def visualize_graph():
+    """Отрисовка графа решений или поддерева узла (DOT/SVG, с кэшированием)"""
+    fmt = request.args.get('format', 'svg')
+    node_id = request.args.get('node') or None
+    try:
+        depth = parse_depth(request.args.get('depth'))
+    except ValueError:
+        return jsonify({'error': 'depth must be a non-negative integer'}), 400
     
-    return jsonify({
-        'id': node_id,
-        'content': node_content,
-        'type': node_type,
-        'children': children
-    })
+    try:
+        result = graph_renderer.render(graph_reloader.graph.compiled, node_id, depth, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    if result is None:
+        return jsonify({'error': 'Node not found'}), 404
+    body, etag = result
+    response = current_app.response_class(body, mimetype=FORMATS[fmt])
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@bp.route('/api/admin/graph', methods=['GET'])
+def graph_status():
+    """Состояние загруженного графа решений"""
+    return jsonify({**graph_reloader.stats(), 'render': graph_renderer.stats()})
+
+@bp.route('/api/admin/graph/reload', methods=['POST'])
+def reload_graph():
+    """Перечитать файл графа решений и подменить граф без перезапуска"""
+    result = graph_reloader.reload(force=True)
+    if result['error']:
+        return jsonify(result), 422
+    return jsonify(result)
 
 @bp.route('/api/search', methods=['POST'])
 def search_api():
-    """Поиск решений через оригинальный модуль поиска"""
+    """Поиск решений: все источники опрашиваются параллельно, каждый со своим дедлайном"""
     try:
         # Получаем данные запроса
         data = request.json
         query = data.get('query', '')
         sources = data.get('sources', ['opensearch', 'mediawiki', 'mock'])
         use_mock = 'mock' in sources and 'opensearch' not in sources
-        results = []
-        if 'opensearch' in sources and not use_mock:
-            temp_search = SearchModule(
-                host=current_app.config.get('OPENSEARCH_HOST'),
-                port=current_app.config.get('OPENSEARCH_PORT'),
-                index_name=current_app.config.get('OPENSEARCH_INDEX'),
-                use_mock=False
-            )
-            opensearch_results = temp_search._search_opensearch(query)
-            results.extend(opensearch_results)
+        config = current_app.config
+        # Каждый источник запрашивается ровно на размер итоговой выдачи
+        try:
+            size = int(data.get('size') or config['SEARCH_DEFAULT_SIZE'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'size must be an integer', 'results': []}), 400
+        size = max(1, min(size, config['SEARCH_MAX_SIZE']))
+        search_sources = []
+        # Источники, пропущенные заранее (нет бэкенда или он заведомо недоступен):
+        # это не ошибка запроса, такие ответы можно кэшировать
+        skipped = {}
+
+        if 'opensearch' in sources and not use_mock and search_module.use_mock:
+            skipped['opensearch'] = 'OpenSearch не используется (мок-режим)'
+        elif 'opensearch' in sources and not use_mock and not opensearch_registry.is_healthy():
+            # Пока кластер помечен недоступным, не тратим бюджет запроса
+            skipped['opensearch'] = 'OpenSearch недоступен'
+        elif 'opensearch' in sources and not use_mock:
+            def search_opensearch():
+                try:
+                    return search_module._search_opensearch(
+                        query,
+                        size=size,
+                        timeout=config['SEARCH_TIMEOUT_OPENSEARCH'],
+                        raise_errors=True
+                    )
+                except Exception as e:
+                    opensearch_registry.mark_failure(e)
+                    raise
+            search_sources.append(SearchSource('opensearch', search_opensearch, config['SEARCH_TIMEOUT_OPENSEARCH']))
 
         if 'mediawiki' in sources:
-            mediawiki_url = current_app.config.get('MEDIAWIKI_URL')
+            mediawiki_url = config.get('MEDIAWIKI_URL')
             if mediawiki_url:
-                mediawiki_results = search_module.search_mediawiki(
-                    query_text=query,
-                    base_url=mediawiki_url
-                )
-                results.extend(mediawiki_results)
+                search_sources.append(SearchSource(
+                    'mediawiki',
+                    lambda: search_module.search_mediawiki(
+                        query_text=query,
+                        base_url=mediawiki_url,
+                        limit=size,
+                        timeout=config['SEARCH_TIMEOUT_MEDIAWIKI'],
+                        raise_errors=True
+                    ),
+                    config['SEARCH_TIMEOUT_MEDIAWIKI']
+                ))
+            else:
+                skipped['mediawiki'] = 'MediaWiki не настроена (MEDIAWIKI_URL)'
+
         if 'mock' in sources:
-            mock_results = search_module._search_mock(query)
-            results.extend(mock_results)
-        results.sort(key=lambda x: x.get('score', 0), reverse=True)
-        return jsonify({'results': results})
+            search_sources.append(SearchSource(
+                'mock',
+                lambda: search_module._search_mock(query, size),
+                config['SEARCH_TIMEOUT_MOCK']
+            ))
+
+        def run_search():
+            results_by_source, source_report = federated_search.search(search_sources, grouped=True)
+            # Оценки источников несопоставимы: нормализуем и объединяем дубликаты
+            results = rank_results(results_by_source, size, method=config['SEARCH_RANKING_METHOD'])
+            # Неполные результаты (таймаут или ошибка источника) не кэшируем
+            cacheable = all(status['status'] == 'ok' for status in source_report.values())
+            for name, reason in skipped.items():
+                source_report[name] = {'status': 'skipped', 'count': 0, 'took_ms': 0.0, 'reason': reason}
+            return {'results': results, 'sources': source_report}, cacheable
+
+        # Пропущенные источники входят в ключ: после восстановления OpenSearch
+        # запрос не получит закэшированный ответ без него
+        cache_key = (normalize_query(query), tuple(sorted(sources)), size, tuple(sorted(skipped)))
+        response, cache_status = search_cache.get_or_compute(cache_key, run_search)
+        if response['results']:
+            # Запросы, давшие результаты, становятся подсказками
+            search_module.suggest_index.record_query(query)
+        return jsonify({**response, 'cache': cache_status})
     except Exception as e:
         return jsonify({'error': str(e), 'results': []}), 500
 
+# Источники пакетного поиска
+BATCH_SOURCES = ('opensearch', 'mediawiki', 'mock')
+
+@bp.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Пакетный поиск: результаты отдаются потоком NDJSON (строка на запрос) по мере готовности
+
+    Запросы - строки или объекты {"id": ..., "query": ...}; id (например,
+    номер заявки) возвращается в строке результата.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('queries')
+    config = current_app.config
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'queries must be a non-empty list'}), 400
+    if len(items) > config['SEARCH_BATCH_MAX_QUERIES']:
+        return jsonify({'error': f"too many queries (max {config['SEARCH_BATCH_MAX_QUERIES']})"}), 400
+    try:
+        size = int(data.get('size') or config['SEARCH_DEFAULT_SIZE'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size must be an integer'}), 400
+    size = max(1, min(size, config['SEARCH_MAX_SIZE']))
+    sources = data.get('sources', list(BATCH_SOURCES))
+    if not isinstance(sources, list) or not all(source in BATCH_SOURCES for source in sources):
+        return jsonify({'error': f"sources must be a list of: {', '.join(BATCH_SOURCES)}"}), 400
+    skipped = {}
+    if 'opensearch' in sources and not search_module.use_mock and not opensearch_registry.is_healthy():
+        # Кластер недоступен - не ждем таймаутов на каждой пачке, но сообщаем об этом в каждой строке
+        sources = [source for source in sources if source != 'opensearch']
+        skipped['opensearch'] = 'OpenSearch cluster is unavailable'
+
+    ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+    queries = [str(item.get('query', '')) if isinstance(item, dict) else str(item) for item in items]
+
+    def generate():
+        for result in search_module.search_many(
+            queries,
+            size=size,
+            sources=sources,
+            mediawiki_url=config.get('MEDIAWIKI_URL'),
+            concurrency=config['SEARCH_BATCH_CONCURRENCY'],
+            chunk_size=config['SEARCH_BATCH_CHUNK_SIZE'],
+            timeouts={
+                'opensearch': config['SEARCH_TIMEOUT_OPENSEARCH'],
+                'mediawiki': config['SEARCH_TIMEOUT_MEDIAWIKI']
+            },
+            method=config['SEARCH_RANKING_METHOD']
+        ):
+            if ids[result['index']] is not None:
+                result['id'] = ids[result['index']]
+            if skipped:
+                result['errors'] = {**skipped, **result['errors']}
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Подсказки при вводе запроса: заголовки статей, теги и популярные запросы"""
+    query = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), 20))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({
+        'query': query,
+        'suggestions': search_module.suggest_index.suggest(query, limit)
+    })
+
+@bp.route('/api/search/status', methods=['GET'])
+def search_status():
+    """Состояние пула соединений OpenSearch, кэша результатов поиска и подсказок"""
+    return jsonify({
+        'opensearch': opensearch_registry.stats(),
+        'use_mock': search_module.use_mock,
+        'cache': search_cache.stats(),
+        'suggest': search_module.suggest_index.stats()
+    })
+
+@bp.route('/api/admin/suggest/reload', methods=['POST'])
+def reload_suggestions():
+    """Перестроить подсказки поиска (например, после запуска mediawiki_indexer.py)"""
+    try:
+        count = search_module.reload_suggestions()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'status': 'success', 'documents': count, 'suggest': search_module.suggest_index.stats()})
+
 # API для индексации MediaWiki контента в OpenSearch
 @bp.route('/api/index-mediawiki', methods=['POST'])
 def index_mediawiki():
@@ -97,6 +317,17 @@ def index_mediawiki():
     else:
         return jsonify({'error': 'Failed to index MediaWiki content'}), 500
 
+@bp.route('/api/index-mediawiki/sync', methods=['POST'])
+def sync_mediawiki():
+    """Выполнить цикл инкрементальной синхронизации MediaWiki немедленно"""
+    if mediawiki_sync is None:
+        return jsonify({'error': 'MediaWiki sync is not enabled'}), 400
+    try:
+        result = mediawiki_sync.run_once()
+        return jsonify({'status': 'success', **result})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/tickets', methods=['GET', 'POST'])
 def tickets_api():
     """Работа с заявками: получение списка или создание новой"""
@@ -121,13 +352,53 @@ def tickets_api():
                 project_id=data.get('project_id', 1)
             )
             
+            # Решения подбираются в фоне; при переполнении очереди заявка создается без них
+            if ticket_suggester is not None:
+                ticket_suggester.enqueue({
+                    'id': ticket.get('id'),
+                    'subject': data.get('subject', ''),
+                    'description': data.get('description', '')
+                })
+            
             return jsonify(ticket)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     else:
-        # Получить список заявок
-        tickets = service_desk.get_all_tickets()
-        return jsonify(tickets)
+        # Получить страницу заявок с фильтрами, сортировкой и проекцией
+        try:
+            args = request.args
+            filters = {}
+            for key in ('status', 'priority', 'created_from', 'created_to'):
+                if args.get(key):
+                    filters[key] = args[key]
+            for key in ('project_id', 'assigned_to'):
+                if args.get(key):
+                    filters[key] = int(args[key])
+            fields = [f.strip() for f in args.get('fields', '').split(',') if f.strip()] or None
+            offset = int(args.get('offset', 0))
+            if offset < 0:
+                raise ValueError('offset must be non-negative')
+            page = service_desk.list_tickets(
+                offset=offset,
+                limit=int(args.get('limit', 25)),
+                filters=filters,
+                sort=args.get('sort', '-created_on'),
+                fields=fields,
+                cursor=args.get('cursor')
+            )
+            return jsonify(page)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameters: {str(e)}'}), 400
+
+@bp.route('/api/servicedesk/stats', methods=['GET'])
+def servicedesk_stats():
+    """Статистика подключения к Service Desk и фонового подбора решений"""
+    stats = service_desk.get_stats()
+    if ticket_suggester is not None:
+        stats['auto_solutions'] = ticket_suggester.stats()
+    return jsonify(stats)
 
 @bp.route('/api/tickets/<int:ticket_id>', methods=['GET'])
 def get_ticket(ticket_id):
@@ -152,10 +423,8 @@ def attach_solution(ticket_id):
     solution = request.json.get('solution', '')
     source = request.json.get('source', 'unknown')
     
-    # Добавляем информацию об источнике решения
-    solution_text = f"{solution}\n\nИсточник: {get_source_label(source)}"
-    
-    success = service_desk.attach_solution(ticket_id, solution_text)
+    # Информацию об источнике решения добавляет attach_solution
+    success = service_desk.attach_solution(ticket_id, solution, get_source_label(source))
     if success:
         return jsonify({'status': 'success'})
     return jsonify({'error': 'Failed to attach solution'}), 500
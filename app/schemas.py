@@ -17,20 +17,34 @@ class NodeChildSchema(Schema):
 class SearchQuerySchema(Schema):
     """Схема для поискового запроса"""
     query = fields.Str(required=True, description="Текст поискового запроса")
+    sources = fields.List(fields.Str(), description="Источники (opensearch, mediawiki, mock)")
+    size = fields.Int(description="Количество результатов (по умолчанию 10, не более 50)")
 
 class SearchResultSchema(Schema):
     """Схема для результата поиска"""
     id = fields.Str(required=True, description="Идентификатор результата")
     title = fields.Str(required=True, description="Заголовок")
     content = fields.Str(required=True, description="Содержимое")
-    score = fields.Float(required=True, description="Релевантность")
+    score = fields.Float(required=True, description="Нормализованная релевантность (0..1, для rrf - сумма по источникам)")
+    raw_score = fields.Float(description="Исходная оценка источника")
     source = fields.Str(description="Источник данных (opensearch, mediawiki, mock)")
+    sources = fields.List(fields.Str(), description="Источники, вернувшие этот результат")
     url = fields.Str(description="URL для перехода к источнику")
     highlight = fields.Str(description="Подсвеченный фрагмент текста")
 
+class SourceStatusSchema(Schema):
+    """Схема для статуса источника федеративного поиска"""
+    status = fields.Str(required=True, description="Статус источника (ok, timeout, error)")
+    count = fields.Int(description="Количество результатов от источника")
+    took_ms = fields.Float(description="Время ответа источника в миллисекундах")
+    error = fields.Str(description="Описание ошибки или таймаута")
+
 class SearchResponseSchema(Schema):
     """Схема для ответа на поисковый запрос"""
     results = fields.List(fields.Nested(SearchResultSchema), description="Список результатов поиска")
+    sources = fields.Dict(keys=fields.Str(), values=fields.Nested(SourceStatusSchema),
+                          description="Статусы опрошенных источников")
+    cache = fields.Str(description="Результат обращения к кэшу: hit, stale или miss")
 
 class TicketCreateSchema(Schema):
     """Схема для создания заявки"""
@@ -40,6 +54,14 @@ class TicketCreateSchema(Schema):
     assigned_to = fields.Int(description="ID исполнителя")
     project_id = fields.Int(default=1, description="ID проекта")
 
+class TicketPageSchema(Schema):
+    """Схема для страницы списка заявок"""
+    tickets = fields.List(fields.Dict(), description="Заявки страницы")
+    total_count = fields.Int(description="Общее количество подходящих заявок")
+    offset = fields.Int(description="Смещение первой заявки страницы")
+    limit = fields.Int(description="Размер страницы")
+    next_cursor = fields.Str(allow_none=True, description="Курсор следующей страницы")
+
 class CommentCreateSchema(Schema):
     """Схема для создания комментария"""
     comment = fields.Str(required=True, description="Текст комментария")
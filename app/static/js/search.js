@@ -1,6 +1,10 @@
 let selectedSolution = '';
 let selectedSource = '';
 let allResults = [];
+// Задержка перед запросом подсказок и номер последнего запроса (устаревшие ответы отбрасываются)
+const SUGGEST_DELAY_MS = 150;
+let suggestTimer = null;
+let suggestRequestId = 0;
 
 $(document).ready(function () {
     console.log("Search page initialized");
@@ -17,6 +21,37 @@ $(document).ready(function () {
         }
     });
 
+    // Подсказки при вводе запроса (с задержкой, чтобы не запрашивать на каждый символ)
+    $('#search-input').on('input', function () {
+        const query = $(this).val().trim();
+        clearTimeout(suggestTimer);
+        if (!query) {
+            hideSuggestions();
+            return;
+        }
+        suggestTimer = setTimeout(function () {
+            fetchSuggestions(query);
+        }, SUGGEST_DELAY_MS);
+    });
+
+    $('#search-input').blur(function () {
+        // Даем сработать клику по подсказке
+        setTimeout(hideSuggestions, 200);
+    });
+
+    $(document).on('mousedown', '.suggestion-item', function (e) {
+        e.preventDefault();
+        const url = $(this).data('url');
+        if (url) {
+            window.open(url, '_blank');
+            hideSuggestions();
+            return;
+        }
+        const text = $(this).data('text');
+        $('#search-input').val(text);
+        searchSolutions(text);
+    });
+
     // Поиск при нажатии Enter в поле ввода
     $('#search-input').keypress(function (e) {
         if (e.which === 13) {
@@ -127,8 +162,54 @@ $(document).ready(function () {
     });
 });
 
+// Запрос подсказок по введенному префиксу
+function fetchSuggestions(query) {
+    const requestId = ++suggestRequestId;
+    $.ajax({
+        url: '/api/suggest',
+        type: 'GET',
+        data: { q: query, limit: 8 },
+        global: false,
+        success: function (data) {
+            if (requestId === suggestRequestId) {
+                displaySuggestions(data.suggestions || []);
+            }
+        }
+    });
+}
+
+// Отображение списка подсказок
+function displaySuggestions(suggestions) {
+    const container = $('#search-suggestions');
+    container.empty();
+    if (suggestions.length === 0) {
+        container.addClass('d-none');
+        return;
+    }
+    const typeLabels = { title: 'Статья', tag: 'Тег', query: 'Запрос' };
+    suggestions.forEach(function (suggestion) {
+        const item = $('<button type="button" class="list-group-item list-group-item-action suggestion-item d-flex justify-content-between"></button>');
+        item.append($('<span></span>').text(suggestion.text));
+        item.append($('<small class="text-muted"></small>').text(typeLabels[suggestion.type] || ''));
+        item.data('text', suggestion.text);
+        if (suggestion.url) {
+            item.data('url', suggestion.url);
+        }
+        container.append(item);
+    });
+    container.removeClass('d-none');
+}
+
+// Скрытие подсказок (ответы на уже отправленные запросы отбрасываются)
+function hideSuggestions() {
+    clearTimeout(suggestTimer);
+    suggestRequestId++;
+    $('#search-suggestions').addClass('d-none').empty();
+}
+
 // Функция поиска решений
 function searchSolutions(query) {
+    hideSuggestions();
     $('#search-results').html('<div class="text-center"><div class="spinner-border text-success" role="status"></div><p class="mt-2">Поиск решений...</p></div>');
 
     // Получаем выбранные источники для фильтрации
@@ -271,7 +352,7 @@ function displayResults(results) {
                     <h5 class="mb-0">${result.title}</h5>
                     <div>
                         <span class="${sourceBadgeClass}">${sourceLabel}</span>
-                        <span class="badge bg-info ms-1">Релевантность: ${Math.round(result.score * 10) / 10}</span>
+                        <span class="badge bg-info ms-1">Релевантность: ${Math.round(result.score * 100) / 100}</span>
                     </div>
                 </div>
                 <div class="card-body">
@@ -1,6 +1,11 @@
 // Глобальные переменные
 let currentTicketId = null;
 let tickets = [];
+let nextCursor = null;
+
+// Поля, которые нужны для списка заявок (детали загружаются отдельно)
+const LIST_FIELDS = 'id,subject,status,priority,created_on';
+const PAGE_SIZE = 50;
 
 $(document).ready(function () {
     console.log("ServiceDesk page initialized");
@@ -66,14 +71,8 @@ $(document).ready(function () {
                 contentType: 'application/json',
                 data: JSON.stringify({ comment: comment }),
                 success: function () {
-                    // После успешного добавления комментария - загружаем заявки заново
-                    loadTickets(function () {
-                        // После загрузки показываем детали текущей заявки
-                        const ticket = tickets.find(t => t.id === currentTicketId);
-                        if (ticket) {
-                            showTicketDetails(ticket);
-                        }
-                    });
+                    // После успешного добавления комментария - загружаем детали заявки заново
+                    loadTicketDetails(currentTicketId);
                     $('#new-comment').val('');
                 },
                 error: function (xhr, status, error) {
@@ -88,23 +87,30 @@ $(document).ready(function () {
     $(document).on('click', '.ticket-item', function () {
         const ticketId = parseInt($(this).data('ticket-id'));
         currentTicketId = ticketId;
+        loadTicketDetails(ticketId);
+    });
 
-        // Найти заявку в массиве
-        const ticket = tickets.find(t => t.id === ticketId);
-        if (ticket) {
-            showTicketDetails(ticket);
-        }
+    // Загрузка следующей страницы заявок
+    $(document).on('click', '#load-more-tickets', function () {
+        loadTickets(null, true);
     });
 });
 
-// Загрузка заявок с сервера
-function loadTickets(callback) {
+// Загрузка заявок с сервера (постранично, только поля для списка)
+function loadTickets(callback, append = false) {
+    const params = { limit: PAGE_SIZE, fields: LIST_FIELDS };
+    if (append && nextCursor) {
+        params.cursor = nextCursor;
+    }
+
     $.ajax({
         url: '/api/tickets',
         method: 'GET',
+        data: params,
         success: function (data) {
-            tickets = data;
-            console.log(`Загружено ${tickets.length} заявок с сервера`);
+            tickets = append ? tickets.concat(data.tickets) : data.tickets;
+            nextCursor = data.next_cursor;
+            console.log(`Загружено ${tickets.length} из ${data.total_count} заявок с сервера`);
             updateTicketsList();
             if (callback) callback();
         },
@@ -115,6 +121,21 @@ function loadTickets(callback) {
     });
 }
 
+// Загрузка полной информации о заявке (с комментариями)
+function loadTicketDetails(ticketId) {
+    $.ajax({
+        url: `/api/tickets/${ticketId}`,
+        method: 'GET',
+        success: function (ticket) {
+            showTicketDetails(ticket);
+        },
+        error: function (xhr, status, error) {
+            console.error("Error loading ticket:", error);
+            alert('Ошибка при загрузке заявки: ' + (xhr.responseJSON?.error || error));
+        }
+    });
+}
+
 // Очистка формы заявки
 function clearTicketForm() {
     $('#ticket-subject').val('');
@@ -133,11 +154,7 @@ function updateTicketsList() {
 
     container.empty();
 
-    // Сортировка заявок по дате (новые сверху)
-    tickets.sort((a, b) => {
-        return new Date(b.created_on) - new Date(a.created_on);
-    });
-
+    // Заявки уже отсортированы сервером (новые сверху)
     tickets.forEach(ticket => {
         const priorityClass = getPriorityClass(ticket.priority);
         const statusClass = getStatusClass(ticket.status);
@@ -157,6 +174,10 @@ function updateTicketsList() {
             </div>
         `);
     });
+
+    if (nextCursor) {
+        container.append('<div class="text-center mt-2"><button id="load-more-tickets" class="btn btn-outline-secondary btn-sm">Показать еще</button></div>');
+    }
 }
 
 // Показать детали заявки
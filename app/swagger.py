@@ -5,7 +5,7 @@ from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
 from app.schemas import (
     NodeSchema, SearchQuerySchema, SearchResultSchema, SearchResponseSchema,
-    TicketCreateSchema, CommentCreateSchema, SolutionAttachSchema, StatusResponseSchema
+    TicketCreateSchema, TicketPageSchema, CommentCreateSchema, SolutionAttachSchema, StatusResponseSchema
 )
 import logging
 
@@ -70,6 +70,7 @@ def register_schemas():
     spec.components.schema("SearchResult", schema=SearchResultSchema)
     spec.components.schema("SearchResponse", schema=SearchResponseSchema)
     spec.components.schema("TicketCreate", schema=TicketCreateSchema)
+    spec.components.schema("TicketPage", schema=TicketPageSchema)
     spec.components.schema("CommentCreate", schema=CommentCreateSchema)
     spec.components.schema("SolutionAttach", schema=SolutionAttachSchema)
     spec.components.schema("StatusResponse", schema=StatusResponseSchema)
@@ -107,6 +108,88 @@ def register_api_routes(app):
                     }
                 }
             },
+            "/api/node/{node_id}/subtree": {
+                "get": {
+                    "tags": ["decision-tree"],
+                    "summary": "Получить узел вместе с потомками (общие узлы не дублируются)",
+                    "parameters": [
+                        {"name": "node_id", "in": "path", "required": True, "schema": {"type": "string"}},
+                        {"name": "depth", "in": "query", "schema": {"type": "integer", "minimum": 0},
+                         "description": "Глубина поддерева; без параметра - все поддерево"}
+                    ],
+                    "responses": {
+                        "200": {"description": "Поддерево: root, depth и словарь узлов nodes"},
+                        "304": {"description": "Поддерево не изменилось (If-None-Match)"},
+                        "404": {"description": "Узел не найден"}
+                    }
+                }
+            },
+            "/api/graph/analytics": {
+                "get": {
+                    "tags": ["decision-tree"],
+                    "summary": "Аналитика графа: циклы, сироты, недостижимые и тупиковые узлы, длинные цепочки",
+                    "parameters": [
+                        {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 100},
+                         "description": "Максимальная длина списков узлов"}
+                    ],
+                    "responses": {
+                        "200": {"description": "Сводка по графу"}
+                    }
+                }
+            },
+            "/api/graph/analytics/{node_id}": {
+                "get": {
+                    "tags": ["decision-tree"],
+                    "summary": "Аналитика узла: глубина, шаги до решения, достижимые решения",
+                    "parameters": [
+                        {"name": "node_id", "in": "path", "required": True, "schema": {"type": "string"}},
+                        {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 100},
+                         "description": "Максимальное количество перечисляемых решений"}
+                    ],
+                    "responses": {
+                        "200": {"description": "Аналитика узла"},
+                        "404": {"description": "Узел не найден"}
+                    }
+                }
+            },
+            "/api/graph/visualize": {
+                "get": {
+                    "tags": ["decision-tree"],
+                    "summary": "Отрисовка графа решений или поддерева (DOT/SVG, кэшируется по хэшу содержимого)",
+                    "parameters": [
+                        {"name": "format", "in": "query", "schema": {"type": "string", "enum": ["svg", "dot"], "default": "svg"}},
+                        {"name": "node", "in": "query", "schema": {"type": "string"},
+                         "description": "Корень поддерева; без параметра - весь граф"},
+                        {"name": "depth", "in": "query", "schema": {"type": "integer", "minimum": 0},
+                         "description": "Глубина поддерева"}
+                    ],
+                    "responses": {
+                        "200": {"description": "DOT или SVG"},
+                        "304": {"description": "Отрисовка не изменилась (If-None-Match)"},
+                        "404": {"description": "Узел не найден"},
+                        "503": {"description": "Graphviz недоступен"}
+                    }
+                }
+            },
+            "/api/admin/graph": {
+                "get": {
+                    "tags": ["decision-tree"],
+                    "summary": "Состояние загруженного графа решений",
+                    "responses": {
+                        "200": {"description": "Версия графа, файл и последняя ошибка перезагрузки"}
+                    }
+                }
+            },
+            "/api/admin/graph/reload": {
+                "post": {
+                    "tags": ["decision-tree"],
+                    "summary": "Перезагрузить граф решений из файла без перезапуска",
+                    "responses": {
+                        "200": {"description": "Граф перезагружен"},
+                        "422": {"description": "Новый граф не прошел проверку, работает прежний"}
+                    }
+                }
+            },
             "/api/search": {
                 "post": {
                     "tags": ["search"],
@@ -123,7 +206,89 @@ def register_api_routes(app):
                     }
                 }
             },
+            "/api/search/batch": {
+                "post": {
+                    "tags": ["search"],
+                    "summary": "Пакетный поиск (queries: строки или {id, query}); ответ - поток NDJSON по мере готовности",
+                    "requestBody": {
+                        "required": True,
+                        "content": {"application/json": {}}
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Строка JSON на каждый запрос: index, id, query, results, errors",
+                            "content": {"application/x-ndjson": {}}
+                        },
+                        "400": {"description": "Некорректный пакет запросов"}
+                    }
+                }
+            },
+            "/api/suggest": {
+                "get": {
+                    "tags": ["search"],
+                    "summary": "Подсказки при вводе запроса (заголовки, теги, популярные запросы)",
+                    "parameters": [
+                        {"name": "q", "in": "query", "required": True, "schema": {"type": "string"},
+                         "description": "Введенная часть запроса"},
+                        {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 8},
+                         "description": "Количество подсказок (не более 20)"}
+                    ],
+                    "responses": {
+                        "200": {"description": "Список подсказок"}
+                    }
+                }
+            },
+            "/api/search/status": {
+                "get": {
+                    "tags": ["search"],
+                    "summary": "Состояние пула соединений OpenSearch и метрики кэша результатов поиска",
+                    "responses": {
+                        "200": {"description": "Статистика пула и доступность кластера"}
+                    }
+                }
+            },
+            "/api/index-mediawiki/sync": {
+                "post": {
+                    "tags": ["search"],
+                    "summary": "Инкрементальная синхронизация MediaWiki по recentchanges",
+                    "responses": {
+                        "200": {"description": "Количество переиндексированных и удаленных страниц"}
+                    }
+                }
+            },
+            "/api/admin/suggest/reload": {
+                "post": {
+                    "tags": ["search"],
+                    "summary": "Перестроить подсказки поиска по документам индекса",
+                    "responses": {
+                        "200": {"description": "Количество документов и статистика подсказок"},
+                        "500": {"description": "Ошибка чтения индекса"}
+                    }
+                }
+            },
             "/api/tickets": {
+                "get": {
+                    "tags": ["servicedesk"],
+                    "summary": "Получить страницу заявок",
+                    "parameters": [
+                        {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 25}},
+                        {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}},
+                        {"name": "cursor", "in": "query", "schema": {"type": "string"},
+                         "description": "Курсор next_cursor из предыдущего ответа"},
+                        {"name": "status", "in": "query", "schema": {"type": "string"}},
+                        {"name": "priority", "in": "query", "schema": {"type": "string"}},
+                        {"name": "project_id", "in": "query", "schema": {"type": "integer"}},
+                        {"name": "assigned_to", "in": "query", "schema": {"type": "integer"}},
+                        {"name": "created_from", "in": "query", "schema": {"type": "string"}},
+                        {"name": "created_to", "in": "query", "schema": {"type": "string"}},
+                        {"name": "sort", "in": "query", "schema": {"type": "string", "default": "-created_on"}},
+                        {"name": "fields", "in": "query", "schema": {"type": "string"},
+                         "description": "Список полей через запятую"}
+                    ],
+                    "responses": {
+                        "200": {"description": "Страница заявок"}
+                    }
+                },
                 "post": {
                     "tags": ["servicedesk"],
                     "summary": "Создать новую заявку",
@@ -132,6 +297,15 @@ def register_api_routes(app):
                     }
                 }
             },
+            "/api/servicedesk/stats": {
+                "get": {
+                    "tags": ["servicedesk"],
+                    "summary": "Статистика пула соединений и circuit breaker Service Desk",
+                    "responses": {
+                        "200": {"description": "Статистика подключения"}
+                    }
+                }
+            },
             "/api/tickets/{ticket_id}": {
                 "get": {
                     "tags": ["servicedesk"],
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Сравнение памяти и задержек DecisionGraph (networkx) и CompactDecisionGraph.
+Генерирует синтетический граф решений заданного размера и измеряет
+время построения, занимаемую память и время типичных операций API.
+"""
+
+import gc
+import random
+import time
+import argparse
+import tracemalloc
+from app.modules.compact_graph import CompactDecisionGraph
+
+def generate_graph_data(node_count, branching=4, seed=42):
+    """Синтетический граф в формате graph_data.json: дерево вопросов с решениями в листьях"""
+    rng = random.Random(seed)
+    nodes = [{'id': 'q0', 'content': 'Вопрос 0: ' + 'текст вопроса ' * 5, 'type': 'question'}]
+    edges = []
+    questions = ['q0']
+    next_id = 1
+    while next_id < node_count:
+        parent = questions[rng.randrange(len(questions))]
+        is_solution = rng.random() < 0.5
+        node_id = f"{'s' if is_solution else 'q'}{next_id}"
+        text = 'текст решения ' if is_solution else 'текст вопроса '
+        nodes.append({
+            'id': node_id,
+            'content': f"{'Решение' if is_solution else 'Вопрос'} {next_id}: " + text * 5,
+            'type': 'solution' if is_solution else 'question'
+        })
+        edges.append({'source': parent, 'target': node_id, 'label': f"Ответ {rng.randrange(branching)}"})
+        if not is_solution:
+            questions.append(node_id)
+        next_id += 1
+    return {'nodes': nodes, 'edges': edges}
+
+def build_networkx(data):
+    from app.modules.decision_graph import DecisionGraph
+    graph = DecisionGraph()
+    for node in data['nodes']:
+        graph.add_node(node['id'], node['content'], node['type'])
+    for edge in data['edges']:
+        graph.add_edge(edge['source'], edge['target'], edge['label'])
+    return graph
+
+def measure_build(builder, data):
+    """Время построения и объем памяти, занятой графом"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    graph = builder(data)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph, elapsed, current
+
+def measure_ops(graph, node_ids, repeat):
+    """Среднее время операций в микросекундах"""
+    results = {}
+    started = time.perf_counter()
+    for _ in range(repeat):
+        graph.get_root_node()
+    results['get_root_node'] = (time.perf_counter() - started) / repeat * 1e6
+
+    started = time.perf_counter()
+    for node_id in node_ids:
+        graph.get_children(node_id)
+    results['get_children'] = (time.perf_counter() - started) / len(node_ids) * 1e6
+
+    started = time.perf_counter()
+    for node_id in node_ids:
+        graph.get_node_content(node_id)
+        graph.is_solution(node_id)
+    results['content+is_solution'] = (time.perf_counter() - started) / len(node_ids) * 1e6
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк представлений графа решений")
+    parser.add_argument('--nodes', type=int, default=100000, help="Количество узлов графа")
+    parser.add_argument('--lookups', type=int, default=20000, help="Количество случайных обращений к узлам")
+    parser.add_argument('--root-repeat', type=int, default=20, help="Количество вызовов get_root_node")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print(f"=== Бенчмарк графа решений: {args.nodes} узлов ===")
+    data = generate_graph_data(args.nodes)
+    rng = random.Random(1)
+    node_ids = [rng.choice(data['nodes'])['id'] for _ in range(args.lookups)]
+
+    runtimes = [('compact', CompactDecisionGraph.from_dict)]
+    try:
+        import networkx  # noqa: F401
+        runtimes.insert(0, ('networkx', build_networkx))
+    except ImportError:
+        print("networkx не установлен, сравнение только для компактного представления")
+
+    for name, builder in runtimes:
+        graph, build_time, memory = measure_build(builder, data)
+        ops = measure_ops(graph, node_ids, args.root_repeat)
+        print(f"\n[{name}]")
+        print(f"  построение:          {build_time:.2f} с")
+        print(f"  память:              {memory / 1024 / 1024:.1f} МБ ({memory / args.nodes:.0f} байт/узел)")
+        for op, micros in ops.items():
+            print(f"  {op + ':':<21}{micros:.1f} мкс")
+        del graph
+
+if __name__ == "__main__":
+    main()
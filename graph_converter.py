@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Конвертер графа решений между JSON (graph_data.json) и бинарным форматом.
+Бинарный файл отображается приложением в память и разделяется воркерами.
+
+Примеры:
+    python graph_converter.py to-binary graph_data.json graph_data.dgb
+    python graph_converter.py to-json graph_data.dgb graph_data.json
+"""
+
+import sys
+import argparse
+from app.modules.compact_graph import CompactDecisionGraph
+from app.modules.graph_binary import load_binary, save_binary
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Конвертация графа решений JSON <-> бинарный формат")
+    parser.add_argument('command', choices=['to-binary', 'to-json'], help="Направление конвертации")
+    parser.add_argument('source', help="Исходный файл")
+    parser.add_argument('target', help="Результирующий файл")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        if args.command == 'to-binary':
+            graph = CompactDecisionGraph.load_from_file(args.source)
+            save_binary(graph, args.target)
+        else:
+            graph = load_binary(args.source)
+            graph.save_to_file(args.target)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка конвертации: {str(e)}")
+        sys.exit(1)
+    print(f"Граф ({len(graph)} узлов) записан в {args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,19 @@
 """
 Скрипт для индексации страниц из MediaWiki в OpenSearch.
 Создает полнотекстовый поисковый индекс по содержимому MediaWiki.
+Страницы загружаются параллельно и записываются пакетами через _bulk API.
+С флагом --local-index строится файл локального поискового индекса
+(офлайн-поиск без OpenSearch).
 """
 
 import os
 import sys
-import requests
-import json
-from opensearchpy import OpenSearch
+import time
+import argparse
 from dotenv import load_dotenv
-import re
+from app.modules.opensearch_pool import get_registry
+from app.modules.mediawiki_pipeline import MediaWikiIndexPipeline
+from app.modules.mediawiki_sync import MediaWikiIncrementalSync
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -20,83 +24,18 @@ MEDIAWIKI_URL = os.environ.get('MEDIAWIKI_URL', 'http://localhost/mediawiki')
 OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
 OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
 OPENSEARCH_INDEX = os.environ.get('OPENSEARCH_INDEX', 'solutions')
-
-def get_mediawiki_pages():
-    """Получение списка страниц из MediaWiki"""
-    try:
-        print("Получение списка страниц из MediaWiki...")
-        response = requests.get(f"{MEDIAWIKI_URL}/api.php", params={
-            'action': 'query',
-            'list': 'allpages',
-            'aplimit': 500,
-            'format': 'json'
-        })
-        
-        data = response.json()
-        
-        if 'query' in data and 'allpages' in data['query']:
-            pages = data['query']['allpages']
-            print(f"Найдено {len(pages)} страниц")
-            return pages
-        else:
-            print("Не удалось получить список страниц")
-            return []
-    except Exception as e:
-        print(f"Ошибка при получении списка страниц: {str(e)}")
-        return []
-
-def get_page_content(page_id):
-    """Получение содержимого страницы по ID"""
-    try:
-        response = requests.get(f"{MEDIAWIKI_URL}/api.php", params={
-            'action': 'parse',
-            'pageid': page_id,
-            'prop': 'text|categories',
-            'format': 'json'
-        })
-        
-        data = response.json()
-        
-        if 'parse' in data:
-            parse_data = data['parse']
-            
-            # Получаем HTML-контент
-            html_content = parse_data.get('text', {}).get('*', '')
-            
-            # Удаляем HTML-теги
-            text_content = re.sub(r'<[^>]+>', ' ', html_content)
-            text_content = re.sub(r'\s+', ' ', text_content).strip()
-            
-            # Получаем категории
-            categories = []
-            if 'categories' in parse_data:
-                categories = [cat.get('*', '') for cat in parse_data['categories']]
-            
-            return {
-                'text': text_content,
-                'categories': categories
-            }
-        else:
-            print(f"Не удалось получить содержимое для страницы {page_id}")
-            return None
-    except Exception as e:
-        print(f"Ошибка при получении содержимого страницы {page_id}: {str(e)}")
-        return None
+OPENSEARCH_POOL_SIZE = int(os.environ.get('OPENSEARCH_POOL_SIZE', 10))
+INDEXER_WORKERS = int(os.environ.get('INDEXER_WORKERS', 8))
+INDEXER_BATCH_SIZE = int(os.environ.get('INDEXER_BATCH_SIZE', 200))
+MEDIAWIKI_SYNC_STATE_FILE = os.environ.get('MEDIAWIKI_SYNC_STATE_FILE', 'mediawiki_sync_state.json')
+LOCAL_SEARCH_INDEX_FILE = os.environ.get('LOCAL_SEARCH_INDEX_FILE', 'local_search_index.idx')
 
 def create_opensearch_index():
     """Создание индекса в OpenSearch"""
     try:
-        client = OpenSearch(
-            hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT}],
-            use_ssl=False,
-            verify_certs=False,
-            ssl_show_warn=False
-        )
-        
-        # Проверяем существование индекса
-        if client.indices.exists(index=OPENSEARCH_INDEX):
-            print(f"Индекс {OPENSEARCH_INDEX} уже существует")
-            return client
+        # Используем тот же общий пул соединений, что и приложение
+        registry = get_registry(OPENSEARCH_HOST, OPENSEARCH_PORT, pool_size=OPENSEARCH_POOL_SIZE)
+        client = registry.client
         
         # Создаем индекс с настройками для русского и английского языков
         settings = {
@@ -147,60 +86,76 @@ def create_opensearch_index():
                     },
                     "categories": {"type": "keyword"},
                     "url": {"type": "keyword"},
-                    "source": {"type": "keyword"}
+                    "source": {"type": "keyword"},
+                    "revid": {"type": "long"}
                 }
             }
         }
         
-        client.indices.create(index=OPENSEARCH_INDEX, body=settings)
-        print(f"Индекс {OPENSEARCH_INDEX} успешно создан")
+        if registry.ensure_index(OPENSEARCH_INDEX, settings):
+            print(f"Индекс {OPENSEARCH_INDEX} успешно создан")
+        else:
+            print(f"Индекс {OPENSEARCH_INDEX} уже существует")
         return client
     except Exception as e:
         print(f"Ошибка при создании индекса: {str(e)}")
         return None
 
-def index_page(client, page):
-    """Индексация страницы в OpenSearch"""
+def parse_args():
+    parser = argparse.ArgumentParser(description="Индексация MediaWiki в OpenSearch")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Загрузить только изменения из recentchanges с момента последней синхронизации")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="Повторять инкрементальную синхронизацию каждые N секунд")
+    parser.add_argument('--local-index', nargs='?', const=LOCAL_SEARCH_INDEX_FILE, default=None,
+                        metavar='FILE',
+                        help="Построить файл локального поискового индекса вместо записи в OpenSearch")
+    return parser.parse_args()
+
+def run_local_index(filename):
+    """Построить локальный поисковый индекс по всем страницам вики"""
+    pipeline = MediaWikiIndexPipeline(
+        mediawiki_url=MEDIAWIKI_URL,
+        client=None,
+        index_name=None,
+        workers=INDEXER_WORKERS,
+        reporter=print
+    )
+    print(f"\nПостроение локального индекса: {filename}")
     try:
-        page_id = page['pageid']
-        title = page['title']
-        
-        print(f"Индексация страницы: {title} (ID: {page_id})...")
-        
-        # Получаем содержимое страницы из MediaWiki
-        content_data = get_page_content(page_id)
-        if not content_data:
-            print(f"  Пропуск: не удалось получить содержимое")
-            return False
-        
-        # Создаем документ для индексации в OpenSearch
-        document = {
-            'id': f"mediawiki_{page_id}",
-            'title': title,
-            'content': content_data['text'],
-            'categories': content_data['categories'],
-            'url': f"{MEDIAWIKI_URL}/index.php?curid={page_id}",
-            'source': 'mediawiki'
-        }
-        
-        # Индексируем документ в OpenSearch
-        client.index(
-            index=OPENSEARCH_INDEX,
-            body=document,
-            id=document['id'],
-            refresh=True
-        )
-        print(f"  Успешно проиндексировано в OpenSearch")
-        return True
+        stats = pipeline.build_local_index(filename)
     except Exception as e:
-        print(f"  Ошибка при индексации страницы {title}: {str(e)}")
-        return False
+        print(f"Ошибка при построении локального индекса: {str(e)}")
+        sys.exit(1)
+    print(f"\nЗагружено страниц: {stats['indexed']} за {stats['elapsed_s']} с.")
+    print(f"Документов в локальном индексе: {stats['documents']}")
+
+def run_incremental(pipeline, interval):
+    """Инкрементальная синхронизация (разово или периодически)"""
+    sync = MediaWikiIncrementalSync(pipeline, MEDIAWIKI_SYNC_STATE_FILE)
+    while True:
+        result = sync.run_once()
+        if result['full_reindex']:
+            print(f"Выполнена начальная полная индексация: {result['indexed']} страниц")
+        else:
+            print(f"Переиндексировано: {result['indexed']}, удалено: {result['deleted']}")
+        if interval <= 0:
+            break
+        time.sleep(interval)
 
 def main():
+    args = parse_args()
+    if args.local_index:
+        print("=== Индексация MediaWiki в локальный индекс ===")
+        print(f"MediaWiki URL: {MEDIAWIKI_URL}")
+        run_local_index(args.local_index)
+        return
+    
     print("=== Индексация MediaWiki в OpenSearch ===")
     print(f"MediaWiki URL: {MEDIAWIKI_URL}")
     print(f"OpenSearch: {OPENSEARCH_HOST}:{OPENSEARCH_PORT}")
     print(f"Индекс: {OPENSEARCH_INDEX}")
+    print(f"Потоков загрузки: {INDEXER_WORKERS}, размер пакета: {INDEXER_BATCH_SIZE}")
     
     # Создаем или получаем индекс в OpenSearch
     client = create_opensearch_index()
@@ -208,25 +163,40 @@ def main():
         print("Не удалось подключиться к OpenSearch. Проверьте настройки.")
         sys.exit(1)
     
-    # Получаем список страниц из MediaWiki
-    pages = get_mediawiki_pages()
-    if not pages:
-        print("Не найдено страниц для индексации в MediaWiki.")
-        sys.exit(1)
+    pipeline = MediaWikiIndexPipeline(
+        mediawiki_url=MEDIAWIKI_URL,
+        client=client,
+        index_name=OPENSEARCH_INDEX,
+        workers=INDEXER_WORKERS,
+        batch_size=INDEXER_BATCH_SIZE,
+        reporter=print
+    )
     
-    print(f"\nНачинаем индексацию {len(pages)} страниц...")
-    success_count = 0
+    if args.incremental:
+        print(f"\nИнкрементальная синхронизация, состояние: {MEDIAWIKI_SYNC_STATE_FILE}")
+        try:
+            run_incremental(pipeline, args.interval)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"Ошибка при синхронизации: {str(e)}")
+            sys.exit(1)
+        return
     
-    # Индексируем каждую страницу в OpenSearch
-    for page in pages:
-        if index_page(client, page):
-            success_count += 1
+    print("\nНачинаем потоковую индексацию страниц...")
+    try:
+        stats = pipeline.run()
+    except Exception as e:
+        print(f"Ошибка при индексации: {str(e)}")
+        sys.exit(1)
     
-    print(f"\nИндексация завершена.")
-    print(f"Успешно проиндексировано: {success_count} из {len(pages)} страниц.")
+    if stats['pages'] == 0:
+        print("Не найдено страниц для индексации в MediaWiki.")
+        sys.exit(1)
     
-    # Обновляем индекс для немедленной доступности при поиске
-    client.indices.refresh(index=OPENSEARCH_INDEX)
+    print(f"\nИндексация завершена за {stats['elapsed_s']} с.")
+    print(f"Успешно проиндексировано: {stats['indexed']} из {stats['pages']} страниц.")
+    print(f"Скорость: {stats['pages_per_s']} стр/с, {stats['bytes_per_s'] / 1024:.1f} КБ/с")
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
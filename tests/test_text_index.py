@@ -0,0 +1,56 @@
+import pytest
+from app.modules.text_index import InvertedIndex, analyze, stem
+
+
+@pytest.mark.parametrize('query_word, document_word', [
+    ('интернет', 'интернета'),
+    ('интернет', 'интернете'),
+    ('печати', 'печатью'),
+    ('принтер', 'принтеров'),
+    ('подключение', 'подключения'),
+    ('подключение', 'подключением'),
+    ('перезагрузка', 'перезагрузку'),
+    ('сеть', 'сетью'),
+    ('пароль', 'пароля'),
+    ('памяти', 'памятью'),
+    ('почта', 'почтой'),
+    ('работает', 'работают'),
+    ('ёлка', 'елки'),
+    ('printer', 'printers'),
+    ('connection', 'connections'),
+])
+def test_word_forms_share_stem(query_word, document_word):
+    assert stem(query_word) == stem(document_word)
+
+
+@pytest.mark.parametrize('word, expected', [
+    ('интернет', 'интернет'),
+    ('сеть', 'сет'),
+    ('принтер', 'принтер'),
+    ('подключение', 'подключен'),
+])
+def test_endings_outside_rv_are_kept(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize('word, expected', [
+    ('печать', 'печа'),
+    ('печати', 'печат'),
+])
+def test_stems_match_snowball(word, expected):
+    # Как фильтр russian в OpenSearch: -ать в начальной форме отсекается как окончание глагола
+    assert stem(word) == expected
+
+
+def test_analyze_keeps_hyphenated_tokens():
+    assert analyze('Не работает Wi-Fi') == [stem('не'), stem('работает'), 'wi-fi']
+
+
+def test_search_matches_other_word_form():
+    index = InvertedIndex()
+    index.add({'id': 'kb_1', 'title': 'Нет интернета', 'content': 'Проверьте подключение кабеля', 'tags': ['сеть']})
+    index.add({'id': 'kb_2', 'title': 'Принтер не печатает', 'content': 'Ошибка печати', 'tags': ['печать']})
+
+    assert [document['id'] for document, _ in index.search('интернет')] == ['kb_1']
+    assert [document['id'] for document, _ in index.search('печать')] == ['kb_2']
+    assert [document['id'] for document, _ in index.search('подключения')] == ['kb_1']